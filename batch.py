@@ -0,0 +1,211 @@
+"""
+Ejecución por lotes de las Máquinas de Turing de Cifrado César
+Reparte muchos registros LLAVE#MENSAJE entre varios procesos
+"""
+
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Any
+
+from turing import load_turing_machine, TuringMachine, LOOP
+from budget import Budget
+from main import MACHINES, load_machine
+from tapes import prepare_tapes, parse_input
+
+
+# Máquina cargada una vez por proceso (ver _init_worker)
+_MACHINE: Optional[TuringMachine] = None
+
+# JSON y motor del proceso, para cargar las MT especializadas por llave
+_SPECIALIZE: Optional[tuple] = None
+
+# Si True, cada bloque se ejecuta con el simulador en paralelo de lockstep.py
+_LOCKSTEP = False
+
+
+def _init_worker(json_file: str, engine: str, specialize: bool = False, lockstep: bool = False):
+    """Carga y compila la MT una sola vez en cada proceso del pool"""
+    global _MACHINE, _SPECIALIZE, _LOCKSTEP
+    _MACHINE = load_turing_machine(json_file, engine)
+    _SPECIALIZE = (json_file, engine) if specialize else None
+    _LOCKSTEP = lockstep
+
+
+def _machine_for(record: str) -> TuringMachine:
+    """MT del proceso para un registro: la especializada en su llave si se pidió"""
+    if _SPECIALIZE is None:
+        return _MACHINE
+    try:
+        key, _ = parse_input(record)
+        return load_machine(*_SPECIALIZE, key)
+    except ValueError:
+        # process_record informa el error del registro
+        return _MACHINE
+
+
+def process_record(machine: TuringMachine, record: str, max_steps: Optional[int] = None,
+                   timeout: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Ejecuta un registro LLAVE#MENSAJE en una instancia nueva de la MT
+    
+    Si la MT repite una configuración se detiene de inmediato con status
+    'loop' y el largo del ciclo en cycle_length.
+    
+    Args:
+        machine: MT ya cargada (se usa como prototipo con spawn)
+        record: Registro en formato LLAVE#MENSAJE
+        max_steps: Número máximo de pasos (None = según el largo del registro)
+        timeout: Segundos máximos por registro (None = sin límite)
+        
+    Returns:
+        Diccionario con status, accepted, steps y output (o error)
+    """
+    try:
+        tapes = prepare_tapes(record, machine.config.get('alphabet'))
+    except ValueError as e:
+        return {'input': record, 'status': 'error', 'accepted': False, 'steps': 0, 'error': str(e)}
+    
+    tm = machine.spawn()
+    tm.load_input(tapes[0], tapes)
+    if max_steps is None:
+        budget = Budget.for_input(machine.config.get('complexity'), len(tapes[0]), timeout=timeout)
+    else:
+        budget = Budget(max_steps, timeout)
+    run = tm.simulate(budget=budget)
+    
+    result = {
+        'input': record,
+        'status': run.status,
+        'accepted': run.accepted,
+        'steps': run.steps,
+        'output': run.output,
+    }
+    if run.status == LOOP:
+        result['cycle_length'] = run.cycle_length
+    return result
+
+
+def _process_chunk(records: List[str], max_steps: Optional[int],
+                   timeout: Optional[float]) -> List[Dict[str, Any]]:
+    """Procesa un bloque de registros con la MT del proceso"""
+    if not _LOCKSTEP:
+        return [process_record(_machine_for(record), record, max_steps, timeout) for record in records]
+    
+    # Una simulación por MT: con --specialize cada llave tiene la suya
+    from lockstep import process_records
+    groups: Dict[int, tuple] = {}
+    for index, record in enumerate(records):
+        machine = _machine_for(record)
+        groups.setdefault(id(machine.program), (machine, []))[1].append(index)
+    results: List[Dict[str, Any]] = [{}] * len(records)
+    for machine, indices in groups.values():
+        chunk = process_records(machine, [records[i] for i in indices], max_steps, timeout)
+        for index, result in zip(indices, chunk):
+            results[index] = result
+    return results
+
+
+def _chunks(records: Iterable[str], size: int) -> Iterator[List[str]]:
+    """Agrupa los registros en bloques de tamaño fijo"""
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def run_batch(mode: str, records: Iterable[str], workers: Optional[int] = None,
+              chunk_size: int = 64, engine: str = 'interp',
+              max_steps: Optional[int] = None, timeout: Optional[float] = None,
+              specialize: bool = False, lockstep: bool = False) -> Iterator[Dict[str, Any]]:
+    """
+    Ejecuta muchos registros con la misma MT, repartidos en procesos
+    
+    Los resultados salen en el mismo orden que los registros. Solo se
+    mantienen en vuelo unos pocos bloques por proceso, así que la memoria no
+    crece con el tamaño del lote.
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        records: Registros LLAVE#MENSAJE
+        workers: Número de procesos (por defecto, uno por CPU; 1 = sin pool)
+        chunk_size: Registros por bloque enviado a cada proceso
+        engine: Motor de ejecución ('interp' o 'codegen')
+        max_steps: Número máximo de pasos por registro (None = según su largo)
+        timeout: Segundos máximos por registro
+        specialize: Si True, cada registro usa la MT especializada en su llave
+        lockstep: Si True, los registros de cada bloque se ejecutan a la vez
+            con NumPy (ver lockstep.py); los ciclos terminan como 'limit'
+            
+    Yields:
+        Un diccionario de resultado por registro, con su índice
+    """
+    json_file = MACHINES[mode]
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(records, max(1, chunk_size))
+    index = 0
+    
+    if workers == 1:
+        _init_worker(json_file, engine, specialize, lockstep)
+        for chunk in chunks:
+            for result in _process_chunk(chunk, max_steps, timeout):
+                yield {'index': index, **result}
+                index += 1
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(json_file, engine, specialize, lockstep)) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_process_chunk, chunk, max_steps, timeout))
+            if len(pending) >= workers * 2:
+                for result in pending.popleft().result():
+                    yield {'index': index, **result}
+                    index += 1
+        while pending:
+            for result in pending.popleft().result():
+                yield {'index': index, **result}
+                index += 1
+
+
+def run_batch_file(mode: str, path: str, workers: Optional[int] = None, chunk_size: int = 64,
+                   engine: str = 'interp', out=None, timeout: Optional[float] = None,
+                   specialize: bool = False, lockstep: bool = False) -> int:
+    """
+    Procesa un archivo de registros y escribe los resultados como JSON lines
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        path: Archivo con un registro por línea ('-' para stdin)
+        workers: Número de procesos
+        chunk_size: Registros por bloque
+        engine: Motor de ejecución
+        out: Flujo de salida (por defecto stdout)
+        timeout: Segundos máximos por registro
+        specialize: Si True, cada registro usa la MT especializada en su llave
+        lockstep: Si True, usa el simulador en paralelo con NumPy
+        
+    Returns:
+        Número de registros que la MT no aceptó
+    """
+    out = out or sys.stdout
+    source = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    failures = 0
+    
+    try:
+        records = (line.rstrip('\r\n') for line in source if line.strip())
+        for result in run_batch(mode, records, workers, chunk_size, engine, timeout=timeout,
+                                specialize=specialize, lockstep=lockstep):
+            if not result['accepted']:
+                failures += 1
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    
+    return failures
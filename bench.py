@@ -0,0 +1,294 @@
+"""
+Benchmarks de las Máquinas de Turing de Cifrado César
+Mide pasos, pasos/segundo y memoria por máquina, motor, largo y llave
+"""
+
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, Iterable, List, Any
+
+from turing import load_turing_machine, TuringMachine, ENGINES
+from main import MACHINES
+from tapes import prepare_tapes
+
+
+# Largos de mensaje por defecto y los de la corrida completa (--full)
+DEFAULT_LENGTHS = (10, 100, 1000, 10000)
+FULL_LENGTHS = (10, 100, 1000, 10000, 100000, 1000000)
+
+# Todos los desplazamientos posibles
+ALL_KEYS = tuple(range(26))
+
+# Caída relativa de rendimiento a partir de la cual se reporta una regresión
+DEFAULT_THRESHOLD = 0.2
+
+# Corridas más cortas que esto son ruido de reloj: no se comparan sus tiempos
+MIN_SECONDS = 0.001
+
+# Corridas cronometradas por combinación (se reporta la mejor)
+DEFAULT_REPEAT = 3
+
+# Alfabeto de los mensajes generados (letras y espacios, como en tests.txt)
+MESSAGE_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ    "
+
+
+def make_message(length: int, seed: int = 0) -> str:
+    """
+    Genera un mensaje reproducible de un largo dado
+    
+    Args:
+        length: Número de caracteres
+        seed: Semilla del generador
+        
+    Returns:
+        Mensaje de letras y espacios
+    """
+    rng = random.Random(seed * 1000003 + length)
+    return ''.join(rng.choice(MESSAGE_ALPHABET) for _ in range(length))
+
+
+def measure(machine: TuringMachine, record: str, repeat: int = DEFAULT_REPEAT,
+            memory: bool = True, max_steps: int = sys.maxsize) -> Dict[str, Any]:
+    """
+    Ejecuta un registro LLAVE#MENSAJE y mide tiempo y memoria
+    
+    Una primera corrida sin cronometrar llena los índices perezosos; el
+    tiempo es el mejor de repeat corridas sin tracemalloc y la memoria se
+    mide en una corrida aparte porque tracemalloc hace más lento el bucle.
+    
+    Args:
+        machine: MT ya cargada (se usa como prototipo con spawn)
+        record: Registro en formato LLAVE#MENSAJE
+        repeat: Número de corridas cronometradas
+        memory: Si True mide el pico de memoria y los bloques que quedan asignados
+        max_steps: Número máximo de pasos
+        
+    Returns:
+        Diccionario con status, steps, seconds, steps_per_sec y, si memory,
+        peak_bytes y retained_blocks_per_step
+    """
+    tapes = prepare_tapes(record, machine.config.get('alphabet'))
+    best = None
+    
+    tm = machine.spawn()
+    tm.load_input(tapes[0], tapes)
+    tm._run_loop(max_steps)
+    
+    for _ in range(max(1, repeat)):
+        tm = machine.spawn()
+        tm.load_input(tapes[0], tapes)
+        start = time.perf_counter()
+        status = tm._run_loop(max_steps)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    
+    steps = tm.steps
+    result = {
+        'status': status,
+        'steps': steps,
+        'seconds': best,
+        'steps_per_sec': steps / best if best > 0 else None,
+    }
+    
+    if memory:
+        tm = machine.spawn()
+        tm.load_input(tapes[0], tapes)
+        tracemalloc.start()
+        blocks = sys.getallocatedblocks()
+        try:
+            tm._run_loop(max_steps)
+            # Bloques que siguen asignados al terminar (cintas, memos de índices);
+            # es un saldo neto, no cuenta lo que se asigna y se libera en el bucle
+            blocks = sys.getallocatedblocks() - blocks
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        result['peak_bytes'] = peak
+        result['retained_blocks_per_step'] = blocks / steps if steps else 0.0
+    
+    return result
+
+
+def run_bench(machines: Iterable[str] = tuple(MACHINES), engines: Iterable[str] = ENGINES,
+              lengths: Iterable[int] = DEFAULT_LENGTHS, keys: Iterable[int] = ALL_KEYS,
+              repeat: int = DEFAULT_REPEAT, memory: bool = True, seed: int = 0,
+              progress=None) -> List[Dict[str, Any]]:
+    """
+    Recorre todas las combinaciones de máquina, motor, largo y llave
+    
+    Args:
+        machines: Nombres de máquina ('encrypt', 'decrypt')
+        engines: Motores de ejecución
+        lengths: Largos de mensaje
+        keys: Desplazamientos
+        repeat: Corridas cronometradas por combinación
+        memory: Si True mide memoria (una corrida extra por combinación)
+        seed: Semilla de los mensajes
+        progress: Flujo donde se reporta el avance (None = sin avance)
+        
+    Returns:
+        Lista de resultados, uno por combinación
+    """
+    results = []
+    for name in machines:
+        for engine in engines:
+            machine = load_turing_machine(MACHINES[name], engine)
+            for length in lengths:
+                message = make_message(length, seed)
+                for key in keys:
+                    result = {'machine': name, 'engine': engine, 'length': length, 'key': key}
+                    result.update(measure(machine, f"{key}#{message}", repeat, memory))
+                    results.append(result)
+                    if progress is not None:
+                        progress.write(f"{name} {engine} n={length} k={key}: "
+                                       f"{result['steps']} pasos, {result['seconds']:.4f}s\n")
+                        progress.flush()
+    return results
+
+
+def _result_key(result: Dict[str, Any]) -> tuple:
+    return result['machine'], result['engine'], result['length'], result['key']
+
+
+def compare(results: List[Dict[str, Any]], baseline: List[Dict[str, Any]],
+            threshold: float = DEFAULT_THRESHOLD) -> List[Dict[str, Any]]:
+    """
+    Compara resultados contra una línea base y devuelve las regresiones
+    
+    Es una regresión que cambie el número de pasos o el estado final (la MT
+    hace otra cosa), que los pasos/segundo caigan más de threshold (solo en
+    corridas de al menos MIN_SECONDS) o que el pico de memoria crezca más de
+    threshold.
+    
+    Args:
+        results: Resultados actuales
+        baseline: Resultados guardados
+        threshold: Tolerancia relativa (0.2 = 20%)
+        
+    Returns:
+        Lista de regresiones con la combinación, la métrica y ambos valores
+    """
+    stored = {_result_key(result): result for result in baseline}
+    regressions = []
+    
+    def flag(result, metric, before, after):
+        regressions.append({
+            'machine': result['machine'], 'engine': result['engine'],
+            'length': result['length'], 'key': result['key'],
+            'metric': metric, 'baseline': before, 'current': after,
+        })
+    
+    for result in results:
+        before = stored.get(_result_key(result))
+        if before is None:
+            continue
+        
+        for metric in ('status', 'steps'):
+            if result[metric] != before[metric]:
+                flag(result, metric, before[metric], result[metric])
+        
+        timed = max(result['seconds'], before['seconds']) >= MIN_SECONDS
+        if timed and result.get('steps_per_sec') and before.get('steps_per_sec'):
+            if result['steps_per_sec'] < before['steps_per_sec'] * (1 - threshold):
+                flag(result, 'steps_per_sec', before['steps_per_sec'], result['steps_per_sec'])
+        
+        if result.get('peak_bytes') and before.get('peak_bytes'):
+            if result['peak_bytes'] > before['peak_bytes'] * (1 + threshold):
+                flag(result, 'peak_bytes', before['peak_bytes'], result['peak_bytes'])
+    
+    return regressions
+
+
+def _parse_ints(text: str) -> List[int]:
+    """Lee una lista como '10,100,1000' o un rango como '0-25'"""
+    values = []
+    for part in text.split(','):
+        low, sep, high = part.partition('-')
+        if sep:
+            values.extend(range(int(low), int(high) + 1))
+        else:
+            values.append(int(part))
+    return values
+
+
+def run_bench_command(options: Dict[str, str], out=None) -> int:
+    """
+    Ejecuta el benchmark desde la línea de comandos y escribe el reporte JSON
+    
+    Opciones (--nombre=valor): machines, engines, lengths, keys, repeat,
+    seed, full, no-memory, output, baseline, threshold, quiet.
+    
+    Args:
+        options: Opciones de parse_options
+        out: Flujo de salida del JSON si no hay --output (por defecto stdout)
+        
+    Returns:
+        Número de regresiones encontradas contra la línea base
+    """
+    out = out or sys.stdout
+    
+    machines = options.get('machines', ','.join(MACHINES)).split(',')
+    engines = options.get('engines', ','.join(ENGINES)).split(',')
+    for name in machines:
+        if name not in MACHINES:
+            raise ValueError(f"Máquina desconocida: {name} (opciones: {', '.join(MACHINES)})")
+    for engine in engines:
+        if engine not in ENGINES:
+            raise ValueError(f"Motor desconocido: {engine} (opciones: {', '.join(ENGINES)})")
+    
+    if options.get('lengths'):
+        lengths = _parse_ints(options['lengths'])
+    else:
+        lengths = FULL_LENGTHS if 'full' in options else DEFAULT_LENGTHS
+    keys = _parse_ints(options['keys']) if options.get('keys') else ALL_KEYS
+    
+    results = run_bench(machines, engines, lengths, keys,
+                        repeat=int(options.get('repeat') or DEFAULT_REPEAT),
+                        memory='no-memory' not in options,
+                        seed=int(options.get('seed') or 0),
+                        progress=None if 'quiet' in options else sys.stderr)
+    
+    report: Dict[str, Any] = {
+        'meta': {
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    
+    regressions: List[Dict[str, Any]] = []
+    if options.get('baseline'):
+        with open(options['baseline'], 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        threshold = float(options.get('threshold') or DEFAULT_THRESHOLD)
+        regressions = compare(results, baseline['results'], threshold)
+        report['baseline'] = options['baseline']
+        report['threshold'] = threshold
+        report['regressions'] = regressions
+    
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if options.get('output'):
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        out.write(text + '\n')
+    
+    for regression in regressions:
+        print(f"REGRESIÓN {regression['machine']} {regression['engine']} "
+              f"n={regression['length']} k={regression['key']}: {regression['metric']} "
+              f"{regression['baseline']} -> {regression['current']}", file=sys.stderr)
+    
+    return len(regressions)
+
+
+if __name__ == "__main__":
+    from main import parse_options
+    
+    _, bench_options = parse_options(sys.argv[1:])
+    sys.exit(1 if run_bench_command(bench_options) else 0)
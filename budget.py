@@ -0,0 +1,151 @@
+"""
+Presupuestos de ejecución para Máquinas de Turing
+Límite de pasos según el tamaño de la entrada, tiempo máximo y cancelación
+"""
+
+import sys
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+# Motivos de parada propios del presupuesto (además de accept, reject, loop y limit)
+DEADLINE = 'deadline'
+CANCELLED = 'cancelled'
+
+# Factor de seguridad sobre los pasos estimados por el perfil de complejidad
+DEFAULT_MARGIN = 2.0
+
+# Mínimo de pasos de cualquier presupuesto derivado de un perfil
+MIN_STEPS = 1000
+
+# Pasos entre revisiones del reloj y de la cancelación
+SLICE_STEPS = 4096
+
+
+class CancelToken:
+    """
+    Señal de cancelación cooperativa
+    
+    Otro hilo llama a cancel(); la MT lo revisa cada SLICE_STEPS pasos y se
+    detiene con el motivo CANCELLED.
+    """
+    
+    def __init__(self):
+        self._event = threading.Event()
+    
+    def cancel(self):
+        """Pide que se detengan las ejecuciones que usan este token"""
+        self._event.set()
+    
+    @property
+    def cancelled(self) -> bool:
+        """True si ya se pidió la cancelación"""
+        return self._event.is_set()
+
+
+class Budget:
+    """
+    Límites de una ejecución: pasos, tiempo y cancelación
+    
+    Cualquiera de los límites puede faltar. El reloj se empieza a contar al
+    crear el presupuesto.
+    """
+    
+    def __init__(self, max_steps: Optional[int] = None, timeout: Optional[float] = None,
+                 token: Optional[CancelToken] = None, slice_steps: int = SLICE_STEPS):
+        """
+        Args:
+            max_steps: Número máximo de pasos (None = sin límite)
+            timeout: Segundos máximos de ejecución (None = sin límite)
+            token: Token de cancelación cooperativa
+            slice_steps: Pasos entre revisiones del reloj y del token
+        """
+        self.max_steps = max_steps if max_steps is not None else sys.maxsize
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout if timeout is not None else None
+        self.token = token
+        self.slice_steps = slice_steps
+    
+    @classmethod
+    def for_input(cls, complexity: Optional[Dict[str, int]], length: int,
+                  margin: float = DEFAULT_MARGIN, timeout: Optional[float] = None,
+                  token: Optional[CancelToken] = None, default_steps: int = 200000) -> 'Budget':
+        """
+        Presupuesto con el límite de pasos derivado del tamaño de la entrada
+        
+        Args:
+            complexity: Perfil de la MT ({'base', 'per_symbol'}) o None
+            length: Largo de la entrada (cinta 1)
+            margin: Factor de seguridad sobre la estimación
+            timeout: Segundos máximos de ejecución
+            token: Token de cancelación
+            default_steps: Límite si la MT no tiene perfil
+            
+        Returns:
+            Instancia de Budget
+        """
+        if complexity is None:
+            max_steps = default_steps
+        else:
+            max_steps = max(MIN_STEPS, int(estimate_steps(complexity, length) * margin))
+        return cls(max_steps, timeout, token)
+    
+    @property
+    def interrupts(self) -> bool:
+        """True si hay que revisar el reloj o el token durante la ejecución"""
+        return self.deadline is not None or self.token is not None
+    
+    def remaining(self) -> Optional[float]:
+        """Segundos que quedan antes del tiempo máximo (None = sin límite)"""
+        return None if self.deadline is None else self.deadline - time.monotonic()
+    
+    def expired(self) -> Optional[str]:
+        """
+        Revisa la cancelación y el tiempo máximo
+        
+        Returns:
+            CANCELLED, DEADLINE o None si se puede seguir
+        """
+        if self.token is not None and self.token.cancelled:
+            return CANCELLED
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            return DEADLINE
+        return None
+
+
+def estimate_steps(complexity: Dict[str, int], length: int) -> int:
+    """Pasos estimados por el perfil para una entrada de cierto largo"""
+    return complexity['base'] + complexity['per_symbol'] * length
+
+
+def calibrate(run_steps: Callable[[str], int], symbols: Iterable[str],
+              prefixes: Iterable[str]) -> Dict[str, int]:
+    """
+    Mide el perfil de complejidad lineal de una MT
+    
+    Para cada prefijo (por ejemplo 'LLAVE#') y cada símbolo s se ejecutan
+    prefijo+s y prefijo+ss; la diferencia es el costo de un símbolo más.
+    per_symbol es el mayor de esos costos y base el menor valor que deja
+    todas las muestras por debajo de la estimación.
+    
+    Args:
+        run_steps: Función que ejecuta una entrada y devuelve sus pasos
+        symbols: Símbolos del mensaje
+        prefixes: Prefijos de entrada a probar
+        
+    Returns:
+        Diccionario {'base', 'per_symbol'}
+    """
+    samples: List[tuple] = []
+    per_symbol = 0
+    symbols = list(symbols)
+    for prefix in prefixes:
+        for symbol in symbols:
+            one = run_steps(prefix + symbol)
+            two = run_steps(prefix + symbol * 2)
+            samples.append((len(prefix) + 1, one))
+            per_symbol = max(per_symbol, two - one)
+    
+    base = max([0] + [steps - per_symbol * length for length, steps in samples])
+    return {'base': base, 'per_symbol': per_symbol}
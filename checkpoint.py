@@ -0,0 +1,136 @@
+"""
+Checkpoints de ejecución de Máquinas de Turing
+Guarda y restaura la configuración de una MT para pausarla o reanudarla en
+otro proceso
+"""
+
+import hashlib
+import marshal
+import os
+from typing import Optional
+
+from turing import TuringMachine, ACCEPT, REJECT, LIMIT, LOOP
+
+
+# Pasos entre checkpoints por defecto
+CHECKPOINT_EVERY = 1000000
+
+# Motivos de parada definitivos: después de ellos no hay nada que reanudar
+# (al reanudar con el mismo límite de pasos, LIMIT se repetiría de inmediato;
+# solo el tiempo máximo y la cancelación son pausas)
+FINAL = (ACCEPT, REJECT, LOOP, LIMIT)
+
+
+def input_digest(machine: TuringMachine) -> str:
+    """
+    Huella de las cintas cargadas en una MT (texto y cabezal de cada una)
+    
+    Se calcula sobre el texto y no sobre los ids de símbolo, que pueden
+    cambiar entre procesos.
+    """
+    digest = hashlib.sha1()
+    for index, (tape, head) in enumerate(zip(machine.tapes, machine.heads)):
+        start, _ = tape.extent()
+        text = machine.get_tape_content(index)
+        digest.update(f"{start - tape.origin}:{head - tape.origin}:{len(text)}:{text}|".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def save_checkpoint(machine: TuringMachine, path: str, digest: Optional[str] = None):
+    """
+    Escribe el snapshot de una MT en un archivo
+    
+    Se escribe en un archivo temporal y se renombra, así que un proceso que
+    se cae a la mitad deja el checkpoint anterior intacto.
+    
+    Args:
+        machine: MT a guardar
+        path: Ruta del checkpoint
+        digest: input_digest de las cintas iniciales de la ejecución
+    """
+    snapshot = machine.snapshot()
+    snapshot['input'] = digest
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(marshal.dumps(snapshot))
+    os.replace(tmp, path)
+
+
+def load_checkpoint(machine: TuringMachine, path: str, digest: Optional[str] = None):
+    """
+    Restaura en una MT el snapshot guardado en un archivo
+    
+    Args:
+        machine: MT de destino (la misma definición que la guardada)
+        path: Ruta del checkpoint
+        digest: Si se da, input_digest de las cintas con que se quiere
+            reanudar; el checkpoint debe haberse guardado con el mismo
+            
+    Raises:
+        ValueError: Si el archivo no es un checkpoint válido de esta MT o
+            es de otro input
+    """
+    with open(path, 'rb') as f:
+        try:
+            snapshot = marshal.loads(f.read())
+        except (EOFError, ValueError, TypeError) as e:
+            raise ValueError(f"Checkpoint dañado: {path}") from e
+    if not isinstance(snapshot, dict):
+        raise ValueError(f"Checkpoint dañado: {path}")
+    if digest is not None and snapshot.get('input') != digest:
+        raise ValueError(f"El checkpoint {path} es de otro input; bórrelo para empezar de nuevo")
+    machine.restore(snapshot)
+
+
+def run_with_checkpoints(machine: TuringMachine, path: str, every: int = CHECKPOINT_EVERY,
+                         max_steps: Optional[int] = None, budget=None,
+                         detect_cycles: bool = True, keep: bool = False, tracer=None) -> str:
+    """
+    Ejecuta una MT guardando un checkpoint cada cierto número de pasos
+    
+    Si el checkpoint ya existe, la ejecución se reanuda desde él en vez de
+    empezar desde las cintas cargadas; así un proceso que se cayó continúa
+    desde el último checkpoint y no desde el paso 0. El checkpoint guarda la
+    huella de las cintas iniciales y solo se reanuda con las mismas. La
+    detección de ciclos se reinicia en cada tramo, así que solo encuentra
+    ciclos más cortos que every.
+    
+    Args:
+        machine: MT con las cintas ya cargadas
+        path: Ruta del checkpoint
+        every: Pasos entre checkpoints
+        max_steps: Número máximo de pasos (por defecto el del budget)
+        budget: Budget con límite de pasos, tiempo máximo y cancelación
+        detect_cycles: Si True, se detiene cuando una configuración se repite
+        keep: Si True, conserva el checkpoint aunque la MT termine (por
+            defecto solo queda si la ejecución se cortó y se puede reanudar)
+        tracer: TraceRecorder (de tracing.py) que registra cada paso
+        
+    Returns:
+        El motivo de parada de run_guarded
+        
+    Raises:
+        ValueError: Si el checkpoint existente es de otra MT o de otro input
+    """
+    if max_steps is None:
+        max_steps = budget.max_steps if budget is not None else CHECKPOINT_EVERY * 100
+    digest = input_digest(machine)
+    if os.path.exists(path):
+        load_checkpoint(machine, path, digest)
+    
+    while True:
+        status = machine.run_guarded(min(max_steps, machine.steps + every), steps=machine.steps,
+                                     detect_cycles=detect_cycles, budget=budget, tracer=tracer)
+        if status != LIMIT or machine.steps >= max_steps:
+            break
+        save_checkpoint(machine, path, digest)
+    
+    # Un resultado definitivo ya no se reanuda; un corte (tiempo,
+    # cancelación) deja el checkpoint para continuar después
+    if status in FINAL and not keep:
+        if os.path.exists(path):
+            os.remove(path)
+    else:
+        save_checkpoint(machine, path, digest)
+    machine.stop_reason['max_steps'] = max_steps
+    return status
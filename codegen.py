@@ -0,0 +1,340 @@
+"""
+Backend de generación de código para Máquinas de Turing Multicinta
+Convierte la MT compilada en una función Python especializada
+"""
+
+import os
+from typing import Dict, List, Optional, Tuple, Any
+
+from turing import (
+    TuringMachine, Program, load_program, sweep, ACCEPT, REJECT, LIMIT, LOOP, _MISSING,
+    SIDECAR_VERSION,
+)
+
+
+# Versión del generador; cambiarla invalida las fuentes cacheadas en disco
+CODEGEN_VERSION = 2
+
+# Versiones que se anotan en la fuente y deben coincidir para reutilizarla:
+# la del generador y la de Program, que asigna los ids de estados y símbolos
+SOURCE_VERSION = f"versión {CODEGEN_VERSION}, Program {SIDECAR_VERSION}"
+
+# Un efecto es lo que hace una transición una vez resuelta:
+# (siguiente estado, escrituras reales, movimientos)
+Effect = Tuple[int, Tuple[Tuple[int, int], ...], Tuple[Tuple[int, int], ...]]
+
+
+def source_path(json_file: str) -> str:
+    """Ruta del código generado que acompaña a un JSON (encrypt.json -> encrypt.gen.py)"""
+    base, _ = os.path.splitext(json_file)
+    return base + '.gen.py'
+
+
+def _state_effects(program: Program, state: int) -> Tuple[List[Effect], Dict[int, int], Dict[int, int]]:
+    """
+    Agrupa las transiciones de un estado por efecto
+    
+    Una escritura de un símbolo que el patrón ya exige en esa cinta no cambia
+    nada, así que se descarta; así transiciones como "A,*,*,* escribe A" y
+    "B,*,*,* escribe B" comparten un mismo efecto.
+    
+    Returns:
+        Tupla (efectos, id de transición -> índice de efecto,
+        índice de efecto -> id de una transición de barrido)
+    """
+    state_index = program.index[state]
+    effects: List[Effect] = []
+    effect_ids: Dict[Effect, int] = {}
+    effect_of: Dict[int, int] = {}
+    sweep_of: Dict[int, int] = {}
+    
+    for pattern, transition in state_index.patterns:
+        tid, next_state, writes, moves = transition
+        literals = dict(zip(state_index.positions, pattern))
+        writes = tuple((i, s) for i, s in writes if literals.get(i) != s)
+        effect = (next_state, writes, moves)
+        
+        if effect not in effect_ids:
+            effect_ids[effect] = len(effects)
+            effects.append(effect)
+        effect_of[tid] = effect_ids[effect]
+        
+        if tid in program.sweeps and next_state == state and not writes:
+            sweep_of.setdefault(effect_ids[effect], tid)
+    
+    return effects, effect_of, sweep_of
+
+
+def _key_expr(positions: Tuple[int, ...]) -> str:
+    """Expresión que arma la llave del índice a partir de los cabezales"""
+    reads = [f"b{i}[h{i}]" for i in positions]
+    if not reads:
+        return "()"
+    if len(reads) == 1:
+        return reads[0]
+    return "(" + ", ".join(reads) + ")"
+
+
+def _move_lines(moves, left_bounded: bool) -> List[str]:
+    """Líneas que mueven los cabezales con movimientos fijos"""
+    lines = []
+    for i, delta in moves:
+        if delta > 0:
+            lines += [f"h{i} += 1",
+                      f"if h{i} >= len(b{i}):",
+                      f"    h{i} = t{i}.grow(h{i})"]
+        elif left_bounded:
+            lines += [f"if h{i}:",
+                      f"    h{i} -= 1"]
+        else:
+            lines += [f"h{i} -= 1",
+                      f"if h{i} < 0:",
+                      f"    h{i} = t{i}.grow(h{i})"]
+    return lines
+
+
+def generate_source(program: Program, left_bounded: bool = True, name: str = '<machine>',
+                    digest: str = '') -> str:
+    """
+    Genera el código fuente Python de una MT compilada
+    
+    El código define run_loop(machine, max_steps, steps, watch), con una
+    rama por estado, lecturas y escrituras sobre los buffers en línea y
+    movimientos fijos. Los estados con lazos sobre sí mismos repiten su rama
+    sin volver al despacho. Después de cada paso se compara el estado con el
+    de la configuración vigilada (ver TuringMachine._run_loop).
+    
+    Args:
+        program: Program de la MT
+        left_bounded: Si la cinta es semi-infinita (L en 0 no se mueve)
+        name: Nombre de la MT (para el encabezado)
+        digest: Hash del JSON de origen (para invalidar la caché)
+        
+    Returns:
+        Código fuente del módulo generado
+    """
+    n = program.num_tapes
+    tapes = ", ".join(f"t{i}" for i in range(n))
+    buffers = ", ".join(f"b{i}" for i in range(n))
+    heads = ", ".join(f"h{i}" for i in range(n))
+    current = "[" + ", ".join(f"b{i}[h{i}]" for i in range(n)) + "]"
+    head_list = "[" + heads + "]"
+    
+    out = [
+        f"# Código generado por codegen.py ({SOURCE_VERSION}) desde {name}",
+        f"# sha1: {digest}",
+        "# No editar: se regenera cuando cambia el JSON",
+        "",
+        "",
+        "def run_loop(machine, max_steps, steps, watch=None):",
+        f"    {tapes}, = machine.tapes",
+        f"    {buffers}, = {', '.join(f't{i}.buffer' for i in range(n))},",
+        f"    {heads}, = machine.heads",
+        "    state = machine._state",
+        "    ws, wh = (watch[0], watch[1]) if watch is not None else (-1, None)",
+        "    try:",
+        "        while steps < max_steps:",
+    ]
+    
+    def emit(lines, indent):
+        out.extend(" " * indent + line for line in lines)
+    
+    keyword = "if"
+    for state, name_ in enumerate(program.state_names):
+        if program.accepting[state]:
+            emit([f"{keyword} state == {state}:  # {name_}",
+                  "    return ACCEPT"], 12)
+            keyword = "elif"
+            continue
+        
+        if program.index[state] is None:
+            continue
+        
+        effects, _, sweep_of = _state_effects(program, state)
+        positions = program.index[state].positions
+        loops = any(effect[0] == state for effect in effects)
+        
+        emit([f"{keyword} state == {state}:  # {name_}"], 12)
+        keyword = "elif"
+        body = [f"e = T{state}.get({_key_expr(positions)})",
+                "if e is None:",
+                f"    e = resolve({state}, {_key_expr(positions)})"]
+        
+        for e, (next_state, writes, moves) in enumerate(effects):
+            branch = [f"b{i}[h{i}] = {s}" for i, s in writes]
+            step = _move_lines(moves, left_bounded)
+            if next_state == state and e in sweep_of:
+                tape = moves[0][0]
+                branch += [f"target, jumped = sweep(program, {state}, {sweep_of[e]}, {current}, "
+                           f"t{tape}, h{tape}, max_steps - steps)",
+                           f"if jumped and {state} == ws:",
+                           f"    offset = machine._sweep_offset(watch, {tape}, {head_list}, target)",
+                           "    if offset:",
+                           f"        h{tape} = wh[{tape}]",
+                           "        steps += offset",
+                           "        return LOOP",
+                           f"h{tape} = target",
+                           "if not jumped:"]
+                branch += ["    " + line for line in step] + ["    jumped = 1",
+                                                              "steps += jumped"]
+            else:
+                branch += step + ["steps += 1"]
+            
+            watched = [f"if {next_state} == ws and steps < max_steps and {head_list} == wh "
+                       f"and machine._same_tapes(watch):",
+                       "    return LOOP"]
+            if next_state == state:
+                branch += ["if steps >= max_steps:",
+                           "    return LIMIT"] + watched + ["continue"]
+            else:
+                branch += [f"state = {next_state}"] + watched
+            
+            body += [f"{'if' if e == 0 else 'elif'} e == {e}:"] + ["    " + line for line in branch]
+        
+        body += ["else:",
+                 "    return REJECT"]
+        
+        if loops:
+            emit(["    while True:"], 12)
+            emit(body + ["break"], 20)
+        else:
+            emit(body, 16)
+    
+    out += [
+        "            else:",
+        "                return REJECT",
+        "        return LIMIT",
+        "    finally:",
+        f"        machine.heads[:] = {heads}",
+        "        machine._state = state",
+        "        machine.steps = steps",
+        "",
+    ]
+    return "\n".join(out)
+
+
+def build_namespace(program: Program) -> Dict[str, Any]:
+    """
+    Arma los globales que usa el código generado
+    
+    Las tablas T<estado> mapean la llave leída al índice de efecto; las
+    llaves que aún no están (símbolos fuera de Gamma, índices perezosos) se
+    resuelven con el índice del Program y se memorizan.
+    """
+    namespace: Dict[str, Any] = {
+        'program': program, 'sweep': sweep,
+        'ACCEPT': ACCEPT, 'REJECT': REJECT, 'LIMIT': LIMIT, 'LOOP': LOOP,
+    }
+    tables: Dict[int, Dict] = {}
+    effect_maps: Dict[int, Dict[int, int]] = {}
+    
+    for state, state_index in enumerate(program.index):
+        if state_index is None:
+            continue
+        _, effect_of, _ = _state_effects(program, state)
+        effect_maps[state] = effect_of
+        tables[state] = namespace[f"T{state}"] = {
+            key: effect_of[t[0]] for key, t in state_index.table.items() if t is not None
+        }
+    
+    def resolve(state: int, key) -> int:
+        state_index = program.index[state]
+        transition = state_index.table.get(key, _MISSING)
+        if transition is _MISSING:
+            transition = state_index.resolve(key)
+        effect = -1 if transition is None else effect_maps[state][transition[0]]
+        tables[state][key] = effect
+        return effect
+    
+    namespace['resolve'] = resolve
+    return namespace
+
+
+class CompiledTuringMachine(TuringMachine):
+    """
+    MT que ejecuta código Python generado para su tabla de transiciones
+    
+    Tiene la misma interfaz que TuringMachine y produce exactamente las mismas
+    cintas, pasos y resultados. En modo debug, con un profiler o con un
+    tracer usa el intérprete para poder mostrar, contar o registrar cada paso.
+    """
+    
+    def __init__(self, config: Dict[str, Any], program: Optional[Program] = None,
+                 source: Optional[str] = None, filename: str = '<machine>'):
+        """
+        Args:
+            config: Diccionario con la definición formal de la MT
+            program: Program ya compilado para config (se compila si es None)
+            source: Código generado previamente (se genera si es None)
+            filename: Nombre de archivo para los tracebacks del código generado
+        """
+        super().__init__(config, program)
+        if source is None:
+            source = generate_source(self.program, self.left_bounded)
+        self.source = source
+        
+        namespace = build_namespace(self.program)
+        exec(compile(source, filename, 'exec'), namespace)
+        self._loop = namespace['run_loop']
+    
+    def _run_loop(self, max_steps: int, debug: bool = False, steps: int = 0,
+                  profiler=None, watch: Optional[tuple] = None, tracer=None) -> str:
+        if debug or profiler is not None or tracer is not None:
+            return super()._run_loop(max_steps, debug, steps, profiler, watch, tracer)
+        return self._loop(self, max_steps, steps, watch)
+
+
+def load_compiled_machine(json_file: str, config: Optional[Dict[str, Any]] = None,
+                          program: Optional[Program] = None,
+                          digest: Optional[str] = None) -> CompiledTuringMachine:
+    """
+    Carga una MT con el backend de código generado
+    
+    El código se guarda junto al JSON (encrypt.json -> encrypt.gen.py) y se
+    reutiliza mientras coincidan el hash del JSON, la versión del generador y
+    la de Program (de la que dependen los ids de estados y símbolos).
+    
+    Args:
+        json_file: Ruta al archivo JSON
+        config: Configuración ya leída del JSON (se carga si es None)
+        program: Program ya compilado para config
+        digest: sha1 del JSON (se calcula si es None)
+        
+    Returns:
+        Instancia de CompiledTuringMachine
+    """
+    if config is None or program is None or digest is None:
+        config, program, digest = load_program(json_file)
+    
+    path = source_path(json_file)
+    left_bounded = config.get('left_bounded', True)
+    source = None
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cached = f.read()
+        header = cached.split('\n', 2)[:2]
+        if (len(header) == 2 and header[1] == f"# sha1: {digest}"
+                and f"({SOURCE_VERSION})" in header[0]):
+            source = cached
+    except OSError:
+        pass
+    
+    if source is None:
+        source = generate_source(program, left_bounded, os.path.basename(json_file), digest)
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(source)
+        except OSError:
+            # Sin permisos de escritura: se usa el código en memoria
+            pass
+    
+    return CompiledTuringMachine(config, program, source, path)
+
+
+if __name__ == "__main__":
+    import sys
+    
+    for json_file in sys.argv[1:] or ['encrypt.json', 'decrypt.json']:
+        machine = load_compiled_machine(json_file)
+        print(f"{json_file} -> {source_path(json_file)} ({len(machine.source.splitlines())} líneas)")
@@ -4,10 +4,79 @@ Genera encrypt.json y decrypt.json
 """
 
 import json
+import sys
+from functools import partial
+from typing import Dict, List, Optional, Tuple
 
+from tapes import prepare_tape_2_unary, prepare_tapes
 
-def generate_encrypt_mt():
-    """Genera la MT de encriptación"""
+
+LETTERS = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# Caracteres de la llave además de las letras del alfabeto
+DIGITS = "0123456789"
+
+# Caracteres que no pueden estar en el alfabeto ni pasar sin cambios: los que
+# tienen un significado propio en las cintas o en los patrones del JSON
+RESERVED = "#_|*,"
+
+# Clases de símbolos de los patrones (ver "classes" en turing.py): lo que
+# puede ir antes del # y las letras del alfabeto
+KEY_CLASS = "LLAVE"
+ALPHA_CLASS = "LETRA"
+
+
+def symbol_keys(alphabet: str = LETTERS, passthrough: str = " ") -> dict:
+    """
+    Claves de símbolos del JSON de una MT de cifrado con un alfabeto dado
+    
+    Además de Sigma y Gamma declara el alfabeto (la cinta 4), los caracteres
+    que se copian sin desplazar y las clases LLAVE y LETRA, con las que un
+    solo patrón cubre a todas las letras. Si Gamma incluye la 'x', el único
+    comodín de la MT es '*'.
+    
+    Args:
+        alphabet: Letras que se desplazan, en orden
+        passthrough: Caracteres del mensaje que se copian sin desplazar
+        
+    Returns:
+        Diccionario con Sigma, Gamma, alphabet, passthrough, classes y, si
+        hace falta, wildcards
+        
+    Raises:
+        ValueError: Si el alfabeto tiene menos de dos letras, repite alguna
+            o usa un carácter reservado
+    """
+    if len(alphabet) < 2 or len(set(alphabet)) != len(alphabet):
+        raise ValueError(f"Alfabeto inválido: {alphabet!r} (al menos dos letras distintas)")
+    reserved = set(RESERVED) & set(alphabet + passthrough)
+    if reserved:
+        raise ValueError(f"Caracteres reservados en el alfabeto: {''.join(sorted(reserved))!r}")
+    if set(alphabet) & set(passthrough):
+        raise ValueError("Un carácter no puede estar en el alfabeto y también pasar sin cambios")
+    
+    key = ''.join(dict.fromkeys(alphabet + DIGITS))
+    sigma = list(dict.fromkeys(key + "#" + passthrough))
+    keys = {
+        "Sigma": sigma,
+        "Gamma": sigma + ["|", "_"],
+        "alphabet": alphabet,
+        "passthrough": passthrough,
+        "classes": {KEY_CLASS: key, ALPHA_CLASS: alphabet},
+    }
+    if 'x' in sigma:
+        keys["wildcards"] = ["*"]
+    return keys
+
+
+def generate_encrypt_mt(alphabet: str = LETTERS, passthrough: str = " "):
+    """
+    Genera la MT de encriptación
+    
+    Args:
+        alphabet: Letras que se desplazan, en orden
+        passthrough: Caracteres que se copian sin desplazar
+    """
     
     mt = {
         "description": "Máquina de Turing de 4 cintas para Cifrado César - Encriptación",
@@ -17,15 +86,14 @@ def generate_encrypt_mt():
             "q_rewind_tape2", "q_rewind_tape4",
             "q_find_wrap_to_A", "q_wrap_forward_to_A", "q_accept"
         ],
-        "Sigma": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789# "),
-        "Gamma": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789# |_"),
+        **symbol_keys(alphabet, passthrough),
         "num_tapes": 4,
         "q0": "q0",
         "F": ["q_accept"],
         "delta": {}
     }
     
-    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    letters = alphabet
     
     # Estado q0: inicio - mover cabezal de cinta 2 al primer |
     mt["delta"]["q0"] = {
@@ -34,73 +102,71 @@ def generate_encrypt_mt():
     
     # Estado q_skip_key: saltar la llave hasta encontrar #
     mt["delta"]["q_skip_key"] = {
-        "#,*,*,*": {"write": ["#", "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_process_char"}
+        "#,*,*,*": {"write": ["#", "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_process_char"},
+        f"{KEY_CLASS},*,*,*": {"write": ["*", "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_skip_key"}
     }
-    for c in letters + "0123456789":
-        mt["delta"]["q_skip_key"][f"{c},*,*,*"] = {
-            "write": [c, "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_skip_key"
-        }
     
     # Estado q_process_char: procesar siguiente carácter
     mt["delta"]["q_process_char"] = {
-        "_,*,*,*": {"write": ["_", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_accept"},
-        " ,*,*,*": {"write": [" ", "*", " ", "*"], "move": ["R", "S", "R", "S"], "next_state": "q_process_char"}
+        "_,*,*,*": {"write": ["_", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_accept"}
     }
-    for letter in letters:
-        mt["delta"]["q_process_char"][f"{letter},*,*,*"] = {
-            "write": [letter, "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_in_alphabet"
+    for c in passthrough:
+        mt["delta"]["q_process_char"][f"{c},*,*,*"] = {
+            "write": [c, "*", c, "*"], "move": ["R", "S", "R", "S"], "next_state": "q_process_char"
         }
+    mt["delta"]["q_process_char"][f"{ALPHA_CLASS},*,*,*"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_in_alphabet"
+    }
     
     # Estado q_find_in_alphabet: encontrar letra actual en alfabeto de cinta 4
+    # (solo la comparación con la letra es por letra; lo demás vale para todas)
     mt["delta"]["q_find_in_alphabet"] = {}
     for letter in letters:
         mt["delta"]["q_find_in_alphabet"][f"{letter},*,*,{letter}"] = {
             "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_count_shift"
         }
-        mt["delta"]["q_find_in_alphabet"][f"{letter},*,*,_"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_wrap_to_A"
-        }
-        mt["delta"]["q_find_in_alphabet"][f"{letter},*,*,*"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_find_in_alphabet"
-        }
-
+    mt["delta"]["q_find_in_alphabet"][f"{ALPHA_CLASS},*,*,_"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_wrap_to_A"
+    }
+    mt["delta"]["q_find_in_alphabet"][f"{ALPHA_CLASS},*,*,*"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_find_in_alphabet"
+    }
+    
     # Estado auxiliar: al buscar y llegar al final del alfabeto, rebobinar hasta 'A'
     mt["delta"]["q_find_wrap_to_A"] = {}
     mt["delta"]["q_find_wrap_to_A"]["*,*,*,_"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_find_wrap_to_A"
     }
-    for letter in letters[1:]:
-        mt["delta"]["q_find_wrap_to_A"][f"*,*,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_find_wrap_to_A"
-        }
-    mt["delta"]["q_find_wrap_to_A"]["*,*,*,A"] = {
+    mt["delta"]["q_find_wrap_to_A"][f"*,*,*,{letters[0]}"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_in_alphabet"
     }
+    mt["delta"]["q_find_wrap_to_A"][f"*,*,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_find_wrap_to_A"
+    }
     
     # Estado q_count_shift: contar | y avanzar en alfabeto SIN consumir los |
     mt["delta"]["q_count_shift"] = {
         "*,_,*,*": {"write": ["*", "*", "*", "*"], "move": ["S", "L", "S", "S"], "next_state": "q_read_shifted"}
     }
-    for letter in letters[:-1]:  # Todas excepto Z
-        mt["delta"]["q_count_shift"][f"*,|,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "R", "S", "R"], "next_state": "q_count_shift"
-        }
-    mt["delta"]["q_count_shift"]["*,|,*,Z"] = {
+    mt["delta"]["q_count_shift"][f"*,|,*,{letters[-1]}"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "R", "S", "S"], "next_state": "q_wrap_forward_to_A"
     }
-
+    # Todas excepto la última
+    mt["delta"]["q_count_shift"][f"*,|,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "R", "S", "R"], "next_state": "q_count_shift"
+    }
+    
     # Estado auxiliar: al desbordar en Z, rebobinar hasta A para lograr wrap-around
     mt["delta"]["q_wrap_forward_to_A"] = {}
     mt["delta"]["q_wrap_forward_to_A"]["*,*,*,_"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_wrap_forward_to_A"
     }
-    for letter in letters[1:]:
-        mt["delta"]["q_wrap_forward_to_A"][f"*,*,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_wrap_forward_to_A"
-        }
-    mt["delta"]["q_wrap_forward_to_A"]["*,*,*,A"] = {
+    mt["delta"]["q_wrap_forward_to_A"][f"*,*,*,{letters[0]}"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_count_shift"
     }
+    mt["delta"]["q_wrap_forward_to_A"][f"*,*,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_wrap_forward_to_A"
+    }
     
     # Estado q_read_shifted: leer letra desplazada
     mt["delta"]["q_read_shifted"] = {}
@@ -119,12 +185,12 @@ def generate_encrypt_mt():
     
     # Estado q_rewind_tape4: rebobinar cinta 4 al inicio del alfabeto
     mt["delta"]["q_rewind_tape4"] = {
-        "*,*,*,A": {"write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_process_char"}
+        f"*,*,*,{letters[0]}": {"write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_process_char"}
+    }
+    # Las demás letras (la primera ya está manejada arriba)
+    mt["delta"]["q_rewind_tape4"][f"*,*,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_rewind_tape4"
     }
-    for letter in letters[1:]:  # Saltar 'A' que ya está manejada arriba
-        mt["delta"]["q_rewind_tape4"][f"*,*,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_rewind_tape4"
-        }
     mt["delta"]["q_rewind_tape4"]["*,*,*,_"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_process_char"
     }
@@ -132,8 +198,14 @@ def generate_encrypt_mt():
     return mt
 
 
-def generate_decrypt_mt():
-    """Genera la MT de desencriptación"""
+def generate_decrypt_mt(alphabet: str = LETTERS, passthrough: str = " "):
+    """
+    Genera la MT de desencriptación
+    
+    Args:
+        alphabet: Letras que se desplazan, en orden
+        passthrough: Caracteres que se copian sin desplazar
+    """
     
     mt = {
         "description": "Máquina de Turing de 4 cintas para Cifrado César - Desencriptación",
@@ -143,15 +215,14 @@ def generate_decrypt_mt():
             "q_read_shifted", "q_rewind_tape2", "q_find_marker_or_pipe", "q_rewind_tape4",
             "q_find_wrap_to_A", "q_wrap_backward_to_Z_scan", "q_wrap_backward_to_Z_finish", "q_accept"
         ],
-        "Sigma": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789# "),
-        "Gamma": list("ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789# |_"),
+        **symbol_keys(alphabet, passthrough),
         "num_tapes": 4,
         "q0": "q0",
         "F": ["q_accept"],
         "delta": {}
     }
     
-    letters = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+    letters = alphabet
     
     # Estado q0: inicio - mover cabezal de cinta 2 al primer |
     mt["delta"]["q0"] = {
@@ -160,22 +231,21 @@ def generate_decrypt_mt():
     
     # Estado q_skip_key: saltar la llave hasta encontrar #
     mt["delta"]["q_skip_key"] = {
-        "#,*,*,*": {"write": ["#", "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_process_char"}
+        "#,*,*,*": {"write": ["#", "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_process_char"},
+        f"{KEY_CLASS},*,*,*": {"write": ["*", "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_skip_key"}
     }
-    for c in letters + "0123456789":
-        mt["delta"]["q_skip_key"][f"{c},*,*,*"] = {
-            "write": [c, "*", "*", "*"], "move": ["R", "S", "S", "S"], "next_state": "q_skip_key"
-        }
     
     # Estado q_process_char: procesar siguiente carácter
     mt["delta"]["q_process_char"] = {
-        "_,*,*,*": {"write": ["_", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_accept"},
-        " ,*,*,*": {"write": [" ", "*", " ", "*"], "move": ["R", "S", "R", "S"], "next_state": "q_process_char"}
+        "_,*,*,*": {"write": ["_", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_accept"}
     }
-    for letter in letters:
-        mt["delta"]["q_process_char"][f"{letter},*,*,*"] = {
-            "write": [letter, "*", "*", "*"], "move": ["S", "L", "S", "R"], "next_state": "q_prepare_counter"
+    for c in passthrough:
+        mt["delta"]["q_process_char"][f"{c},*,*,*"] = {
+            "write": [c, "*", c, "*"], "move": ["R", "S", "R", "S"], "next_state": "q_process_char"
         }
+    mt["delta"]["q_process_char"][f"{ALPHA_CLASS},*,*,*"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "L", "S", "R"], "next_state": "q_prepare_counter"
+    }
     
     # Estado q_prepare_counter: ir al marcador _ inicial de cinta 2
     mt["delta"]["q_prepare_counter"] = {
@@ -195,51 +265,48 @@ def generate_decrypt_mt():
         mt["delta"]["q_find_in_alphabet"][f"{letter},_,*,{letter}"] = {
             "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_read_shifted"
         }
-        # Si no es la letra correcta, avanzar en el alfabeto
-        mt["delta"]["q_find_in_alphabet"][f"{letter},*,*,_"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_wrap_to_A"
-        }
-        mt["delta"]["q_find_in_alphabet"][f"{letter},*,*,*"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_find_in_alphabet"
-        }
-
+    # Si no es la letra correcta, avanzar en el alfabeto
+    mt["delta"]["q_find_in_alphabet"][f"{ALPHA_CLASS},*,*,_"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_wrap_to_A"
+    }
+    mt["delta"]["q_find_in_alphabet"][f"{ALPHA_CLASS},*,*,*"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_find_in_alphabet"
+    }
+    
     # Estado auxiliar: rebobinar alfabeto al encontrar blancos
     mt["delta"]["q_find_wrap_to_A"] = {}
     mt["delta"]["q_find_wrap_to_A"]["*,*,*,_"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_find_wrap_to_A"
     }
-    for letter in letters[1:]:
-        mt["delta"]["q_find_wrap_to_A"][f"*,*,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_find_wrap_to_A"
-        }
-    mt["delta"]["q_find_wrap_to_A"]["*,*,*,A"] = {
+    mt["delta"]["q_find_wrap_to_A"][f"*,*,*,{letters[0]}"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_find_in_alphabet"
     }
+    mt["delta"]["q_find_wrap_to_A"][f"*,*,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_find_wrap_to_A"
+    }
     
     # Estado q_check_counter: verificar si quedan más | para contar (SIN consumir)
     mt["delta"]["q_check_counter"] = {
         # Si llegamos al marcador _, leer la letra actual del alfabeto
         "*,_,*,*": {"write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_read_shifted"}
     }
-    for letter in letters[1:]:
-        mt["delta"]["q_check_counter"][f"*,|,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "R", "S", "L"], "next_state": "q_check_counter"
-        }
-    mt["delta"]["q_check_counter"]["*,|,*,A"] = {
+    mt["delta"]["q_check_counter"][f"*,|,*,{letters[0]}"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "R", "S", "S"], "next_state": "q_wrap_backward_to_Z_scan"
     }
-
+    mt["delta"]["q_check_counter"][f"*,|,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "R", "S", "L"], "next_state": "q_check_counter"
+    }
+    
     # Estados auxiliares: wrap hacia 'Z' cuando se intenta retroceder desde 'A'
     mt["delta"]["q_wrap_backward_to_Z_scan"] = {}
-    for letter in letters:
-        mt["delta"]["q_wrap_backward_to_Z_scan"][f"*,*,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_wrap_backward_to_Z_scan"
-        }
+    mt["delta"]["q_wrap_backward_to_Z_scan"][f"*,*,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_wrap_backward_to_Z_scan"
+    }
     mt["delta"]["q_wrap_backward_to_Z_scan"]["*,*,*,_"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_wrap_backward_to_Z_finish"
     }
     mt["delta"]["q_wrap_backward_to_Z_finish"] = {
-        "*,*,*,Z": {"write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_check_counter"}
+        f"*,*,*,{letters[-1]}": {"write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_check_counter"}
     }
     
     # Estado q_read_shifted: leer letra desplazada y escribir en cinta 3
@@ -270,12 +337,12 @@ def generate_decrypt_mt():
     
     # Estado q_rewind_tape4: rebobinar alfabeto
     mt["delta"]["q_rewind_tape4"] = {
-        "*,*,*,A": {"write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_process_char"}
+        f"*,*,*,{letters[0]}": {"write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "S"], "next_state": "q_process_char"}
+    }
+    # Las demás letras (la primera ya está manejada arriba)
+    mt["delta"]["q_rewind_tape4"][f"*,*,*,{ALPHA_CLASS}"] = {
+        "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_rewind_tape4"
     }
-    for letter in letters[1:]:  # Saltar 'A' que ya está manejada arriba
-        mt["delta"]["q_rewind_tape4"][f"*,*,*,{letter}"] = {
-            "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "L"], "next_state": "q_rewind_tape4"
-        }
     mt["delta"]["q_rewind_tape4"]["*,*,*,_"] = {
         "write": ["*", "*", "*", "*"], "move": ["S", "S", "S", "R"], "next_state": "q_process_char"
     }
@@ -283,23 +350,475 @@ def generate_decrypt_mt():
     return mt
 
 
+# Sentido opuesto de cada movimiento
+OPPOSITE = {'R': 'L', 'L': 'R'}
+
+
+def _rule(write: list, move: list, next_state: str) -> dict:
+    """Transición con el formato del JSON"""
+    return {"write": write, "move": move, "next_state": next_state}
+
+
+def _new_machine(mode: str, design: str, alphabet: str = LETTERS, passthrough: str = " ") -> dict:
+    """
+    Esqueleto común de las MT de cifrado: cintas, alfabetos y el prólogo
+    
+    El prólogo es el de la versión clásica (q0 y q_skip_key); al encontrar
+    el # pasa a q_extend_alphabet, que agrega una segunda copia del
+    alfabeto al final de la cinta 4 ('A'..'Z' escrito desde el control
+    finito). Así la cinta 4 queda 'AB..ZAB..Z' sin cambiar el formato de
+    entrada, y ningún conteo de hasta 25 posiciones se sale del alfabeto.
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        design: Nombre del diseño (para la descripción)
+        alphabet: Letras que se desplazan, en orden
+        passthrough: Caracteres que se copian sin desplazar
+        
+    Returns:
+        Diccionario de la MT con el prólogo ya definido; el último estado de
+        la copia (q_append_ y la última letra, q_append_Z) queda sin
+        transiciones
+    """
+    action = "Encriptación" if mode == 'encrypt' else "Desencriptación"
+    mt = {
+        "description": f"Máquina de Turing de 4 cintas para Cifrado César - {action} ({design})",
+        "Q": [],
+        **symbol_keys(alphabet, passthrough),
+        "num_tapes": 4,
+        "q0": "q0",
+        "F": ["q_accept"],
+        "delta": {}
+    }
+    delta = mt["delta"]
+    
+    delta["q0"] = {
+        "*,_,*,*": _rule(["*", "*", "*", "*"], ["R", "R", "S", "S"], "q_skip_key")
+    }
+    delta["q_skip_key"] = {
+        "#,*,*,*": _rule(["#", "*", "*", "*"], ["R", "S", "S", "S"], "q_extend_alphabet"),
+        f"{KEY_CLASS},*,*,*": _rule(["*", "*", "*", "*"], ["R", "S", "S", "S"], "q_skip_key")
+    }
+    
+    # Llegar al final del alfabeto y escribir la segunda copia letra por letra
+    delta["q_extend_alphabet"] = {
+        "*,*,*,_": _rule(["*", "*", "*", alphabet[0]], ["S", "S", "S", "R"], f"q_append_{alphabet[1]}"),
+        "*,*,*,*": _rule(["*", "*", "*", "*"], ["S", "S", "S", "R"], "q_extend_alphabet")
+    }
+    for previous, letter in zip(alphabet[1:-1], alphabet[2:]):
+        delta[f"q_append_{previous}"] = {
+            "*,*,*,*": _rule(["*", "*", "*", previous], ["S", "S", "S", "R"], f"q_append_{letter}")
+        }
+    return mt
+
+
+def _finish_machine(mt: dict) -> dict:
+    """Completa Q con los estados usados en delta y el de aceptación"""
+    mt["Q"] = list(mt["delta"]) + ["q_accept"]
+    return mt
+
+
+def _orientation(mode: str, alphabet: str = LETTERS) -> tuple:
+    """
+    Sentidos de una MT sobre el alfabeto doble de la cinta 4
+    
+    La copia 'propia' es donde se buscan las letras del mensaje: la primera
+    al encriptar (se cuenta hacia la derecha) y la segunda al desencriptar
+    (se cuenta hacia la izquierda). Al contar se puede pasar a la otra
+    copia, y un estado distinto (_away) recuerda en cuál está el cabezal.
+    
+    Returns:
+        Tupla (avance, retroceso, primera, última): el sentido del conteo,
+        el contrario, la letra del borde exterior de la copia propia y la
+        del borde que se cruza al contar
+    """
+    if mode == 'encrypt':
+        return 'R', 'L', alphabet[0], alphabet[-1]
+    return 'L', 'R', alphabet[-1], alphabet[0]
+
+
+def generate_doubled_mt(mode: str, alphabet: str = LETTERS, passthrough: str = " ") -> dict:
+    """
+    Genera la MT de un modo con alfabeto doble en la cinta 4
+    
+    Sigue los pasos de la versión clásica sin estados de wrap-around: la
+    búsqueda parte del borde de la copia propia y el conteo puede seguir
+    en la segunda copia. Además las dos cintas se rebobinan a la vez.
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        alphabet: Letras que se desplazan, en orden
+        passthrough: Caracteres que se copian sin desplazar
+    """
+    mt = _new_machine(mode, "doubled", alphabet, passthrough)
+    delta = mt["delta"]
+    forward, back, first, last = _orientation(mode, alphabet)
+    
+    # La segunda copia termina con el cabezal sobre su Z: al encriptar está
+    # en la otra copia, al desencriptar en el borde de la propia
+    delta[f"q_append_{alphabet[-1]}"] = {
+        "*,*,*,*": _rule(["*", "*", "*", alphabet[-1]], ["S", "S", "S", "S"],
+                         "q_rewind_tape4_away" if mode == 'encrypt' else "q_rewind_tape4")
+    }
+    
+    # Procesar y buscar en un solo estado: el cabezal de cinta 4 parte del
+    # borde de la copia propia y avanza hasta la letra del mensaje
+    delta["q_process_char"] = {
+        "_,*,*,*": _rule(["_", "*", "*", "*"], ["S", "S", "S", "S"], "q_accept")
+    }
+    for c in passthrough:
+        delta["q_process_char"][f"{c},*,*,*"] = _rule([c, "*", c, "*"], ["R", "S", "R", "S"], "q_process_char")
+    for letter in alphabet:
+        delta["q_process_char"][f"{letter},*,*,{letter}"] = _rule(
+            ["*", "*", "*", "*"], ["S", "S", "S", "S"], "q_count_shift")
+    delta["q_process_char"][f"{ALPHA_CLASS},*,*,*"] = _rule(
+        ["*", "*", "*", "*"], ["S", "S", "S", forward], "q_process_char")
+    
+    # Contar los | avanzando en el alfabeto; el _ del final escribe la letra
+    # desplazada y deja el cabezal de cinta 2 sobre el último |
+    for suffix, rewind in (("", "q_rewind"), ("_away", "q_rewind_away")):
+        state = f"q_count_shift{suffix}"
+        delta[state] = {}
+        if not suffix:
+            delta[state][f"*,|,*,{last}"] = _rule(
+                ["*", "*", "*", "*"], ["S", "R", "S", forward], "q_count_shift_away")
+        delta[state]["*,|,*,*"] = _rule(["*", "*", "*", "*"], ["S", "R", "S", forward], state)
+        for letter in alphabet:
+            delta[state][f"*,_,*,{letter}"] = _rule(["*", "*", letter, "*"], ["R", "L", "R", "S"], rewind)
+    
+    # Rebobinar a la vez la cinta 2 (hasta el marcador) y la cinta 4 (hasta
+    # el borde de la copia propia); cuando una termina sigue la otra sola
+    for suffix in ("", "_away"):
+        state = f"q_rewind{suffix}"
+        if not suffix:
+            delta[state] = {
+                f"*,|,*,{first}": _rule(["*", "*", "*", "*"], ["S", "L", "S", "S"], "q_rewind_tape2"),
+                f"*,_,*,{first}": _rule(["*", "*", "*", "*"], ["S", "R", "S", "S"], "q_process_char"),
+            }
+        else:
+            delta[state] = {
+                f"*,|,*,{first}": _rule(["*", "*", "*", "*"], ["S", "L", "S", back], "q_rewind"),
+                f"*,_,*,{first}": _rule(["*", "*", "*", "*"], ["S", "R", "S", back], "q_rewind_tape4"),
+            }
+        delta[state]["*,|,*,*"] = _rule(["*", "*", "*", "*"], ["S", "L", "S", back], state)
+        delta[state]["*,_,*,*"] = _rule(["*", "*", "*", "*"], ["S", "R", "S", back], f"q_rewind_tape4{suffix}")
+    
+    delta["q_rewind_tape4"] = {
+        f"*,*,*,{first}": _rule(["*", "*", "*", "*"], ["S", "S", "S", "S"], "q_process_char"),
+        "*,*,*,*": _rule(["*", "*", "*", "*"], ["S", "S", "S", back], "q_rewind_tape4")
+    }
+    delta["q_rewind_tape4_away"] = {
+        f"*,*,*,{first}": _rule(["*", "*", "*", "*"], ["S", "S", "S", back], "q_rewind_tape4"),
+        "*,*,*,*": _rule(["*", "*", "*", "*"], ["S", "S", "S", back], "q_rewind_tape4_away")
+    }
+    delta["q_rewind_tape2"] = {
+        "*,|,*,*": _rule(["*", "*", "*", "*"], ["S", "L", "S", "S"], "q_rewind_tape2"),
+        "*,_,*,*": _rule(["*", "*", "*", "*"], ["S", "R", "S", "S"], "q_process_char")
+    }
+    return _finish_machine(mt)
+
+
+def generate_bidirectional_mt(mode: str, alphabet: str = LETTERS, passthrough: str = " ") -> dict:
+    """
+    Genera la MT de un modo con alfabeto doble y conteo en ambos sentidos
+    
+    No rebobina ninguna cinta: la cinta 2 se recorre hacia la derecha en un
+    carácter y hacia la izquierda en el siguiente (los estados _up y _down),
+    y la cinta 4 busca la siguiente letra desde donde quedó, comparándola
+    con la del mensaje para elegir el sentido. Cada letra cuesta la
+    distancia a la anterior en el alfabeto más la llave, más dos pasos.
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        alphabet: Letras que se desplazan, en orden
+        passthrough: Caracteres que se copian sin desplazar
+    """
+    mt = _new_machine(mode, "bidirectional", alphabet, passthrough)
+    delta = mt["delta"]
+    forward, back, first, last = _orientation(mode, alphabet)
+    flip = {'up': 'down', 'down': 'up'}
+    tape2 = {'up': 'R', 'down': 'L'}
+    
+    # Clase de las letras anteriores a cada una: si la cinta 4 tiene una de
+    # ellas, la letra buscada está a la derecha
+    for index, letter in enumerate(alphabet[1:], 1):
+        mt["classes"][f"ANTES_{letter}"] = alphabet[:index]
+    
+    # La segunda copia termina con el cabezal sobre su Z y empieza la
+    # búsqueda del primer carácter desde ahí
+    delta[f"q_append_{alphabet[-1]}"] = {
+        "*,*,*,*": _rule(["*", "*", "*", alphabet[-1]], ["S", "S", "S", "S"],
+                         "q_scan_up_away" if mode == 'encrypt' else "q_scan_up")
+    }
+    
+    for parity in ('up', 'down'):
+        count = f"q_count_{parity}"
+        scan = f"q_scan_{parity}"
+        following = f"q_scan_{flip[parity]}"
+        
+        # Buscar en la copia propia moviéndose hacia la letra del mensaje;
+        # al encontrarla se cuenta el primer | en el mismo paso
+        delta[scan] = {
+            "_,*,*,*": _rule(["_", "*", "*", "*"], ["S", "S", "S", "S"], "q_accept")
+        }
+        for c in passthrough:
+            delta[scan][f"{c},*,*,*"] = _rule([c, "*", c, "*"], ["R", "S", "R", "S"], scan)
+        for letter in alphabet:
+            delta[scan][f"{letter},|,*,{letter}"] = _rule(
+                ["*", "*", "*", "*"], ["S", tape2[parity], "S", forward],
+                f"{count}_away" if letter == last else count)
+            delta[scan][f"{letter},_,*,{letter}"] = _rule(
+                ["*", "*", letter, "*"], ["R", OPPOSITE[tape2[parity]], "R", "S"], following)
+            if letter != alphabet[0]:
+                delta[scan][f"{letter},*,*,ANTES_{letter}"] = _rule(
+                    ["*", "*", "*", "*"], ["S", "S", "S", "R"], scan)
+            delta[scan][f"{letter},*,*,{ALPHA_CLASS}"] = _rule(
+                ["*", "*", "*", "*"], ["S", "S", "S", "L"], scan)
+        
+        # Fuera de la copia propia solo se puede volver hacia ella
+        delta[f"{scan}_away"] = {
+            "_,*,*,*": _rule(["_", "*", "*", "*"], ["S", "S", "S", "S"], "q_accept")
+        }
+        for c in passthrough:
+            delta[f"{scan}_away"][f"{c},*,*,*"] = _rule([c, "*", c, "*"], ["R", "S", "R", "S"], f"{scan}_away")
+        delta[f"{scan}_away"][f"*,*,*,{first}"] = _rule(["*", "*", "*", "*"], ["S", "S", "S", back], scan)
+        delta[f"{scan}_away"]["*,*,*,*"] = _rule(["*", "*", "*", "*"], ["S", "S", "S", back], f"{scan}_away")
+        
+        # Contar los | en el sentido de la paridad; el blanco del extremo
+        # escribe la letra desplazada y deja el cabezal de cinta 2 sobre el
+        # primer símbolo del recorrido contrario
+        for suffix in ("", "_away"):
+            state = f"{count}{suffix}"
+            delta[state] = {}
+            if not suffix:
+                delta[state][f"*,|,*,{last}"] = _rule(
+                    ["*", "*", "*", "*"], ["S", tape2[parity], "S", forward], f"{count}_away")
+            delta[state]["*,|,*,*"] = _rule(["*", "*", "*", "*"], ["S", tape2[parity], "S", forward], state)
+            for letter in alphabet:
+                delta[state][f"*,_,*,{letter}"] = _rule(
+                    ["*", "*", letter, "*"], ["R", OPPOSITE[tape2[parity]], "R", "S"], f"{following}{suffix}")
+    return _finish_machine(mt)
+
+
+# Generador de cada archivo JSON (usado también para regenerar los que falten)
+GENERATORS = {
+    'encrypt.json': generate_encrypt_mt,
+    'decrypt.json': generate_decrypt_mt,
+}
+
+# Diseños disponibles: generador de cada modo. 'classic' es el de
+# GENERATORS; los otros usan el alfabeto doble en la cinta 4
+DESIGNS = {
+    'classic': {'encrypt': generate_encrypt_mt, 'decrypt': generate_decrypt_mt},
+    'doubled': {'encrypt': partial(generate_doubled_mt, 'encrypt'),
+                'decrypt': partial(generate_doubled_mt, 'decrypt')},
+    'bidirectional': {'encrypt': partial(generate_bidirectional_mt, 'encrypt'),
+                      'decrypt': partial(generate_bidirectional_mt, 'decrypt')},
+}
+
+
+def measure_complexity(mt: dict) -> dict:
+    """
+    Mide el perfil de complejidad de una MT de cifrado
+    
+    Prueba cada símbolo del mensaje con todas las llaves (una por letra del
+    alfabeto, 26 con el de siempre); el perfil acota los
+    pasos como base + per_symbol * largo del input y se usa para derivar el
+    límite de pasos de cada ejecución (ver budget.py).
+    
+    Args:
+        mt: Diccionario con la definición de la MT
+        
+    Returns:
+        Diccionario {'base', 'per_symbol'}
+    """
+    from turing import TuringMachine
+    from budget import calibrate
+    
+    machine = TuringMachine(mt)
+    alphabet = mt.get('alphabet', LETTERS)
+    
+    def run_steps(record: str) -> int:
+        tapes = prepare_tapes(record, alphabet)
+        tm = machine.spawn()
+        tm.load_input(tapes[0], tapes)
+        tm._run_loop(10 ** 7)
+        return tm.steps
+    
+    symbols = list(alphabet + mt.get('passthrough', ' '))
+    return calibrate(run_steps, symbols, [f"{key}#" for key in range(len(alphabet))])
+
+
+def write_machine(mt: dict, json_file: str):
+    """
+    Escribe la definición de una MT como JSON, con su perfil de complejidad
+    
+    Args:
+        mt: Diccionario con la definición de la MT
+        json_file: Ruta del archivo de salida
+    """
+    if 'complexity' not in mt:
+        mt['complexity'] = measure_complexity(mt)
+    with open(json_file, 'w', encoding='utf-8') as f:
+        json.dump(mt, f, indent=2, ensure_ascii=False)
+
+
+def caesar(message: str, shift: int, alphabet: str = LETTERS) -> str:
+    """Cifrado César de referencia (las letras se desplazan, el resto queda igual)"""
+    if alphabet == alphabet.upper():
+        message = message.upper()
+    return ''.join(alphabet[(alphabet.index(c) + shift) % len(alphabet)] if c in alphabet else c
+                   for c in message)
+
+
+def report_cases(path: str = 'tests.txt') -> List[Tuple[str, str]]:
+    """
+    Casos (llave, mensaje) para comparar diseños
+    
+    Los mensajes de tests.txt más el alfabeto completo, de ida y de vuelta,
+    con cada una de las 26 llaves.
+    """
+    cases = []
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#') or '→' not in line:
+                    continue
+                key, _, message = line.split('→')[0].strip().partition('#')
+                cases.append((key, message))
+    except FileNotFoundError:
+        pass
+    for key in range(26):
+        cases.append((str(key), f"{LETTERS} {LETTERS[::-1]}"))
+    return cases
+
+
+def measure_design(mt: dict, mode: str, cases: List[Tuple[str, str]]) -> Dict[str, float]:
+    """
+    Mide los pasos por carácter de una MT y verifica sus resultados
+    
+    Los pasos por carácter son los de cada caso menos los del mismo caso
+    con el mensaje vacío (prólogo y aceptación), divididos entre el largo
+    del mensaje.
+    
+    Args:
+        mt: Diccionario con la definición de la MT
+        mode: 'encrypt' o 'decrypt'
+        cases: Pares (llave, mensaje en claro)
+        
+    Returns:
+        Diccionario {'per_char', 'errors', 'cases'}
+    """
+    from turing import TuringMachine, ACCEPT
+    
+    machine = TuringMachine(mt)
+    alphabet = mt.get('alphabet', LETTERS)
+    
+    def run(record: str) -> Tuple[Optional[str], int]:
+        tapes = prepare_tapes(record, alphabet)
+        tm = machine.spawn()
+        tm.load_input(tapes[0], tapes)
+        status = tm.run_guarded(10 ** 7, detect_cycles=False)
+        return (tm.get_tape_content(2) if status == ACCEPT else None), tm.steps
+    
+    errors = 0
+    steps = 0
+    chars = 0
+    for key, message in cases:
+        shift = len(prepare_tape_2_unary(key, alphabet)) - 1
+        plain = message.upper() if alphabet == alphabet.upper() else message
+        cipher = caesar(plain, shift, alphabet)
+        source, expected = (plain, cipher) if mode == 'encrypt' else (cipher, plain)
+        result, total = run(f"{key}#{source}")
+        if result != expected:
+            errors += 1
+        steps += total - run(f"{key}#")[1]
+        chars += len(source)
+    return {'per_char': steps / max(chars, 1), 'errors': errors, 'cases': len(cases)}
+
+
+def report_designs(designs: Optional[List[str]] = None, path: str = 'tests.txt') -> str:
+    """
+    Tabla comparativa de los diseños: tamaño, pasos por carácter y errores
+    
+    Args:
+        designs: Nombres de los diseños (por defecto todos)
+        path: Archivo de pruebas con los mensajes a medir
+        
+    Returns:
+        Texto de la tabla
+    """
+    cases = report_cases(path)
+    lines = [f"{'Diseño':<15} {'Modo':<8} {'Estados':>8} {'Transiciones':>13} "
+             f"{'Pasos/car.':>11} {'Peor/car.':>10} {'Errores':>9}"]
+    for design in designs or list(DESIGNS):
+        for mode, generate in DESIGNS[design].items():
+            mt = generate()
+            rules = sum(len(patterns) for patterns in mt['delta'].values())
+            result = measure_design(mt, mode, cases)
+            worst = measure_complexity(mt)['per_symbol']
+            lines.append(f"{design:<15} {mode:<8} {len(mt['Q']):>8} {rules:>13} "
+                         f"{result['per_char']:>11.1f} {worst:>10} "
+                         f"{str(result['errors']) + '/' + str(result['cases']):>9}")
+    return "\n".join(lines)
+
+
 def main():
-    """Genera ambos archivos JSON"""
+    """
+    Genera ambos archivos JSON
+    
+    Opciones:
+        --design=NOMBRE: Diseño de las MT (classic, doubled, bidirectional)
+        --report: Solo imprime la comparación de los diseños
+        --key=LLAVE: Genera las MT especializadas en esa llave
+            (encrypt.kN.json y decrypt.kN.json, ver specialize.py)
+        --alphabet=LETRAS: Letras que se desplazan, en orden (por defecto A-Z;
+            si tiene minúsculas el mensaje no se pasa a mayúsculas)
+        --passthrough=CARACTERES: Caracteres que se copian sin desplazar
+            (por defecto el espacio)
+    """
+    options = dict(arg[2:].partition('=')[::2] for arg in sys.argv[1:] if arg.startswith('--'))
+    design = options.get('design') or 'classic'
+    if design not in DESIGNS:
+        print(f" Diseño desconocido: {design} (opciones: {', '.join(DESIGNS)})")
+        sys.exit(1)
+    symbols = {
+        'alphabet': options.get('alphabet') or LETTERS,
+        'passthrough': options['passthrough'] if 'passthrough' in options else ' ',
+    }
+    try:
+        symbol_keys(**symbols)
+    except ValueError as e:
+        print(f" {e}")
+        sys.exit(1)
+    
+    if 'report' in options:
+        print(report_designs([design] if options.get('design') else None))
+        return
+    
+    if options.get('key'):
+        from specialize import specialize_machine
+        key_tape = prepare_tape_2_unary(options['key'], symbols['alphabet'])
+        for mode, generate in DESIGNS[design].items():
+            json_file = f"{mode}.k{len(key_tape) - 1}.json"
+            mt = specialize_machine(generate(**symbols), key_tape)
+            write_machine(mt, json_file)
+            print(f" {json_file} generado ({len(mt['delta'])} estados con transiciones)")
+        return
     
-    print("Generando Máquinas de Turing...")
+    print(f"Generando Máquinas de Turing (diseño {design})...")
     
     # Generar MT de encriptación
     print("\n Generando encrypt.json...")
-    encrypt_mt = generate_encrypt_mt()
-    with open('encrypt.json', 'w', encoding='utf-8') as f:
-        json.dump(encrypt_mt, f, indent=2, ensure_ascii=False)
+    encrypt_mt = DESIGNS[design]['encrypt'](**symbols)
+    write_machine(encrypt_mt, 'encrypt.json')
     print(f" encrypt.json generado ({len(encrypt_mt['delta'])} estados con transiciones)")
     
     # Generar MT de desencriptación
     print("\n📝 Generando decrypt.json...")
-    decrypt_mt = generate_decrypt_mt()
-    with open('decrypt.json', 'w', encoding='utf-8') as f:
-        json.dump(decrypt_mt, f, indent=2, ensure_ascii=False)
+    decrypt_mt = DESIGNS[design]['decrypt'](**symbols)
+    write_machine(decrypt_mt, 'decrypt.json')
     print(f" decrypt.json generado ({len(decrypt_mt['delta'])} estados con transiciones)")
     
     print("\n🎉 ¡Archivos JSON generados exitosamente!")
@@ -308,4 +827,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
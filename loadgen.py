@@ -0,0 +1,114 @@
+"""
+Generador de carga para el servicio de Máquinas de Turing
+Abre varias conexiones, envía registros en pipeline y reporta el
+rendimiento, las latencias vistas por el cliente y las métricas del servicio
+
+Uso:
+    python main.py serve --workers=4 &
+    python loadgen.py [--connections=8] [--requests=2000] [--length=20]
+                      [--mode=encrypt] [--batch=1] [--window=32]
+                      [--socket=RUTA | --host=127.0.0.1 --port=8765]
+"""
+
+import random
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+from main import parse_options
+from bench import make_message
+from service import ServiceClient, LatencyHistogram, _address
+
+
+def make_records(count: int, length: int, seed: int = 0) -> List[str]:
+    """Registros LLAVE#MENSAJE reproducibles con llaves de 0 a 25"""
+    rng = random.Random(seed)
+    return [f"{rng.randrange(26)}#{make_message(length, seed + i)}" for i in range(count)]
+
+
+def _worker(options: Dict[str, str], mode: str, records: List[str], batch: int, window: int,
+            histogram: LatencyHistogram, lock: threading.Lock, totals: Dict[str, int]):
+    """Envía los registros por una conexión y mide la latencia de cada petición"""
+    sent = deque()
+    
+    def requests():
+        for start in range(0, len(records), batch):
+            chunk = records[start:start + batch]
+            sent.append(time.perf_counter())
+            yield {'op': mode, 'inputs': chunk} if batch > 1 else {'op': mode, 'input': chunk[0]}
+    
+    latencies = []
+    accepted = errors = 0
+    with ServiceClient(**_address(options)) as client:
+        for response in client.pipeline(requests(), window):
+            latencies.append(time.perf_counter() - sent.popleft())
+            for result in response.get('results', [response]):
+                accepted += bool(result.get('accepted'))
+                errors += 'error' in result
+    
+    with lock:
+        for latency in latencies:
+            histogram.record(latency)
+        totals['accepted'] += accepted
+        totals['errors'] += errors
+
+
+def run_load(options: Dict[str, str]) -> int:
+    """
+    Ejecuta la carga y la reporta
+    
+    Args:
+        options: Opciones de la línea de comandos
+        
+    Returns:
+        Número de registros con error
+    """
+    connections = int(options.get('connections') or 8)
+    count = int(options.get('requests') or 2000)
+    length = int(options.get('length') or 20)
+    mode = options.get('mode') or 'encrypt'
+    batch = max(1, int(options.get('batch') or 1))
+    window = max(1, int(options.get('window') or 32))
+    
+    records = make_records(count, length)
+    histogram = LatencyHistogram()
+    lock = threading.Lock()
+    totals = {'accepted': 0, 'errors': 0}
+    threads = [threading.Thread(target=_worker, args=(options, mode, records[i::connections], batch,
+                                                      window, histogram, lock, totals))
+               for i in range(connections)]
+    
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    
+    with ServiceClient(**_address(options)) as client:
+        stats = client.stats()
+    
+    summary = histogram.to_dict()
+    print(f"Registros:     {count} ({mode}, {length} caracteres, {connections} conexiones, "
+          f"lote {batch}, ventana {window})")
+    print(f"Aceptados:     {totals['accepted']}  Errores: {totals['errors']}")
+    print(f"Tiempo:        {elapsed:.2f} s  ({count / elapsed:,.0f} registros/s)")
+    print(f"Latencia (ms): p50 {summary['p50_ms']:.2f}  p90 {summary['p90_ms']:.2f}  "
+          f"p99 {summary['p99_ms']:.2f}  máx {summary['max_ms']:.2f}")
+    print(f"Servicio:      {stats['workers']} procesos, {stats['requests']} peticiones, "
+          f"cola {stats['queue_depth']}")
+    for op, latency in stats['latency'].items():
+        print(f"  {op:<15} {latency['count']:>8}  p50 {latency['p50_ms']:.2f} ms  "
+              f"p99 {latency['p99_ms']:.2f} ms")
+    return totals['errors']
+
+
+if __name__ == "__main__":
+    _, options = parse_options(sys.argv[1:])
+    try:
+        sys.exit(1 if run_load(options) else 0)
+    except OSError as e:
+        print(f"ERROR: No se pudo conectar al servicio: {e}", file=sys.stderr)
+        sys.exit(2)
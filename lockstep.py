@@ -0,0 +1,355 @@
+"""
+Simulación en paralelo de muchas instancias de una Máquina de Turing
+Todas las instancias avanzan un paso a la vez con arreglos de NumPy
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+from turing import TuringMachine, Program, ACCEPT, REJECT, LIMIT
+from budget import Budget, DEADLINE, SLICE_STEPS
+from tapes import prepare_tapes
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional: solo lo usa este motor
+    np = None
+
+
+# Máximo de entradas de la tabla densa de transiciones
+TABLE_LIMIT = 1 << 24
+
+# Columnas mínimas que se agregan cuando una cinta crece
+GROW_COLUMNS = 256
+
+# Motivo de parada de cada código del vector de estados de salida
+RUNNING = 0
+STATUSES = (None, ACCEPT, REJECT, LIMIT, DEADLINE)
+_ACCEPT, _REJECT, _LIMIT, _DEADLINE = 1, 2, 3, 4
+
+
+def available() -> bool:
+    """True si NumPy está instalado"""
+    return np is not None
+
+
+def _members(symbol) -> tuple:
+    """Ids que prueba un elemento de patrón: ninguno, uno o los de una clase"""
+    if symbol is None:
+        return ()
+    return tuple(sorted(symbol)) if type(symbol) is frozenset else (symbol,)
+
+
+class LockstepMachine:
+    """
+    N instancias de la misma MT ejecutadas en paralelo
+    
+    El estado de cada instancia es un vector, los cabezales una matriz
+    N x cintas y cada cinta un arreglo 2-D (una fila por instancia, con
+    blancos de relleno). En cada paso se leen los símbolos bajo todos los
+    cabezales, se busca la transición en una tabla densa
+    (estado x clase de símbolo de cada cinta) y se aplican escrituras y
+    movimientos a todas las instancias que siguen corriendo; las que ya se
+    detuvieron salen del conjunto activo.
+    
+    Los resultados (motivo de parada, pasos y cintas) son los mismos que
+    con TuringMachine.run_guarded sin detección de ciclos: una instancia
+    que se queda en un ciclo termina con LIMIT al agotar sus pasos.
+    """
+    
+    def __init__(self, machine: TuringMachine):
+        """
+        Args:
+            machine: MT cargada (se usa su Program compilado)
+            
+        Raises:
+            RuntimeError: Si NumPy no está instalado
+        """
+        if np is None:
+            raise RuntimeError("El motor lockstep necesita NumPy (pip install numpy)")
+        self.machine = machine
+        self.program: Program = machine.program
+        self.left_bounded = machine.left_bounded
+        self.num_tapes = machine.num_tapes
+        self.dtype = np.uint8 if self.program.typecode == 'B' else np.uint16
+        self._compile_table()
+        self._compiled_symbols = 0
+        self.count = 0
+    
+    def _compile_table(self):
+        """
+        Construye la tabla densa de transiciones
+        
+        Los símbolos de cada cinta se agrupan en clases: una por cada
+        símbolo que algún patrón prueba en esa cinta y la clase 0 para los
+        demás (que solo coinciden con comodines). La tabla tiene una entrada
+        por estado y combinación de clases con el id de la transición (-1 si
+        no hay). Los patrones se aplican del último al primero, así que en
+        cada entrada queda el primero que coincide, igual que en el
+        intérprete.
+        """
+        program = self.program
+        tested: List[Dict[int, int]] = [{} for _ in range(self.num_tapes)]
+        for state_index in program.index:
+            if state_index is None:
+                continue
+            for pattern, _ in state_index.patterns:
+                for tape, symbol in zip(state_index.positions, pattern):
+                    for member in _members(symbol):
+                        tested[tape].setdefault(member, len(tested[tape]) + 1)
+        self._tested = tested
+        
+        shape = (len(program.state_names),) + tuple(len(t) + 1 for t in tested)
+        size = int(np.prod(shape))
+        if size > TABLE_LIMIT:
+            raise ValueError(f"La tabla de transiciones tendría {size} entradas (máximo {TABLE_LIMIT})")
+        
+        table = np.full(shape, -1, dtype=np.int32)
+        for state, state_index in enumerate(program.index):
+            if state_index is None:
+                continue
+            for pattern, transition in reversed(state_index.patterns):
+                selector = [np.arange(size) for size in shape[1:]]
+                for tape, symbol in zip(state_index.positions, pattern):
+                    if symbol is not None:
+                        selector[tape] = [tested[tape][member] for member in _members(symbol)]
+                table[np.ix_([state], *selector)] = transition[0]
+        
+        self.table = table.ravel()
+        self.strides = [int(np.prod(shape[i + 1:])) for i in range(len(shape))]
+        self.accepting = np.array(program.accepting, dtype=bool)
+        
+        transitions = program.transitions
+        self.next_state = np.array([t[1] for t in transitions] or [0], dtype=np.int32)
+        self.writes = np.full((max(len(transitions), 1), self.num_tapes), -1, dtype=np.int32)
+        self.moves = np.zeros((max(len(transitions), 1), self.num_tapes), dtype=np.int64)
+        for tid, _, writes, moves in transitions:
+            for tape, symbol in writes:
+                self.writes[tid, tape] = symbol
+            for tape, delta in moves:
+                self.moves[tid, tape] = delta
+    
+    def _class_maps(self):
+        """Clase de cada id de símbolo por cinta (los símbolos nuevos son clase 0)"""
+        count = len(self.program.symbols)
+        if count != self._compiled_symbols:
+            self.classes = []
+            for tested in self._tested:
+                classes = np.zeros(count, dtype=np.int64)
+                for symbol, cls in tested.items():
+                    classes[symbol] = cls
+                self.classes.append(classes)
+            self._compiled_symbols = count
+    
+    def load(self, tape_sets: Sequence[Sequence[str]]):
+        """
+        Carga las cintas de N instancias
+        
+        Args:
+            tape_sets: Para cada instancia, el contenido inicial de cada
+                cinta (las que falten empiezan vacías)
+        """
+        program = self.program
+        n = self.count = len(tape_sets)
+        blank = program.blank
+        self.tapes = []
+        self.origins = [0] * self.num_tapes
+        for i in range(self.num_tapes):
+            rows = [program.encode(tapes[i] if i < len(tapes) else '') for tapes in tape_sets]
+            width = max([len(row) for row in rows] + [0]) + 1
+            tape = np.full((n, width), blank, dtype=self.dtype)
+            for row, content in enumerate(rows):
+                tape[row, :len(content)] = np.frombuffer(content, dtype=self.dtype)
+            self.tapes.append(tape)
+        
+        self.state = np.full(n, program.initial, dtype=np.int32)
+        self.heads = np.zeros((n, self.num_tapes), dtype=np.int64)
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.status = np.zeros(n, dtype=np.int8)
+    
+    def _grow(self, tape: int, heads) -> Any:
+        """
+        Agrega columnas de blancos a una cinta para que los cabezales quepan
+        
+        Returns:
+            Los cabezales ajustados si la cinta creció a la izquierda
+        """
+        rows, width = self.tapes[tape].shape
+        blank = self.program.blank
+        high = int(heads.max())
+        if high >= width:
+            extra = max(GROW_COLUMNS, width, high - width + 1)
+            self.tapes[tape] = np.concatenate(
+                [self.tapes[tape], np.full((rows, extra), blank, dtype=self.dtype)], axis=1)
+        low = int(heads.min())
+        if low < 0:
+            extra = max(GROW_COLUMNS, width, -low)
+            self.tapes[tape] = np.concatenate(
+                [np.full((rows, extra), blank, dtype=self.dtype), self.tapes[tape]], axis=1)
+            self.origins[tape] += extra
+            self.heads[:, tape] += extra
+            heads = heads + extra
+        return heads
+    
+    def run(self, max_steps: Union[int, Sequence[int]], budget: Optional[Budget] = None):
+        """
+        Ejecuta todas las instancias hasta que cada una se detenga
+        
+        Args:
+            max_steps: Límite de pasos común o uno por instancia
+            budget: Presupuesto con tiempo máximo y cancelación, que se
+                revisan cada SLICE_STEPS pasos y detienen a todas las
+                instancias que sigan corriendo
+                
+        Returns:
+            Lista con el motivo de parada de cada instancia
+        """
+        self._class_maps()
+        limits = np.broadcast_to(np.asarray(max_steps, dtype=np.int64), (self.count,))
+        check = budget is not None and budget.interrupts
+        slice_steps = budget.slice_steps if budget is not None else SLICE_STEPS
+        
+        # Solo se leen las cintas que algún patrón prueba y solo se escriben
+        # o mueven las que alguna transición escribe o mueve
+        reads = [i for i in range(self.num_tapes) if self._tested[i]]
+        writes = [i for i in range(self.num_tapes) if (self.writes[:, i] >= 0).any()]
+        moves = [i for i in range(self.num_tapes) if self.moves[:, i].any()]
+        weights = {i: self.classes[i] * self.strides[i + 1] for i in reads}
+        table, accepting, next_state = self.table, self.accepting, self.next_state
+        
+        # Arreglos compactos de las instancias activas; las cintas se indexan
+        # como arreglos planos (fila * ancho + cabezal)
+        rows = np.flatnonzero(self.status == RUNNING)
+        state = self.state[rows]
+        heads = [self.heads[rows, i] for i in range(self.num_tapes)]
+        steps = self.steps[rows]
+        limit = limits[rows]
+        offsets = [rows * tape.shape[1] for tape in self.tapes]
+        iteration = 0
+        
+        while rows.size:
+            iteration += 1
+            if check and iteration % slice_steps == 0 and budget.expired() is not None:
+                self.status[rows] = _DEADLINE
+                break
+            
+            key = state * self.strides[0]
+            for i in reads:
+                key += weights[i][self.tapes[i].ravel()[offsets[i] + heads[i]]]
+            tid = table[key]
+            
+            # Detener las instancias que llegaron al límite, aceptaron o no
+            # tienen transición (en el mismo orden que el intérprete)
+            over = steps >= limit
+            halted = over | accepting[state] | (tid < 0)
+            if halted.any():
+                done = rows[halted]
+                self.status[done] = np.where(over, _LIMIT, np.where(
+                    accepting[state], _ACCEPT, _REJECT))[halted]
+                self.state[done] = state[halted]
+                for i in range(self.num_tapes):
+                    self.heads[done, i] = heads[i][halted]
+                self.steps[done] = steps[halted]
+                running = ~halted
+                rows, state, steps, limit, tid = (
+                    rows[running], state[running], steps[running], limit[running], tid[running])
+                heads = [head[running] for head in heads]
+                offsets = [offset[running] for offset in offsets]
+                if not rows.size:
+                    break
+            
+            for i in writes:
+                symbols = self.writes[tid, i]
+                mask = symbols >= 0
+                if mask.any():
+                    self.tapes[i].ravel()[offsets[i][mask] + heads[i][mask]] = symbols[mask]
+            for i in moves:
+                moved = heads[i] + self.moves[tid, i]
+                if self.left_bounded:
+                    np.maximum(moved, 0, out=moved)
+                if moved.max() >= self.tapes[i].shape[1] or moved.min() < 0:
+                    moved = self._grow(i, moved)
+                    offsets[i] = rows * self.tapes[i].shape[1]
+                heads[i] = moved
+            
+            state = next_state[tid]
+            steps += 1
+        
+        # Las que se cortaron por tiempo guardan su configuración
+        if rows.size:
+            self.state[rows] = state
+            for i in range(self.num_tapes):
+                self.heads[rows, i] = heads[i]
+            self.steps[rows] = steps
+        return [STATUSES[code] for code in self.status]
+    
+    def get_tape_content(self, instance: int, tape_index: int) -> str:
+        """
+        Contenido de una cinta de una instancia, como TuringMachine.get_tape_content
+        
+        Args:
+            instance: Índice de la instancia
+            tape_index: Índice de la cinta (0-based)
+        """
+        row = self.tapes[tape_index][instance]
+        origin = self.origins[tape_index]
+        written = np.flatnonzero(row != self.program.blank)
+        start = min(int(written[0]), origin) if written.size else origin
+        end = max(int(written[-1]) + 1, origin) if written.size else origin
+        return self.program.decode(row[start:end].tolist())
+    
+    def position(self, instance: int, tape_index: int) -> int:
+        """Posición lógica de un cabezal de una instancia"""
+        return int(self.heads[instance, tape_index]) - self.origins[tape_index]
+    
+    def state_name(self, instance: int) -> str:
+        """Nombre del estado de una instancia"""
+        return self.program.state_names[int(self.state[instance])]
+
+
+def process_records(machine: TuringMachine, records: List[str], max_steps: Optional[int] = None,
+                    timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Ejecuta registros LLAVE#MENSAJE en paralelo con la misma MT
+    
+    Devuelve lo mismo que batch.process_record para cada registro, salvo
+    que los ciclos no se detectan (terminan con status 'limit').
+    
+    Args:
+        machine: MT ya cargada
+        records: Registros en formato LLAVE#MENSAJE
+        max_steps: Número máximo de pasos por registro (None = según su largo)
+        timeout: Segundos máximos para todo el bloque
+        
+    Returns:
+        Un diccionario de resultado por registro, en el mismo orden
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(records)
+    valid = []
+    tape_sets = []
+    for index, record in enumerate(records):
+        try:
+            tape_sets.append(prepare_tapes(record, machine.config.get('alphabet')))
+        except ValueError as e:
+            results[index] = {'input': record, 'status': 'error', 'accepted': False,
+                              'steps': 0, 'error': str(e)}
+            continue
+        valid.append(index)
+    
+    if valid:
+        complexity = machine.config.get('complexity')
+        if max_steps is None:
+            limits = [Budget.for_input(complexity, len(tapes[0])).max_steps for tapes in tape_sets]
+        else:
+            limits = max_steps
+        lockstep = LockstepMachine(machine)
+        lockstep.load(tape_sets)
+        statuses = lockstep.run(limits, Budget(timeout=timeout) if timeout is not None else None)
+        for instance, index in enumerate(valid):
+            results[index] = {
+                'input': records[index],
+                'status': statuses[instance],
+                'accepted': statuses[instance] == ACCEPT,
+                'steps': int(lockstep.steps[instance]),
+                'output': lockstep.get_tape_content(instance, 2),
+            }
+    return results
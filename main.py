@@ -4,7 +4,17 @@ Programa principal para ejecutar las Máquinas de Turing de Cifrado César
 
 import sys
 import io
-from turing import load_turing_machine
+import time
+from typing import Optional
+from turing import load_turing_machine, TuringMachine, RunResult, Logger, ENGINES
+from budget import Budget
+from tapes import prepare_tape_2_unary, parse_input, prepare_tapes
+
+# Archivo JSON de la MT para cada modo
+MACHINES = {
+    'encrypt': 'encrypt.json',
+    'decrypt': 'decrypt.json',
+}
 
 # Configurar encoding UTF-8 para Windows
 if sys.platform == 'win32':
@@ -12,251 +22,553 @@ if sys.platform == 'win32':
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8')
 
 
-def prepare_tape_2_unary(key: str) -> str:
+def make_budget(tm: TuringMachine, tape1: str, timeout: Optional[float] = None) -> Budget:
     """
-    Convierte la llave a notación unaria con un marcador al inicio
+    Presupuesto de una ejecución según el largo del input
+    
+    El límite de pasos sale del perfil de complejidad del JSON de la MT
+    (clave "complexity"); si no lo tiene se usan 200000 pasos.
     
     Args:
-        key: Llave como número o letra
-        
-    Returns:
-        String en notación unaria (ej: "_|||" con marcador al inicio)
+        tm: MT que se va a ejecutar
+        tape1: Contenido de la cinta de entrada
+        timeout: Segundos máximos de ejecución (None = sin límite)
     """
-    # Si es un número
-    if key.isdigit():
-        shift = int(key)
-    # Si es una letra
-    elif key.isalpha() and len(key) == 1:
-        shift = ord(key.upper()) - ord('A')
-    else:
-        raise ValueError(f"Llave inválida: {key}")
+    return Budget.for_input(tm.config.get('complexity'), len(tape1), timeout=timeout)
+
+
+def load_machine(json_file: str, engine: str = 'interp', key: Optional[str] = None) -> TuringMachine:
+    """
+    Carga la MT de un modo, general o especializada en una llave
     
-    # Normalizar a rango 0-25
-    shift = shift % 26
+    La versión especializada tiene el desplazamiento en sus estados y no
+    usa la cinta 2 (ver specialize.py); se guarda en una caché LRU en
+    memoria y en disco, así que las llaves frecuentes no se especializan
+    dos veces.
     
-    # Convertir a unario con marcador al inicio
-    return '_' + ('|' * shift)
+    Args:
+        json_file: JSON de la MT
+        engine: Motor de ejecución ('interp' o 'codegen')
+        key: Llave en la que se especializa la MT (None = MT general)
+    """
+    if key is None:
+        return load_turing_machine(json_file, engine)
+    from specialize import load_specialized_machine
+    # La llave se reduce módulo el largo del alfabeto de la MT
+    alphabet = load_turing_machine(json_file).config.get('alphabet')
+    return load_specialized_machine(json_file, prepare_tape_2_unary(key, alphabet), engine)
 
 
-def prepare_tape_4_alphabet() -> str:
+def execute(tm: TuringMachine, tape1: str, verbose: bool = False, timeout: Optional[float] = None,
+            checkpoint: Optional[str] = None, every: Optional[int] = None,
+            trace: Optional[str] = None, log: Logger = None) -> RunResult:
     """
-    Genera el alfabeto base para wrap-around gestionado por transiciones
+    Ejecuta una MT ya cargada, con checkpoints o traza si se pide
     
+    Con checkpoint la ejecución se reanuda desde el archivo si existe y lo
+    va actualizando cada every pasos; si se corta por tiempo o cancelación
+    el archivo queda para continuar con el mismo comando (al agotar los
+    pasos se borra, como al terminar).
+    Con trace se graban los últimos pasos y, si la MT no acepta, se guardan
+    en ese archivo para verlos con el comando trace.
+    
+    Args:
+        tm: MT con las cintas cargadas
+        tape1: Contenido de la cinta de entrada
+        verbose: Si True, envía a log el estado de los primeros pasos
+        timeout: Segundos máximos de ejecución (None = sin límite)
+        checkpoint: Ruta del checkpoint (None = sin checkpoints)
+        every: Pasos entre checkpoints (por defecto CHECKPOINT_EVERY)
+        trace: Ruta donde se guarda la traza si la MT no acepta (None = sin traza)
+        log: Destino de los mensajes (None = sin mensajes, por ejemplo print)
+        
     Returns:
-        String con alfabeto repetido
+        RunResult de la ejecución, con la salida de la cinta 3
     """
-    alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    return alphabet
+    budget = make_budget(tm, tape1, timeout)
+    tm.logger = log
+    tracer = None
+    if trace is not None:
+        from tracing import TraceRecorder
+        tracer = TraceRecorder(tm.program)
+    
+    if checkpoint is None:
+        result = tm.simulate(debug=verbose, budget=budget, tracer=tracer)
+        if not result.accepted and log is not None:
+            log(result.message())
+    else:
+        from checkpoint import run_with_checkpoints, FINAL, CHECKPOINT_EVERY
+        run_with_checkpoints(tm, checkpoint, every or CHECKPOINT_EVERY, budget=budget, tracer=tracer)
+        result = tm.result()
+        if result.status not in FINAL and log is not None:
+            log(f"\n⏸️ Ejecución pausada en el paso {tm.steps} ({result.status}); "
+                f"checkpoint guardado en {checkpoint}")
+        elif not result.accepted and log is not None:
+            log(result.message())
+    
+    if tracer is not None and not result.accepted:
+        tracer.dump(trace)
+        if log is not None:
+            log(f"🧾 Traza de la ejecución guardada en {trace}")
+    return result
 
 
-def parse_input(input_str: str) -> tuple:
+def run_machine(mode: str, input_str: str, engine: str = 'interp', timeout: Optional[float] = None,
+                checkpoint: Optional[str] = None, every: Optional[int] = None,
+                trace: Optional[str] = None, specialize: bool = False,
+                shards: Optional[int] = None, debug: bool = False, log: Logger = None) -> RunResult:
     """
-    Parsea el input en formato: LLAVE#MENSAJE
+    Cifra o descifra un LLAVE#MENSAJE y devuelve el resultado
+    
+    Es la ejecución de los comandos encrypt y decrypt sin nada impreso: los
+    mensajes (motivo de rechazo, checkpoint pausado, traza guardada, modo
+    debug) solo se envían a log.
     
     Args:
-        input_str: String con formato LLAVE#MENSAJE
+        mode: 'encrypt' o 'decrypt'
+        input_str: Input en formato LLAVE#MENSAJE
+        engine: Motor de ejecución ('interp' o 'codegen')
+        timeout: Segundos máximos de ejecución (None = sin límite)
+        checkpoint: Ruta del checkpoint para pausar y reanudar (None = sin checkpoints)
+        every: Pasos entre checkpoints
+        trace: Ruta donde se guarda la traza si la MT no acepta
+        specialize: Si True, usa la MT especializada en la llave
+        shards: Divide el mensaje en hasta este número de fragmentos que se
+            ejecutan en paralelo (0 = uno por CPU, None = una sola ejecución)
+        debug: Si True, envía a log el estado de los primeros pasos
+        log: Destino de los mensajes (None = sin mensajes)
         
     Returns:
-        Tupla (llave, mensaje)
+        RunResult con accepted, status, steps, elapsed, output y state
+        
+    Raises:
+        ValueError: Si el input no tiene el formato LLAVE#MENSAJE o la llave es inválida
     """
-    if '#' not in input_str:
-        raise ValueError("Formato incorrecto. Usar: LLAVE#MENSAJE")
+    # Cargar MT (su alfabeto define cómo se preparan las cintas)
+    tm = load_machine(MACHINES[mode], engine, None)
+    alphabet = tm.config.get('alphabet')
+    key, _ = parse_input(input_str, alphabet)
     
-    parts = input_str.split('#', 1)
-    key = parts[0].strip()
-    message = parts[1].strip().upper()  # Convertir a mayúsculas
+    if shards is not None:
+        # Ejecutar por fragmentos en paralelo (ver shard.py)
+        from shard import run_sharded
+        started = time.perf_counter()
+        sharded = run_sharded(mode, input_str, shards, engine, timeout, specialize)
+        return RunResult(sharded['status'], sharded['steps'], elapsed=time.perf_counter() - started,
+                         output=sharded['output'])
     
-    return key, message
+    # MT especializada en la llave
+    if specialize:
+        tm = load_machine(MACHINES[mode], engine, key)
+    
+    tapes = prepare_tapes(input_str, alphabet)
+    tm.load_input(tapes[0], tapes)
+    return execute(tm, tapes[0], debug, timeout, checkpoint, every, trace, log)
+
+
+# Textos de los comandos encrypt y decrypt
+LABELS = {
+    'encrypt': {
+        'title': "🔒 CIFRADO CÉSAR - MÁQUINA DE TURING",
+        'input': "Mensaje",
+        'success': "✅ ENCRIPTACIÓN EXITOSA",
+        'output': "Texto cifrado",
+    },
+    'decrypt': {
+        'title': "🔓 DESCIFRADO CÉSAR - MÁQUINA DE TURING",
+        'input': "Texto cifrado",
+        'success': " DESENCRIPTACIÓN EXITOSA",
+        'output': "Texto descifrado",
+    },
+}
 
 
-def run_encryption(input_str: str, verbose: bool = False):
+def run_command(mode: str, input_str: str, verbose: bool = False, engine: str = 'interp',
+                shards: Optional[int] = None, **options) -> Optional[RunResult]:
     """
-    Ejecuta la MT de encriptación
+    Ejecuta run_machine y muestra el resultado como los comandos encrypt y decrypt
     
     Args:
+        mode: 'encrypt' o 'decrypt'
         input_str: Input en formato LLAVE#MENSAJE
-        verbose: Si True, muestra información detallada
+        verbose: Si True, muestra las cintas y el modo debug
+        engine: Motor de ejecución ('interp' o 'codegen')
+        shards: Fragmentos en paralelo (ver run_machine)
+        options: timeout, checkpoint, every, trace y specialize de run_machine
+        
+    Returns:
+        El RunResult, o None si hubo un error
     """
+    labels = LABELS[mode]
     print("\n" + "="*60)
-    print("🔒 CIFRADO CÉSAR - MÁQUINA DE TURING")
+    print(labels['title'])
     print("="*60)
     
     try:
+        alphabet = load_machine(MACHINES[mode], engine).config.get('alphabet')
+        
         # Parsear input
-        key, message = parse_input(input_str)
+        key, message = parse_input(input_str, alphabet)
         print(f"Llave: {key}")
-        print(f"Mensaje: {message}")
-        
-        # Preparar cintas
-        tape1 = input_str.upper()
-        tape2 = prepare_tape_2_unary(key)
-        tape3 = "_"  # Cinta de trabajo (vacía)
-        tape4 = prepare_tape_4_alphabet()
+        print(f"{labels['input']}: {message}")
         
         if verbose:
-            print(f"\nCinta 1 (input): {tape1[:50]}...")
-            print(f"Cinta 2 (llave unaria): {tape2}")
-            print(f"Cinta 4 (alfabeto): {tape4[:52]}...")
-        
-        # Cargar MT
-        tm = load_turing_machine('encrypt.json')
-        
-        # Configurar cintas
-        tm.load_input(tape1, [tape1, tape2, tape3, tape4])
+            tapes = prepare_tapes(input_str, alphabet)
+            print(f"\nCinta 1 (input): {tapes[0][:50]}...")
+            print(f"Cinta 2 (llave unaria): {tapes[1]}")
+            print(f"Cinta 4 (alfabeto): {tapes[3][:52]}...")
         
-        # Ejecutar
-        print("\n⚙️ Ejecutando máquina de Turing...")
-        success = tm.run(max_steps=200000, debug=verbose)
+        if shards is not None:
+            print("\n⚙️ Ejecutando máquina de Turing por fragmentos...")
+        else:
+            print("\n⚙️ Ejecutando máquina de Turing...")
+        result = run_machine(mode, input_str, engine, shards=shards, debug=verbose, log=print, **options)
+        if shards is not None and verbose:
+            print(f"Pasos: {result.steps}")
         
-        if success:
-            # Obtener resultado de cinta 3
-            result = tm.get_tape_content(2)
-            print(f"\n✅ ENCRIPTACIÓN EXITOSA")
-            print(f"Texto cifrado: {result}")
+        if result.accepted:
+            print(f"\n{labels['success']}")
+            print(f"{labels['output']}: {result.output}")
         else:
             print("\n ERROR: La máquina no aceptó el input")
-            
+        return result
+    
     except Exception as e:
         print(f"\n ERROR: {str(e)}")
         import traceback
         traceback.print_exc()
+        return None
 
 
-def run_decryption(input_str: str, verbose: bool = False):
+def run_encryption(input_str: str, verbose: bool = False, engine: str = 'interp',
+                   timeout: Optional[float] = None, checkpoint: Optional[str] = None,
+                   every: Optional[int] = None, trace: Optional[str] = None,
+                   specialize: bool = False, shards: Optional[int] = None) -> Optional[RunResult]:
     """
-    Ejecuta la MT de desencriptación
+    Ejecuta la MT de encriptación y muestra el resultado
     
     Args:
-        input_str: Input en formato LLAVE#MENSAJE_CIFRADO
+        input_str: Input en formato LLAVE#MENSAJE
         verbose: Si True, muestra información detallada
+        engine: Motor de ejecución ('interp' o 'codegen')
+        timeout: Segundos máximos de ejecución (None = sin límite)
+        checkpoint: Ruta del checkpoint para pausar y reanudar (None = sin checkpoints)
+        every: Pasos entre checkpoints
+        trace: Ruta donde se guarda la traza si la MT no acepta
+        specialize: Si True, usa la MT especializada en la llave
+        shards: Divide el mensaje en hasta este número de fragmentos que se
+            ejecutan en paralelo (0 = uno por CPU, None = una sola ejecución)
     """
-    print("\n" + "="*60)
-    print("🔓 DESCIFRADO CÉSAR - MÁQUINA DE TURING")
-    print("="*60)
+    return run_command('encrypt', input_str, verbose, engine, shards, timeout=timeout,
+                       checkpoint=checkpoint, every=every, trace=trace, specialize=specialize)
+
+
+def run_decryption(input_str: str, verbose: bool = False, engine: str = 'interp',
+                   timeout: Optional[float] = None, checkpoint: Optional[str] = None,
+                   every: Optional[int] = None, trace: Optional[str] = None,
+                   specialize: bool = False, shards: Optional[int] = None) -> Optional[RunResult]:
+    """
+    Ejecuta la MT de desencriptación y muestra el resultado
     
-    try:
-        # Parsear input
-        key, cipher = parse_input(input_str)
-        print(f"Llave: {key}")
-        print(f"Texto cifrado: {cipher}")
-        
-        # Preparar cintas
-        tape1 = input_str.upper()
-        tape2 = prepare_tape_2_unary(key)
-        tape3 = "_"
-        tape4 = prepare_tape_4_alphabet()
-        
-        if verbose:
-            print(f"\nCinta 1 (input): {tape1[:50]}...")
-            print(f"Cinta 2 (llave unaria): {tape2}")
-            print(f"Cinta 4 (alfabeto): {tape4[:52]}...")
-        
-        # Cargar MT
-        tm = load_turing_machine('decrypt.json')
-        
-        # Configurar cintas
-        tm.load_input(tape1, [tape1, tape2, tape3, tape4])
-        
-        # Ejecutar
-        print("\n⚙️ Ejecutando máquina de Turing...")
-        success = tm.run(max_steps=200000, debug=verbose)
-        
-        if success:
-            # Obtener resultado de cinta 3
-            result = tm.get_tape_content(2)
-            print(f"\n DESENCRIPTACIÓN EXITOSA")
-            print(f"Texto descifrado: {result}")
-        else:
-            print("\n ERROR: La máquina no aceptó el input")
-            
-    except Exception as e:
-        print(f"\n ERROR: {str(e)}")
-        import traceback
-        traceback.print_exc()
+    Args:
+        input_str: Input en formato LLAVE#MENSAJE_CIFRADO
+        verbose: Si True, muestra información detallada
+        engine: Motor de ejecución ('interp' o 'codegen')
+        timeout: Segundos máximos de ejecución (None = sin límite)
+        checkpoint: Ruta del checkpoint para pausar y reanudar (None = sin checkpoints)
+        every: Pasos entre checkpoints
+        trace: Ruta donde se guarda la traza si la MT no acepta
+        specialize: Si True, usa la MT especializada en la llave
+        shards: Divide el mensaje en hasta este número de fragmentos que se
+            ejecutan en paralelo (0 = uno por CPU, None = una sola ejecución)
+    """
+    return run_command('decrypt', input_str, verbose, engine, shards, timeout=timeout,
+                       checkpoint=checkpoint, every=every, trace=trace, specialize=specialize)
 
 
-def run_tests():
-    """Ejecuta los casos de prueba del archivo tests.txt"""
+def run_tests(engine: str = 'interp', timeout: Optional[float] = None, specialize: bool = False,
+              workers: Optional[int] = None, matrix: int = 0, report: Optional[str] = None) -> int:
+    """
+    Ejecuta los casos de prueba del archivo tests.txt
+    
+    Cada caso se comprueba cifrando, descifrando el resultado esperado y
+    descifrando lo que se cifró (ida y vuelta); los casos se reparten entre
+    varios procesos (ver testrunner.py).
+    
+    Args:
+        engine: Motor de ejecución ('interp' o 'codegen')
+        timeout: Segundos máximos por caso (None = sin límite)
+        specialize: Si True, usa la MT especializada en la llave de cada caso
+        workers: Número de procesos (por defecto, uno por CPU)
+        matrix: Mensajes generados por cada una de las 26 llaves (0 = ninguno)
+        report: Ruta del reporte JSON (o JUnit si termina en .xml)
+        
+    Returns:
+        Número de casos que fallaron
+    """
     print("\n" + "="*60)
     print("🧪 EJECUTANDO PRUEBAS AUTOMÁTICAS")
     print("="*60)
     
     try:
-        with open('tests.txt', 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-        
-        test_num = 0
-        for line in lines:
-            line = line.strip()
-            if not line or line.startswith('#'):
-                continue
-            
-            test_num += 1
-            parts = line.split('→')
-            if len(parts) != 2:
-                continue
-            
-            input_test = parts[0].strip()
-            expected = parts[1].strip()
-            
-            print(f"\n{'─'*60}")
-            print(f"Prueba {test_num}: {input_test}")
-            print(f"Esperado: {expected}")
-            
-            # Determinar si es encriptación o desencriptación
-            key, message = parse_input(input_test)
-            
-            # Ejecutar encriptación
-            tm = load_turing_machine('encrypt.json')
-            tape1 = input_test.upper()
-            tape2 = prepare_tape_2_unary(key)
-            tape3 = "_"
-            tape4 = prepare_tape_4_alphabet()
-            
-            tm.load_input(tape1, [tape1, tape2, tape3, tape4])
-            success = tm.run(max_steps=200000)
-            
-            if success:
-                result = tm.get_tape_content(2)
-                if result == expected:
-                    print(f"PASÓ: {result}")
-                else:
-                    print(f" FALLÓ: Obtenido '{result}' != Esperado '{expected}'")
-            else:
-                print(" FALLÓ: La máquina no aceptó")
-                
+        from testrunner import run_suite
+        return run_suite(engine, specialize, workers, matrix, report, timeout=timeout)
     except FileNotFoundError:
         print(" Archivo tests.txt no encontrado")
     except Exception as e:
         print(f" ERROR en pruebas: {str(e)}")
         import traceback
         traceback.print_exc()
+    return 1
+
+
+def run_profile(mode: str, input_str: str, options: dict, engine: str = 'interp'):
+    """
+    Ejecuta un registro con el profiler y muestra los contadores
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        input_str: String en formato "LLAVE#MENSAJE"
+        options: Opciones format (table o json), top y output
+        engine: Motor de ejecución (con profiler siempre se usa el intérprete)
+    """
+    from profiler import Profiler
+    
+    tm = load_turing_machine(MACHINES[mode], engine)
+    tapes = prepare_tapes(input_str, tm.config.get('alphabet'))
+    profiler = Profiler(tm.program)
+    tm.load_input(tapes[0], tapes)
+    tm.run(profiler=profiler, budget=make_budget(tm, tapes[0]))
+    
+    if options.get('format') == 'json':
+        report = profiler.to_json()
+    else:
+        report = profiler.format_table(int(options['top']) if options.get('top') else None)
+    
+    if options.get('output'):
+        with open(options['output'], 'w', encoding='utf-8') as f:
+            f.write(report + '\n')
+    else:
+        print(report)
+
+
+def run_trace(mode: str, path: str, options: dict):
+    """
+    Muestra una traza guardada con --trace: los últimos registros antes de
+    un paso y la configuración de las cintas en ese paso
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        path: Archivo de traza
+        options: Opciones step (por defecto el último), context (pasos de
+            registros a mostrar antes de step) y records (archivo donde se
+            escriben los registros en binario de ancho fijo)
+    """
+    from tracing import Replayer, load_trace
+    
+    tm = load_turing_machine(MACHINES[mode])
+    replayer = Replayer(tm, load_trace(path))
+    step = int(options['step']) if options.get('step') else replayer.last_step
+    context = int(options.get('context') or 20)
+    
+    print(f"Traza de {replayer.first_step} a {replayer.last_step} pasos "
+          f"({replayer.status or 'sin terminar'})")
+    for record in replayer.records(step - context, step):
+        print(replayer.format_record(record))
+    
+    replayer.seek(step)
+    print(f"\n[Paso {step}]")
+    replayer.machine.print_state()
+    
+    if options.get('records'):
+        written = replayer.write_records(options['records'])
+        print(f"\n{written} registros escritos en {options['records']}")
+
+
+def parse_options(argv: list) -> tuple:
+    """
+    Separa los argumentos posicionales de las opciones --nombre=valor
+    
+    Args:
+        argv: Argumentos de la línea de comandos (sin el nombre del programa)
+        
+    Returns:
+        Tupla (argumentos, diccionario de opciones)
+    """
+    args = []
+    options = {}
+    for arg in argv:
+        if arg.startswith('--'):
+            name, _, value = arg[2:].partition('=')
+            options[name] = value
+        else:
+            args.append(arg)
+    return args, options
 
 
 def main():
     """Función principal con menú interactivo"""
-    print("""
+    args, options = parse_options(sys.argv[1:])
+    command = args[0].lower() if args else None
+    
+    # Los comandos cuya salida es el resultado (JSON lines, texto en streaming)
+    # no imprimen el banner
+    if command not in ('batch', 'stream', 'bench', 'profile', 'trace', 'optimize', 'serve', 'client',
+                       'verified', 'pipeline'):
+        print("""
 ╔═══════════════════════════════════════════════════════════╗
 ║   MÁQUINAS DE TURING - CIFRADO CÉSAR (4 CINTAS)          ║
 ║   Teoría de la Computación                                ║
 ╚═══════════════════════════════════════════════════════════╝
     """)
     
-    if len(sys.argv) > 1:
+    # Opción --engine=interp|codegen para elegir el motor de ejecución
+    engine = options.get('engine', 'interp')
+    if engine not in ENGINES:
+        print(f" Motor desconocido: {engine} (opciones: {', '.join(ENGINES)})")
+        return
+    
+    # Opción --timeout=SEGUNDOS: tiempo máximo por ejecución
+    timeout = float(options['timeout']) if options.get('timeout') else None
+    
+    # Opciones --checkpoint=ARCHIVO y --checkpoint-every=N para pausar y reanudar
+    checkpoint = options.get('checkpoint') or None
+    every = int(options['checkpoint-every']) if options.get('checkpoint-every') else None
+    
+    # Opción --trace=ARCHIVO: guarda la traza si la MT no acepta
+    trace = options.get('trace') or None
+    
+    # Opción --specialize: usar la MT especializada en la llave de cada input
+    specialize = 'specialize' in options
+    
+    # Opción --shards[=N]: divide el mensaje en fragmentos que corren en paralelo
+    shards = int(options['shards'] or 0) if 'shards' in options else None
+    if shards is not None and (checkpoint or trace):
+        print(" --shards no se puede combinar con --checkpoint ni --trace")
+        return
+    
+    if args:
         # Modo línea de comandos
-        command = sys.argv[1].lower()
-        
         if command == 'test':
-            run_tests()
-        elif command == 'encrypt' and len(sys.argv) > 2:
-            run_encryption(sys.argv[2], verbose=True)
-        elif command == 'decrypt' and len(sys.argv) > 2:
-            run_decryption(sys.argv[2], verbose=True)
+            workers = int(options['workers']) if options.get('workers') else None
+            failures = run_tests(engine, timeout, specialize, workers,
+                                 int(options.get('matrix') or 0), options.get('report') or None)
+            sys.exit(1 if failures else 0)
+        elif command == 'encrypt' and len(args) > 1:
+            run_encryption(args[1], verbose=True, engine=engine, timeout=timeout,
+                           checkpoint=checkpoint, every=every, trace=trace,
+                           specialize=specialize, shards=shards)
+        elif command == 'decrypt' and len(args) > 1:
+            run_decryption(args[1], verbose=True, engine=engine, timeout=timeout,
+                           checkpoint=checkpoint, every=every, trace=trace,
+                           specialize=specialize, shards=shards)
+        elif command == 'batch' and len(args) > 2 and args[1] in MACHINES:
+            from batch import run_batch_file
+            workers = int(options['workers']) if options.get('workers') else None
+            # Con --lockstep los bloques son más grandes: cada uno se simula a la vez
+            lockstep = 'lockstep' in options
+            if lockstep:
+                from lockstep import available
+                if not available():
+                    print("ERROR: --lockstep necesita NumPy (pip install numpy)", file=sys.stderr)
+                    sys.exit(2)
+            chunk_size = int(options.get('chunk-size') or (1024 if lockstep else 64))
+            failures = run_batch_file(args[1], args[2], workers, chunk_size, engine, timeout=timeout,
+                                      specialize=specialize, lockstep=lockstep)
+            sys.exit(1 if failures else 0)
+        elif command == 'verified' and len(args) > 2 and args[1] in MACHINES:
+            from verified import run_verified_file
+            sys.exit(1 if run_verified_file(args[1], args[2], options, engine) else 0)
+        elif command == 'pipeline' and len(args) > 1:
+            from pipeline import run_pipeline_file, ROUND_TRIP
+            modes = options['stages'].split(',') if options.get('stages') else ROUND_TRIP
+            if not all(mode in MACHINES for mode in modes):
+                print(f"ERROR: Etapas inválidas: {options['stages']}", file=sys.stderr)
+                sys.exit(2)
+            workers = int(options['workers']) if options.get('workers') else None
+            failures = run_pipeline_file(args[1], modes, workers, int(options.get('chunk-size') or 64),
+                                         engine, timeout=timeout)
+            sys.exit(1 if failures else 0)
+        elif command == 'stream' and len(args) > 2 and args[1] in MACHINES:
+            from streaming import stream_file, STREAM_CHUNK
+            chunk_size = int(options.get('chunk-size') or STREAM_CHUNK)
+            result = stream_file(args[1], args[2], 'mmap' in options, chunk_size, engine)
+            sys.stdout.write('\n')
+            if not result['accepted']:
+                print(f"ERROR: La máquina no aceptó el input ({result['status']})", file=sys.stderr)
+                sys.exit(1)
+        elif command == 'profile' and len(args) > 2 and args[1] in MACHINES:
+            run_profile(args[1], args[2], options, engine)
+        elif command == 'trace' and len(args) > 2 and args[1] in MACHINES:
+            try:
+                run_trace(args[1], args[2], options)
+            except (OSError, ValueError) as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(2)
+        elif command == 'optimize' and len(args) > 1 and args[1] in MACHINES:
+            from optimize import run_optimize_command
+            sys.exit(1 if run_optimize_command(args[1], options) else 0)
+        elif command == 'serve':
+            from service import run_serve_command
+            run_serve_command(options, engine)
+        elif command == 'client' and len(args) > 1:
+            from service import run_client_command
+            try:
+                failures = run_client_command(args[1].lower(), args[2:], options)
+            except OSError as e:
+                print(f"ERROR: No se pudo conectar al servicio: {e}", file=sys.stderr)
+                sys.exit(2)
+            sys.exit(1 if failures else 0)
+        elif command == 'bench':
+            from bench import run_bench_command
+            try:
+                regressions = run_bench_command(options)
+            except ValueError as e:
+                print(f"ERROR: {e}", file=sys.stderr)
+                sys.exit(2)
+            sys.exit(1 if regressions else 0)
         else:
             print("Uso:")
-            print("  python main.py test")
+            print("  python main.py test [--matrix=N] [--report=ARCHIVO.json|.xml]")
             print("  python main.py encrypt 'LLAVE#MENSAJE'")
             print("  python main.py decrypt 'LLAVE#CIFRADO'")
+            print("  python main.py batch encrypt|decrypt ARCHIVO")
+            print("  python main.py pipeline ARCHIVO [--stages=encrypt,decrypt]")
+            print("  python main.py stream encrypt|decrypt ARCHIVO [--mmap]")
+            print("  python main.py verified encrypt|decrypt ARCHIVO [--sample=0.01] [--divergences=ARCHIVO]")
+            print("  python main.py bench [--lengths=10,100] [--keys=0-25] [--baseline=ARCHIVO]")
+            print("  python main.py profile encrypt|decrypt 'LLAVE#MENSAJE' [--format=table|json]")
+            print("  python main.py trace encrypt|decrypt ARCHIVO [--step=N] [--context=N]")
+            print("  python main.py optimize encrypt|decrypt [--output=ARCHIVO] [--verify]")
+            print("  python main.py serve [--socket=RUTA | --host=127.0.0.1 --port=8765] [--workers=N]")
+            print("  python main.py client encrypt|decrypt|stats|ping ['LLAVE#MENSAJE' ...]")
+            print("Opciones:")
+            print("  --engine=interp|codegen   Motor de ejecución (por defecto: interp)")
+            print("  --timeout=SEGUNDOS        Tiempo máximo por ejecución (por defecto: sin límite)")
+            print("  --checkpoint=ARCHIVO      Guarda y reanuda encrypt/decrypt desde un checkpoint")
+            print("  --checkpoint-every=N      Pasos entre checkpoints (por defecto: 1000000)")
+            print("  --trace=ARCHIVO           Guarda la traza de encrypt/decrypt si la MT no acepta")
+            print("  --specialize              Usa MT especializadas en la llave (encrypt, decrypt, test, batch)")
+            print("  --shards[=N]              Divide el mensaje de encrypt/decrypt en N fragmentos en paralelo")
+            print("                            (por defecto: uno por CPU)")
+            print("  --workers=N               Procesos para test, batch, pipeline y serve (por defecto: uno por CPU)")
+            print("  --stages=M1,M2            pipeline: modo de cada etapa (por defecto: encrypt,decrypt)")
+            print("  --sample=F                verified: fracción de registros que también corre la MT")
+            print("  --divergences=ARCHIVO     verified: agrega ahí las diferencias con la MT (JSON lines)")
+            print("  --matrix=N                test: agrega N mensajes generados por cada una de las 26 llaves")
+            print("  --report=ARCHIVO          test: guarda un reporte JSON (o JUnit si termina en .xml)")
+            print("  --socket=RUTA             Socket Unix de serve y client (por defecto: TCP)")
+            print("  --host=H --port=P         Dirección TCP de serve y client (por defecto: 127.0.0.1:8765)")
+            print("  --chunk-size=N            Registros por bloque en batch (por defecto: 64, 1024 con --lockstep)")
+            print("                            o caracteres por bloque en stream (por defecto: 65536)")
+            print("  --lockstep                Ejecuta cada bloque de batch a la vez con NumPy")
+            print("  --machines=encrypt,decrypt  Máquinas del benchmark (por defecto: ambas)")
+            print("  --engines=interp,codegen  Motores del benchmark (por defecto: todos)")
+            print("  --full                    Benchmark con mensajes de 10 a 10^6 caracteres")
+            print("  --output=ARCHIVO          Guarda el reporte JSON del benchmark")
+            print("  --baseline=ARCHIVO        Compara contra un reporte guardado")
+            print("  --threshold=0.2           Tolerancia de regresión (por defecto: 20%)")
+            print("  --top=N                   Filas por tabla en profile (por defecto: todas)")
     else:
         # Modo interactivo
         while True:
@@ -272,12 +584,14 @@ def main():
             
             if choice == '1':
                 input_str = input("\nIngrese LLAVE#MENSAJE: ").strip()
-                run_encryption(input_str, verbose=True)
+                run_encryption(input_str, verbose=True, engine=engine, timeout=timeout,
+                               specialize=specialize)
             elif choice == '2':
                 input_str = input("\nIngrese LLAVE#CIFRADO: ").strip()
-                run_decryption(input_str, verbose=True)
+                run_decryption(input_str, verbose=True, engine=engine, timeout=timeout,
+                               specialize=specialize)
             elif choice == '3':
-                run_tests()
+                run_tests(engine, timeout, specialize)
             elif choice == '4':
                 print("\n¡Hasta luego!\n")
                 break
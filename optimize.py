@@ -0,0 +1,497 @@
+"""
+Optimizador de Máquinas de Turing Multicinta
+Fusiona transiciones que no mueven ningún cabezal, elimina estados
+inalcanzables y patrones tapados por otros anteriores, sin agrandar la tabla
+"""
+
+import copy
+import os
+import sys
+from itertools import product
+from typing import Any, Dict, List, Optional, Tuple
+
+from turing import TuringMachine, MOVES, Pattern, machine_wildcards, order_rules, state_rules
+from tapes import prepare_tapes
+
+
+# Máximo de combinaciones de símbolos que se revisan al fusionar una transición
+FUSE_LIMIT = 4096
+
+# Máximo de patrones en que se puede dividir una transición al quitar un estado
+SPLIT_LIMIT = 64
+
+# Rondas de fusión (cada ronda puede alargar una cadena en un paso)
+MAX_ROUNDS = 32
+
+# Una regla: (patrón, transición del JSON con write, move y next_state)
+Rule = Tuple[Pattern, Dict[str, Any]]
+
+
+def _format_pattern(pattern: Pattern, wildcards: Tuple[str, ...]) -> str:
+    return ','.join(wildcards[0] if symbol is None else symbol for symbol in pattern)
+
+
+def _covers(general: Optional[str], symbol: Optional[str], classes: Dict[str, Any]) -> bool:
+    """True si el elemento general de un patrón coincide con todo lo que coincide symbol"""
+    if general is None or general == symbol:
+        return True
+    if general not in classes or symbol is None:
+        return False
+    return set(classes.get(symbol, symbol)) <= set(classes[general])
+
+
+def _subsumes(general: Pattern, specific: Pattern, classes: Dict[str, Any]) -> bool:
+    """True si todo lo que coincide con specific coincide también con general"""
+    return all(_covers(g, s, classes) for g, s in zip(general, specific))
+
+
+def _overlaps(first: Pattern, second: Pattern, classes: Dict[str, Any]) -> bool:
+    """True si algún símbolo leído coincide con los dos patrones"""
+    for a, b in zip(first, second):
+        if a is None or b is None or a == b:
+            continue
+        if not set(classes.get(a, [a])) & set(classes.get(b, [b])):
+            return False
+    return True
+
+
+def _stationary(spec: Dict[str, Any]) -> bool:
+    """True si la transición no mueve ningún cabezal"""
+    return not any(move in MOVES for move in spec['move'])
+
+
+def _match(rules: List[Rule], symbols: Pattern, classes: Dict[str, Any]) -> Optional[Rule]:
+    """
+    Primera regla que coincide con los símbolos leídos
+    
+    Un None en symbols es un símbolo distinto de todos los que aparecen en
+    las reglas (también en sus clases): solo coincide con un comodín.
+    """
+    for rule in rules:
+        if all(p is None or p == s or (p in classes and s is not None and s in classes[p])
+               for p, s in zip(rule[0], symbols)):
+            return rule
+    return None
+
+
+def _compose(pattern: Pattern, first: Dict[str, Any], second: Dict[str, Any],
+             wildcards: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Transición equivalente a first (sin movimientos) seguida de second
+    
+    Las escrituras de second ganan; una escritura del mismo símbolo que se
+    leyó se vuelve '*' (no cambia la cinta).
+    """
+    write = []
+    for read, w1, w2 in zip(pattern, first['write'], second['write']):
+        symbol = w2 if w2 not in wildcards else w1
+        write.append(wildcards[0] if symbol in wildcards or symbol == read else symbol)
+    return {'write': write, 'move': list(second['move']), 'next_state': second['next_state']}
+
+
+def _fuse(state: str, rules: List[Rule], index: int, delta: Dict[str, List[Rule]],
+          accepting: set, wildcards: Tuple[str, ...], classes: Dict[str, Any]) -> Optional[Rule]:
+    """
+    Fusiona una transición sin movimientos con la que le sigue
+    
+    Los símbolos que quedan bajo los cabezales después de la transición se
+    conocen donde el patrón es exacto o donde se escribe un símbolo; donde
+    el patrón es una clase que no se sobrescribe puede quedar cualquiera de
+    sus símbolos, y donde es un comodín, cualquiera de los que prueba el
+    estado siguiente o uno distinto de todos. Solo se fusiona si todas esas
+    combinaciones llevan a la misma regla del estado siguiente: la regla
+    fusionada conserva el patrón (con sus clases y comodines) y la tabla no
+    crece.
+    
+    Returns:
+        Regla que reemplaza a la regla index, o None si no se fusiona
+    """
+    pattern, spec = rules[index]
+    target = spec['next_state']
+    if target == state or target in accepting or target not in delta:
+        return None
+    following = delta[target]
+    
+    after = tuple(w if w not in wildcards else p for p, w in zip(pattern, spec['write']))
+    values = {}
+    for i, symbol in enumerate(after):
+        if symbol is None:
+            values[i] = sorted({member for rule in following if rule[0][i] is not None
+                                for member in classes.get(rule[0][i], [rule[0][i]])}) + [None]
+        elif symbol in classes:
+            values[i] = sorted(classes[symbol])
+    
+    total = 1
+    for options in values.values():
+        total *= len(options)
+    if total > FUSE_LIMIT:
+        return None
+    
+    chosen = None
+    for combo in product(*values.values()):
+        symbols = list(after)
+        for i, symbol in zip(values, combo):
+            symbols[i] = symbol
+        rule = _match(following, tuple(symbols), classes)
+        # El estado siguiente rechaza o depende del símbolo: no se fusiona
+        if rule is None or (chosen is not None and rule is not chosen):
+            return None
+        chosen = rule
+    return pattern, _compose(pattern, spec, chosen[1], wildcards)
+
+
+def _split_fuse(state: str, rules: List[Rule], index: int, delta: Dict[str, List[Rule]],
+                accepting: set, wildcards: Tuple[str, ...], classes: Dict[str, Any]) -> Optional[List[Rule]]:
+    """
+    Fusiona una transición sin movimientos con la que le sigue, dividiéndola
+    
+    A diferencia de _fuse, el resultado puede tener varias reglas: solo se
+    usa para quitar un estado completo (ver _inline_state). Los símbolos que
+    quedan bajo los cabezales después de la transición se conocen donde el
+    patrón es exacto o donde se escribe un símbolo. Si la
+    regla del estado siguiente depende de una cinta desconocida, el patrón
+    se divide con los símbolos que ese estado prueba en esa cinta (los de
+    sus clases incluidos), más un patrón de respaldo con comodín para
+    cualquier otro símbolo. Una clase del patrón que la transición no
+    sobrescribe se divide antes en sus símbolos, como si la MT tuviera un
+    patrón por símbolo, y cada uno se fusiona por separado.
+    
+    Donde el estado siguiente rechaza, el patrón se quita si la transición
+    no escribe nada y ninguna regla posterior del estado coincide con él:
+    la MT rechaza un paso antes con las mismas cintas y cabezales. Si no, se
+    conserva la transición original.
+    
+    Returns:
+        Reglas que reemplazan a la regla index, o None si no se fusiona
+    """
+    pattern, spec = rules[index]
+    target = spec['next_state']
+    if target == state or target in accepting or target not in delta:
+        return None
+    following = delta[target]
+    
+    expand = [i for i, (p, w) in enumerate(zip(pattern, spec['write'])) if p in classes and w in wildcards]
+    if expand:
+        members = [sorted(classes[pattern[i]]) for i in expand]
+        total = 1
+        for options in members:
+            total *= len(options)
+        if total > SPLIT_LIMIT:
+            return None
+        earlier = [p for p, _ in rules[:index]]
+        expanded = []
+        changed = False
+        for combo in product(*members):
+            refined = list(pattern)
+            for i, symbol in zip(expand, combo):
+                refined[i] = symbol
+            refined = tuple(refined)
+            if any(_subsumes(p, refined, classes) for p in earlier):
+                continue
+            single = rules[:index] + [(refined, spec)] + rules[index + 1:]
+            replacement = _split_fuse(state, single, index, delta, accepting, wildcards, classes)
+            changed = changed or replacement is not None
+            expanded.extend(replacement or [(refined, spec)])
+        return expanded if changed else None
+    
+    after = tuple(w if w not in wildcards else p for p, w in zip(pattern, spec['write']))
+    unknown = [i for i, symbol in enumerate(after) if symbol is None]
+    candidates = [rule for rule in following
+                  if all(r is None or a is None or r == a or (r in classes and a in classes[r])
+                         for r, a in zip(rule[0], after))]
+    values = {i: sorted({symbol for rule in candidates if rule[0][i] is not None
+                         for symbol in classes.get(rule[0][i], [rule[0][i]])})
+              for i in unknown}
+    split = [i for i in unknown if values[i]]
+    
+    choices = [values[i] + [None] for i in split]
+    total = 1
+    for options in choices:
+        total *= len(options)
+    if total > SPLIT_LIMIT:
+        return None
+    
+    # Patrones con mayor prioridad que este, para no crear patrones que nunca se alcanzan
+    earlier = [p for p, _ in rules[:index]]
+    later = [p for p, _ in rules[index + 1:]]
+    silent = all(w in wildcards for w in spec['write'])
+    fused = []
+    changed = False
+    for combo in product(*choices):
+        refined = list(pattern)
+        symbols = list(after)
+        for i, symbol in zip(split, combo):
+            refined[i] = symbol
+            symbols[i] = symbol
+        refined = tuple(refined)
+        if any(_subsumes(p, refined, classes) for p in earlier):
+            continue
+        
+        rule = _match(following, tuple(symbols), classes)
+        if rule is None:
+            # El estado siguiente rechaza: se rechaza aquí o se conserva la transición original
+            if silent and not any(_overlaps(p, refined, classes) for p in later):
+                changed = True
+            else:
+                fused.append((refined, spec))
+        else:
+            fused.append((refined, _compose(refined, spec, rule[1], wildcards)))
+            changed = True
+    
+    if not changed:
+        return None
+    # Los patrones más específicos primero; el de respaldo (el original) al final
+    fused.sort(key=lambda rule: -sum(symbol is not None for symbol in rule[0]))
+    return fused
+
+
+def _inline_state(target: str, delta: Dict[str, List[Rule]], accepting: set,
+                  wildcards: Tuple[str, ...], classes: Dict[str, Any]) -> bool:
+    """
+    Quita un estado al que solo se llega con transiciones sin movimientos
+    
+    Cada transición que entra a target se fusiona con las de target (con
+    _fuse si alcanza una regla, si no con _split_fuse). Solo se aplica si
+    ninguna regla resultante sigue yendo a target, así que target queda
+    inalcanzable, y si la tabla no crece: las reglas nuevas no superan a las
+    que entraban más las de target.
+    
+    Returns:
+        True si se reemplazaron las transiciones que entraban a target
+    """
+    entries = [(state, rule) for state, rules in delta.items() for rule in rules
+               if rule[1]['next_state'] == target]
+    if not entries or any(state == target or not _stationary(rule[1]) for state, rule in entries):
+        return False
+    
+    replacements = []
+    for state, rule in entries:
+        rules = delta[state]
+        index = next(i for i, candidate in enumerate(rules) if candidate is rule)
+        single = _fuse(state, rules, index, delta, accepting, wildcards, classes)
+        replacement = [single] if single is not None else _split_fuse(state, rules, index, delta,
+                                                                      accepting, wildcards, classes)
+        if replacement is None or any(spec['next_state'] == target for _, spec in replacement):
+            return False
+        replacements.append(replacement)
+    
+    growth = sum(len(replacement) for replacement in replacements) - len(entries) - len(delta[target])
+    if growth > 0:
+        return False
+    for (state, rule), replacement in zip(entries, replacements):
+        rules = delta[state]
+        index = next(i for i, candidate in enumerate(rules) if candidate is rule)
+        rules[index:index + 1] = replacement
+        delta[state] = order_rules(rules, classes)
+    return True
+
+
+def _prune_shadowed(rules: List[Rule], classes: Dict[str, Any]) -> Tuple[List[Rule], int]:
+    """Quita las reglas que una regla anterior cubre por completo"""
+    kept: List[Rule] = []
+    for rule in rules:
+        if not any(_subsumes(previous[0], rule[0], classes) for previous in kept):
+            kept.append(rule)
+    return kept, len(rules) - len(kept)
+
+
+def _reachable(initial: str, delta: Dict[str, List[Rule]]) -> set:
+    """Estados alcanzables desde el inicial siguiendo las transiciones"""
+    seen = {initial}
+    pending = [initial]
+    while pending:
+        for _, spec in delta.get(pending.pop(), ()):
+            if spec['next_state'] not in seen:
+                seen.add(spec['next_state'])
+                pending.append(spec['next_state'])
+    return seen
+
+
+def optimize_machine(config: Dict[str, Any], fuse: bool = True) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Produce una MT equivalente con menos pasos, estados y patrones
+    
+    La MT optimizada termina con el mismo resultado, las mismas cintas y los
+    mismos cabezales que la original para cualquier entrada; solo cambia el
+    número de pasos. Nunca tiene más patrones que la original: una fusión
+    que dividiría un patrón solo se aplica si quita un estado entero sin
+    agrandar la tabla (ver _inline_state). El perfil de complejidad se quita
+    porque ya no corresponde (write_machine lo vuelve a medir).
+    
+    Args:
+        config: Diccionario con la definición de la MT
+        fuse: Si False, solo se eliminan estados y patrones sobrantes
+        
+    Returns:
+        Tupla (configuración optimizada, estadísticas)
+    """
+    wildcards = machine_wildcards(config)
+    classes = config.get('classes', {})
+    accepting = set(config['F'])
+    stats = {'states_before': len(config['Q']), 'rules_before': 0, 'fused': 0, 'inlined': 0,
+             'shadowed': 0, 'malformed': 0, 'unreachable': 0, 'redundant_writes': 0}
+    
+    delta: Dict[str, List[Rule]] = {}
+    for state, patterns in config['delta'].items():
+        rules = []
+        parsed = state_rules(patterns, config)
+        stats['rules_before'] += len(patterns)
+        stats['malformed'] += len(patterns) - len(parsed)
+        for pattern, spec in parsed:
+            spec = copy.deepcopy(spec)
+            # Escribir el mismo símbolo que se leyó no cambia la cinta
+            for i, (read, write) in enumerate(zip(pattern, spec['write'])):
+                if read is not None and write == read:
+                    spec['write'][i] = wildcards[0]
+                    stats['redundant_writes'] += 1
+            rules.append((pattern, spec))
+        delta[state] = rules
+    
+    # Cada fusión reemplaza una regla por otra y cada estado quitado no
+    # agrega reglas, así que la tabla nunca crece; los estados que ya nadie
+    # usa se quitan al final
+    for _ in range(MAX_ROUNDS if fuse else 0):
+        changed = False
+        for state, rules in delta.items():
+            for index, (pattern, spec) in enumerate(rules):
+                if _stationary(spec):
+                    replacement = _fuse(state, rules, index, delta, accepting, wildcards, classes)
+                    if replacement is not None:
+                        rules[index] = replacement
+                        stats['fused'] += 1
+                        changed = True
+        for target in list(delta):
+            if target != config['q0'] and target not in accepting and _inline_state(
+                    target, delta, accepting, wildcards, classes):
+                stats['inlined'] += 1
+                changed = True
+        if not changed:
+            break
+    
+    for state in delta:
+        delta[state], shadowed = _prune_shadowed(delta[state], classes)
+        stats['shadowed'] += shadowed
+    
+    reachable = _reachable(config['q0'], delta)
+    states = [state for state in config['Q'] if state in reachable]
+    stats['unreachable'] = len(config['Q']) - len(states)
+    
+    optimized = {key: value for key, value in config.items() if key != 'complexity'}
+    optimized['Q'] = states
+    optimized['F'] = [state for state in config['F'] if state in reachable]
+    optimized['delta'] = {
+        state: {_format_pattern(pattern, wildcards): spec for pattern, spec in rules}
+        for state, rules in delta.items() if state in reachable and rules
+    }
+    stats['states_after'] = len(states)
+    stats['rules_after'] = sum(len(rules) for rules in optimized['delta'].values())
+    return optimized, stats
+
+
+def load_corpus(path: str = 'tests.txt') -> List[str]:
+    """
+    Registros del archivo de pruebas para verificar equivalencia
+    
+    Cada línea 'LLAVE#MENSAJE → CIFRADO' aporta dos registros: el mensaje y
+    el cifrado con la misma llave, para ejercitar también el descifrado.
+    """
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('→')
+            if len(parts) != 2:
+                continue
+            record = parts[0].strip()
+            records.append(record)
+            records.append(f"{record.split('#', 1)[0]}#{parts[1].strip()}")
+    return records
+
+
+def verify_equivalence(original: Dict[str, Any], optimized: Dict[str, Any], records: List[str],
+                       max_steps: int = 10 ** 7) -> Dict[str, Any]:
+    """
+    Ejecuta ambas MT sobre un corpus y compara resultado, cintas y cabezales
+    
+    Args:
+        original: Definición original
+        optimized: Definición optimizada
+        records: Registros LLAVE#MENSAJE
+        max_steps: Límite de pasos por ejecución
+        
+    Returns:
+        Diccionario con cases, steps_before, steps_after y mismatches (lista
+        de registros con el resultado de cada MT)
+    """
+    machines = (TuringMachine(original), TuringMachine(optimized))
+    report: Dict[str, Any] = {'cases': len(records), 'steps_before': 0, 'steps_after': 0,
+                              'mismatches': []}
+    for record in records:
+        tapes = prepare_tapes(record, original.get('alphabet'))
+        outcomes = []
+        for machine in machines:
+            tm = machine.spawn()
+            tm.load_input(tapes[0], tapes)
+            status = tm.run_guarded(max_steps)
+            outcomes.append({
+                'status': status,
+                'steps': tm.steps,
+                'tapes': [tm.get_tape_content(i) for i in range(tm.num_tapes)],
+                'heads': [tape.position(head) for tape, head in zip(tm.tapes, tm.heads)],
+            })
+        before, after = outcomes
+        report['steps_before'] += before['steps']
+        report['steps_after'] += after['steps']
+        if any(before[key] != after[key] for key in ('status', 'tapes', 'heads')):
+            report['mismatches'].append({'record': record, 'original': before, 'optimized': after})
+    return report
+
+
+def run_optimize_command(mode: str, options: Dict[str, str]) -> int:
+    """
+    Optimiza una de las MT desde la línea de comandos
+    
+    Opciones (--nombre=valor): output (por defecto MODO.opt.json), verify
+    (compara contra la original con tests.txt) y no-fuse.
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        options: Opciones de parse_options
+        
+    Returns:
+        Número de registros en que las MT difieren (0 sin --verify)
+    """
+    import json
+    from main import MACHINES
+    from generate_mt_json import write_machine
+    
+    with open(MACHINES[mode], 'r', encoding='utf-8') as f:
+        original = json.load(f)
+    optimized, stats = optimize_machine(original, fuse='no-fuse' not in options)
+    
+    output = options.get('output') or f"{mode}.opt.json"
+    write_machine(optimized, output)
+    size_before, size_after = os.path.getsize(MACHINES[mode]), os.path.getsize(output)
+    print(f"{MACHINES[mode]} -> {output}")
+    print(f"  Estados: {stats['states_before']} -> {stats['states_after']} "
+          f"({stats['unreachable']} inalcanzables, {stats['inlined']} fusionados con los anteriores)")
+    print(f"  Patrones: {stats['rules_before']} -> {stats['rules_after']} "
+          f"({stats['fused']} fusiones, {stats['shadowed']} tapados, {stats['malformed']} mal formados)")
+    print(f"  Escrituras redundantes quitadas: {stats['redundant_writes']}")
+    print(f"  Tamaño: {size_before:,} -> {size_after:,} bytes")
+    if size_after > size_before:
+        print(f"AVISO: {output} ocupa más que {MACHINES[mode]}", file=sys.stderr)
+    
+    if 'verify' not in options:
+        return 0
+    report = verify_equivalence(original, optimized, load_corpus())
+    saved = report['steps_before'] - report['steps_after']
+    print(f"  Verificación: {report['cases']} casos, pasos {report['steps_before']} -> "
+          f"{report['steps_after']} ({100 * saved / max(1, report['steps_before']):.1f}% menos)")
+    for mismatch in report['mismatches']:
+        print(f"  DIFERENCIA {mismatch['record']}: {mismatch['original']['status']} "
+              f"{mismatch['original']['tapes'][2]!r} != {mismatch['optimized']['status']} "
+              f"{mismatch['optimized']['tapes'][2]!r}", file=sys.stderr)
+    return len(report['mismatches'])
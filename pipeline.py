@@ -0,0 +1,380 @@
+"""
+Pipeline de Máquinas de Turing en un mismo proceso
+Encadena MT (por ejemplo cifrado → descifrado): la cinta 3 de una etapa pasa
+a ser la cinta 1 de la siguiente sin copiar su buffer
+"""
+
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from turing import load_turing_machine, TuringMachine, Tape, ACCEPT, LOOP, OUTPUT_TAPE
+from budget import Budget
+from batch import _chunks
+from main import MACHINES
+from tapes import prepare_tape_1, prepare_tape_2_unary, prepare_tape_4_alphabet, parse_input
+
+
+# Etapas por defecto: una ida y vuelta
+ROUND_TRIP = ('encrypt', 'decrypt')
+
+# Cinta de entrada de cada etapa (la de salida es OUTPUT_TAPE, la cinta 3)
+INPUT_TAPE = 0
+
+
+def written_tapes(machine: TuringMachine) -> Set[int]:
+    """Cintas en las que alguna transición de la MT escribe"""
+    return {tape for transition in machine.program.transitions for tape, _ in transition[2]}
+
+
+class Handoff:
+    """
+    Estado de un registro entre dos etapas
+    
+    tapes y heads son las cintas y cabezales iniciales de la etapa que
+    sigue; stages acumula el status y los pasos de las que ya corrieron.
+    """
+    
+    __slots__ = ('record', 'key', 'prefix', 'message', 'tapes', 'heads', 'stages', 'outputs', 'error')
+    
+    def __init__(self, record: str):
+        self.record = record
+        self.key = ''
+        self.prefix = ''
+        self.message = ''
+        self.tapes: List[Tape] = []
+        self.heads: List[int] = []
+        self.stages: List[Dict[str, Any]] = []
+        self.outputs: List[str] = []
+        self.error: Optional[str] = None
+    
+    @property
+    def running(self) -> bool:
+        """True si el registro sigue en el pipeline (sin error ni rechazo)"""
+        return self.error is None and all(stage['status'] == ACCEPT for stage in self.stages)
+
+
+class Pipeline:
+    """
+    Cadena de MT que se pasan la cinta de salida como cinta de entrada
+    
+    Cada registro LLAVE#MENSAJE arma sus cintas una sola vez. La cinta 3 de
+    cada etapa se crea con un hueco de blancos del largo de LLAVE# antes de
+    la posición 0; cuando la etapa acepta, LLAVE# se escribe en ese hueco y
+    el mismo objeto Tape (el mismo buffer) es la cinta 1 de la etapa
+    siguiente, con el cabezal en el inicio de la llave. Si la MT escribió en
+    el hueco o las dos MT numeran distinto los símbolos, la cinta se
+    reconstruye a partir del texto (una copia).
+    
+    Las cintas 2 y 4 se comparten entre etapas cuando ninguna de las dos MT
+    escribe en ellas y ambas usan el mismo alfabeto: el contenido sería
+    idéntico, así que la etapa siguiente solo vuelve el cabezal al inicio.
+    
+    run_many encadena las etapas como generadores: cada etapa consume los
+    registros que la anterior le entrega, uno a la vez, así que en memoria
+    solo hay un registro por etapa.
+    """
+    
+    def __init__(self, machines: List[TuringMachine], timeout: Optional[float] = None):
+        """
+        Args:
+            machines: MT de cada etapa, en orden (se usan como prototipo con spawn)
+            timeout: Segundos máximos por etapa (None = sin límite)
+        """
+        if not machines:
+            raise ValueError("El pipeline necesita al menos una MT")
+        self.machines = machines
+        self.timeout = timeout
+        self.alphabets = [machine.config.get('alphabet') for machine in machines]
+        
+        # Por cada par de etapas: si la cinta de salida se entrega sin traducir
+        # y qué cintas (además de la 1 y la 3) se comparten
+        self.zero_copy = []
+        self.shared = []
+        writes = [written_tapes(machine) for machine in machines]
+        for index in range(1, len(machines)):
+            source, target = machines[index - 1].program, machines[index].program
+            self.zero_copy.append(source.symbols == target.symbols and source.typecode == target.typecode)
+            self.shared.append({
+                tape for tape in range(1, machines[index].num_tapes)
+                if tape != OUTPUT_TAPE and tape < machines[index - 1].num_tapes
+                and self.zero_copy[-1] and self.alphabets[index - 1] == self.alphabets[index]
+                and tape not in writes[index - 1] and tape not in writes[index]
+            })
+    
+    def _output_tape(self, machine: TuringMachine, gap: int) -> Tape:
+        """Cinta 3 vacía con gap blancos reservados antes de la posición 0"""
+        tape = Tape(machine.program.encode('_' * (gap + 1)), machine._fill)
+        tape.origin = gap
+        return tape
+    
+    def start(self, record: str) -> Handoff:
+        """
+        Arma las cintas de la primera etapa
+        
+        Returns:
+            Handoff listo para la etapa 0 (con error si el registro es inválido)
+        """
+        handoff = Handoff(record)
+        machine = self.machines[0]
+        alphabet = self.alphabets[0]
+        try:
+            key, _ = parse_input(record, alphabet)
+            tape1 = prepare_tape_1(record, alphabet)
+            tapes = [tape1, prepare_tape_2_unary(key, alphabet), '_', prepare_tape_4_alphabet(alphabet)]
+        except ValueError as e:
+            handoff.error = str(e)
+            return handoff
+        
+        cut = tape1.index('#') + 1
+        handoff.key = key
+        handoff.prefix, handoff.message = tape1[:cut], tape1[cut:]
+        encode, fill = machine.program.encode, machine._fill
+        handoff.tapes = [Tape(encode(text), fill) for text in tapes]
+        handoff.tapes[OUTPUT_TAPE] = self._output_tape(machine, len(handoff.prefix))
+        handoff.heads = [tape.origin for tape in handoff.tapes]
+        return handoff
+    
+    def _handoff(self, index: int, tm: TuringMachine, handoff: Handoff):
+        """
+        Prepara las cintas de la etapa index + 1 con las de la MT que terminó
+        
+        La cinta 3 de tm pasa a ser la cinta 1 con LLAVE# delante; las
+        cintas compartidas se reutilizan y las demás se arman de nuevo.
+        """
+        machine = self.machines[index + 1]
+        output = tm.tapes[OUTPUT_TAPE]
+        gap = len(handoff.prefix)
+        start = output.origin - gap
+        blank = output.fill[0]
+        if self.zero_copy[index] and start >= 0 and all(s == blank for s in output.buffer[start:output.origin]):
+            # Sin copiar: LLAVE# se escribe en el hueco reservado
+            output.buffer[start:output.origin] = machine.program.encode(handoff.prefix)
+            output.origin = start
+            tape1 = output
+        else:
+            text = tm.get_tape_content(OUTPUT_TAPE)
+            tape1 = Tape(machine.program.encode(handoff.prefix + text), machine._fill)
+        
+        tapes = [tape1]
+        alphabet = self.alphabets[index + 1]
+        for tape in range(1, machine.num_tapes):
+            if tape in self.shared[index]:
+                tapes.append(tm.tapes[tape])
+            elif tape == OUTPUT_TAPE:
+                tapes.append(self._output_tape(machine, gap))
+            else:
+                if tape == 1:
+                    text = prepare_tape_2_unary(handoff.key, alphabet)
+                elif tape == 3:
+                    text = prepare_tape_4_alphabet(alphabet)
+                else:
+                    text = ''
+                tapes.append(Tape(machine.program.encode(text), machine._fill))
+        handoff.tapes = tapes
+        handoff.heads = [tape.origin for tape in tapes]
+    
+    def run_stage(self, index: int, handoff: Handoff, keep_outputs: bool = False) -> Handoff:
+        """
+        Ejecuta la etapa index sobre un registro y entrega sus cintas a la siguiente
+        
+        Args:
+            index: Número de etapa
+            handoff: Registro con las cintas de la etapa
+            keep_outputs: Si True, guarda el texto de la cinta 3 de cada etapa
+            
+        Returns:
+            El mismo Handoff, con el resultado de la etapa
+        """
+        if not handoff.running:
+            return handoff
+        machine = self.machines[index]
+        tm = machine.spawn()
+        tm.load_tapes(handoff.tapes, handoff.heads)
+        # Largo de la cinta 1 (LLAVE# más el texto), como en una ejecución aparte
+        length = tm.tapes[INPUT_TAPE].extent()[1] - handoff.heads[INPUT_TAPE]
+        budget = Budget.for_input(machine.config.get('complexity'), length, timeout=self.timeout)
+        status = tm.simulate(budget=budget, output_tape=None).status
+        
+        stage = {'status': status, 'steps': tm.steps}
+        if status == LOOP:
+            stage['cycle_length'] = tm.cycle_length
+        handoff.stages.append(stage)
+        
+        last = index == len(self.machines) - 1
+        if keep_outputs or last or status != ACCEPT:
+            handoff.outputs.append(tm.get_tape_content(OUTPUT_TAPE))
+        if status == ACCEPT and not last:
+            self._handoff(index, tm, handoff)
+        else:
+            handoff.tapes = handoff.heads = []
+        return handoff
+    
+    def stage(self, index: int, handoffs: Iterable[Handoff], keep_outputs: bool = False) -> Iterator[Handoff]:
+        """Etapa como consumidor/productor: ejecuta cada registro que recibe y lo entrega"""
+        for handoff in handoffs:
+            yield self.run_stage(index, handoff, keep_outputs)
+    
+    def result(self, handoff: Handoff) -> Dict[str, Any]:
+        """
+        Resultado de un registro que salió del pipeline
+        
+        round_trip es True si todas las etapas aceptaron y la última salida
+        es el mensaje original (el que sigue a LLAVE# en la cinta 1).
+        """
+        if handoff.error is not None:
+            return {'input': handoff.record, 'status': 'error', 'accepted': False, 'steps': 0,
+                    'round_trip': False, 'error': handoff.error}
+        last = handoff.stages[-1]
+        accepted = len(handoff.stages) == len(self.machines) and last['status'] == ACCEPT
+        output = handoff.outputs[-1]
+        result = {
+            'input': handoff.record,
+            'status': last['status'],
+            'accepted': accepted,
+            'steps': sum(stage['steps'] for stage in handoff.stages),
+            'stages': handoff.stages,
+            'output': output,
+            'round_trip': accepted and output == handoff.message,
+        }
+        if len(handoff.outputs) > 1:
+            result['outputs'] = handoff.outputs
+        return result
+    
+    def run(self, record: str, keep_outputs: bool = False) -> Dict[str, Any]:
+        """
+        Ejecuta un registro LLAVE#MENSAJE por todas las etapas
+        
+        Args:
+            record: Registro en formato LLAVE#MENSAJE
+            keep_outputs: Si True, el resultado trae la salida de cada etapa en outputs
+            
+        Returns:
+            Diccionario con status, accepted, steps, stages, output y round_trip (o error)
+        """
+        handoff = self.start(record)
+        for index in range(len(self.machines)):
+            self.run_stage(index, handoff, keep_outputs)
+        return self.result(handoff)
+    
+    def run_many(self, records: Iterable[str], keep_outputs: bool = False) -> Iterator[Dict[str, Any]]:
+        """Ejecuta muchos registros con las etapas encadenadas como generadores"""
+        handoffs = map(self.start, records)
+        for index in range(len(self.machines)):
+            handoffs = self.stage(index, handoffs, keep_outputs)
+        for handoff in handoffs:
+            yield self.result(handoff)
+
+
+def load_pipeline(modes: Iterable[str] = ROUND_TRIP, engine: str = 'interp',
+                  timeout: Optional[float] = None) -> Pipeline:
+    """Carga y compila las MT de cada etapa ('encrypt' o 'decrypt')"""
+    return Pipeline([load_turing_machine(MACHINES[mode], engine) for mode in modes], timeout)
+
+
+# Pipeline cargado una vez por proceso del pool (ver _init_worker)
+_PIPELINE: Optional[Pipeline] = None
+
+
+def _init_worker(modes: tuple, engine: str, timeout: Optional[float]):
+    """Carga y compila las MT del pipeline una sola vez en cada proceso"""
+    global _PIPELINE
+    _PIPELINE = load_pipeline(modes, engine, timeout)
+
+
+def _process_chunk(records: List[str]) -> List[Dict[str, Any]]:
+    """Procesa un bloque de registros con el pipeline del proceso"""
+    return list(_PIPELINE.run_many(records))
+
+
+def run_pipeline(records: Iterable[str], modes: Iterable[str] = ROUND_TRIP, workers: Optional[int] = None,
+                 chunk_size: int = 64, engine: str = 'interp',
+                 timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Ejecuta muchos registros por el pipeline, repartidos en procesos
+    
+    Cada proceso corre todas las etapas de sus bloques, así que las cintas
+    nunca salen del proceso. Los resultados salen en el mismo orden que los
+    registros.
+    
+    Args:
+        records: Registros LLAVE#MENSAJE
+        modes: Modo de cada etapa (por defecto cifrado y descifrado)
+        workers: Número de procesos (por defecto, uno por CPU; 1 = sin pool)
+        chunk_size: Registros por bloque enviado a cada proceso
+        engine: Motor de ejecución ('interp' o 'codegen')
+        timeout: Segundos máximos por etapa
+        
+    Yields:
+        Un diccionario de resultado por registro, con su índice
+    """
+    modes = tuple(modes)
+    workers = workers or os.cpu_count() or 1
+    index = 0
+    
+    if workers == 1:
+        _init_worker(modes, engine, timeout)
+        for result in _PIPELINE.run_many(records):
+            yield {'index': index, **result}
+            index += 1
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(modes, engine, timeout)) as executor:
+        pending = deque()
+        for chunk in _chunks(records, max(1, chunk_size)):
+            pending.append(executor.submit(_process_chunk, chunk))
+            if len(pending) >= workers * 2:
+                for result in pending.popleft().result():
+                    yield {'index': index, **result}
+                    index += 1
+        while pending:
+            for result in pending.popleft().result():
+                yield {'index': index, **result}
+                index += 1
+
+
+def run_pipeline_file(path: str, modes: Iterable[str] = ROUND_TRIP, workers: Optional[int] = None,
+                      chunk_size: int = 64, engine: str = 'interp', out=None,
+                      timeout: Optional[float] = None) -> int:
+    """
+    Procesa un archivo de registros por el pipeline y escribe JSON lines
+    
+    Los registros que fallan se vuelven a ejecutar guardando la salida de
+    cada etapa (outputs), para ver en cuál se perdió el mensaje.
+    
+    Args:
+        path: Archivo con un registro por línea ('-' para stdin)
+        modes: Modo de cada etapa
+        workers: Número de procesos
+        chunk_size: Registros por bloque
+        engine: Motor de ejecución
+        out: Flujo de salida (por defecto stdout)
+        timeout: Segundos máximos por etapa
+        
+    Returns:
+        Número de registros que no volvieron al mensaje original
+    """
+    out = out or sys.stdout
+    modes = tuple(modes)
+    source = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    failures = 0
+    detail = None
+    
+    try:
+        records = (line.rstrip('\r\n') for line in source if line.strip())
+        for result in run_pipeline(records, modes, workers, chunk_size, engine, timeout):
+            if not result['round_trip']:
+                failures += 1
+                if 'stages' in result:
+                    detail = detail or load_pipeline(modes, engine, timeout)
+                    result = {'index': result['index'], **detail.run(result['input'], keep_outputs=True)}
+            out.write(json.dumps(result, ensure_ascii=False) + '\n')
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    
+    return failures
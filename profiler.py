@@ -0,0 +1,138 @@
+"""
+Perfilado de Máquinas de Turing Multicinta
+Cuenta pasos y tiempo por estado, usos por transición, recorrido de los
+cabezales y crecimientos de cinta
+"""
+
+import json
+from typing import Dict, List, Optional, Any
+
+from turing import Program
+
+
+def transition_label(program: Program, tid: int) -> str:
+    """
+    Describe una transición como 'estado [patrón] -> siguiente'
+    
+    Si la misma transición aparece en varios patrones se muestra el
+    primero y cuántos más hay.
+    """
+    _, next_state, _, _ = program.transitions[tid]
+    for state, state_index in enumerate(program.index):
+        if state_index is None:
+            continue
+        patterns = [pattern for pattern, t in state_index.patterns if t[0] == tid]
+        if not patterns:
+            continue
+        symbols = [program.wildcards[0]] * program.num_tapes
+        names = {members: name for name, members in program.classes.items()}
+        for i, symbol in zip(state_index.positions, patterns[0]):
+            if type(symbol) is frozenset:
+                symbols[i] = names[symbol]
+            elif symbol is not None:
+                symbols[i] = program.symbols[symbol]
+        label = f"{program.state_names[state]} [{','.join(symbols)}]"
+        if len(patterns) > 1:
+            label += f" (+{len(patterns) - 1})"
+        return f"{label} -> {program.state_names[next_state]}"
+    return f"#{tid} -> {program.state_names[next_state]}"
+
+
+class Profiler:
+    """
+    Contadores de una o varias ejecuciones de una MT
+    
+    Se pasa a TuringMachine.run (o _run_loop) con profiler=...; sin él la
+    MT usa su bucle normal y el perfilado no cuesta nada. Los contadores se
+    acumulan entre ejecuciones hasta llamar a reset().
+    """
+    
+    def __init__(self, program: Program):
+        """
+        Args:
+            program: Program de la MT que se va a perfilar
+        """
+        self.program = program
+        self.reset()
+    
+    def reset(self):
+        """Pone todos los contadores en cero"""
+        program = self.program
+        self.runs = 0
+        self.steps = 0
+        # Por id de estado
+        self.state_hits: List[int] = [0] * len(program.state_names)
+        self.state_ns: List[int] = [0] * len(program.state_names)
+        # Por id de transición
+        self.transition_hits: List[int] = [0] * len(program.transitions)
+        # Por cinta
+        self.head_travel: List[int] = [0] * program.num_tapes
+        self.tape_growth: List[int] = [0] * program.num_tapes
+        # Pasos ejecutados de un salto por los barridos
+        self.swept_steps = 0
+    
+    def transition_label(self, tid: int) -> str:
+        """Describe una transición (ver transition_label)"""
+        return transition_label(self.program, tid)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Exporta los contadores con nombres de estado y de transición
+        
+        Returns:
+            Diccionario serializable a JSON; estados y transiciones sin usos
+            se omiten y quedan ordenados de mayor a menor número de pasos
+        """
+        names = self.program.state_names
+        states = sorted(
+            ({'state': names[state], 'hits': hits, 'seconds': self.state_ns[state] / 1e9}
+             for state, hits in enumerate(self.state_hits) if hits),
+            key=lambda entry: -entry['hits'])
+        transitions = sorted(
+            ({'transition': self.transition_label(tid), 'hits': hits}
+             for tid, hits in enumerate(self.transition_hits) if hits),
+            key=lambda entry: -entry['hits'])
+        return {
+            'runs': self.runs,
+            'steps': self.steps,
+            'swept_steps': self.swept_steps,
+            'states': states,
+            'transitions': transitions,
+            'tapes': [{'tape': i + 1, 'head_travel': travel, 'growth': growth}
+                      for i, (travel, growth) in enumerate(zip(self.head_travel, self.tape_growth))],
+        }
+    
+    def to_json(self, indent: Optional[int] = 2) -> str:
+        """Exporta los contadores como JSON"""
+        return json.dumps(self.to_dict(), indent=indent, ensure_ascii=False)
+    
+    def format_table(self, top: Optional[int] = None) -> str:
+        """
+        Tabla de texto plano con estados, transiciones y cintas
+        
+        Args:
+            top: Máximo de filas de estados y de transiciones (None = todas)
+            
+        Returns:
+            Texto de la tabla
+        """
+        data = self.to_dict()
+        steps = data['steps'] or 1
+        lines = [f"Ejecuciones: {data['runs']}  Pasos: {data['steps']}  "
+                 f"(en barridos: {data['swept_steps']})", ""]
+        
+        lines.append(f"{'Estado':<32} {'Pasos':>10} {'%':>6} {'Tiempo (ms)':>12}")
+        for entry in data['states'][:top]:
+            lines.append(f"{entry['state']:<32} {entry['hits']:>10} "
+                         f"{100 * entry['hits'] / steps:>6.1f} {entry['seconds'] * 1000:>12.3f}")
+        
+        lines += ["", f"{'Transición':<60} {'Usos':>10} {'%':>6}"]
+        for entry in data['transitions'][:top]:
+            lines.append(f"{entry['transition']:<60} {entry['hits']:>10} "
+                         f"{100 * entry['hits'] / steps:>6.1f}")
+        
+        lines += ["", f"{'Cinta':<8} {'Recorrido':>12} {'Crecimientos':>14}"]
+        for entry in data['tapes']:
+            lines.append(f"{entry['tape']:<8} {entry['head_travel']:>12} {entry['growth']:>14}")
+        
+        return "\n".join(lines)
@@ -0,0 +1,520 @@
+"""
+Servicio local de Máquinas de Turing de Cifrado César
+Mantiene las MT compiladas en un pool de procesos y atiende peticiones JSON
+lines por un socket Unix o TCP en localhost
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import socket
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from turing import load_turing_machine, TuringMachine
+from batch import process_record
+from main import MACHINES
+
+
+# Dirección por defecto del servicio TCP
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+
+# Peticiones en vuelo por conexión: al llegar a este número se deja de leer
+# del socket hasta que salga alguna respuesta
+MAX_INFLIGHT = 256
+
+# Registros en espera de un proceso del pool; al llenarse, las conexiones
+# esperan antes de encolar más
+MAX_QUEUED = 4096
+
+# Máximo de registros que se envían juntos a un proceso del pool
+DISPATCH_BATCH = 64
+
+# Límites superiores (en milisegundos) de las cubetas del histograma
+LATENCY_BUCKETS = (0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+# Largo máximo de una línea de petición
+LINE_LIMIT = 64 * 1024 * 1024
+
+
+# MT cargadas una vez por proceso del pool (ver _init_worker)
+_MACHINES: Dict[str, TuringMachine] = {}
+
+
+def _init_worker(engine: str):
+    """Carga y compila las MT de todos los modos en cada proceso del pool"""
+    for mode, json_file in MACHINES.items():
+        _MACHINES[mode] = load_turing_machine(json_file, engine)
+
+
+def _run_records(mode: str, records: List[str], timeout: Optional[float]) -> List[Dict[str, Any]]:
+    """Ejecuta un grupo de registros con la MT del proceso"""
+    return [process_record(_MACHINES[mode], record, timeout=timeout) for record in records]
+
+
+class LatencyHistogram:
+    """
+    Histograma de latencias con cubetas fijas en escala logarítmica
+    
+    Los percentiles se estiman con el límite superior de la cubeta en que
+    caen, así que son cotas (nunca subestiman la latencia real).
+    """
+    
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS):
+        """
+        Args:
+            buckets: Límites superiores de las cubetas en milisegundos
+        """
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def record(self, seconds: float):
+        """Agrega una latencia"""
+        ms = seconds * 1000
+        self.counts[bisect.bisect_left(self.buckets, ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.max = max(self.max, ms)
+    
+    def percentile(self, fraction: float) -> float:
+        """Cota superior del percentil (0-1) en milisegundos"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (self.max,), self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Resumen serializable a JSON"""
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count if self.count else 0.0,
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'max_ms': self.max,
+            'buckets': {f"<={bound}": count for bound, count in zip(self.buckets, self.counts) if count},
+            'overflow': self.counts[-1],
+        }
+
+
+class MachineService:
+    """
+    Núcleo del servicio: cola de registros, pool de procesos y métricas
+    
+    Cada registro se encola con un future. Un despachador toma de la cola
+    todo lo que haya disponible (hasta DISPATCH_BATCH registros), lo agrupa
+    por modo y envía cada grupo a un proceso del pool. Con poca carga cada
+    registro sale solo y sin esperas; con mucha carga los registros se
+    agrupan y el costo de enviar trabajo al pool se reparte. La cola está
+    acotada, así que los clientes que envían más rápido de lo que el pool
+    procesa esperan (backpressure).
+    """
+    
+    def __init__(self, workers: Optional[int] = None, engine: str = 'interp',
+                 max_queued: int = MAX_QUEUED, dispatch_batch: int = DISPATCH_BATCH):
+        """
+        Args:
+            workers: Procesos del pool (por defecto, uno por CPU)
+            engine: Motor de ejecución ('interp' o 'codegen')
+            max_queued: Máximo de registros esperando un proceso
+            dispatch_batch: Máximo de registros por envío al pool
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.engine = engine
+        self.max_queued = max_queued
+        self.dispatch_batch = dispatch_batch
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.running = 0
+        self.connections = 0
+        self.started = time.monotonic()
+        self.requests = 0
+        self.errors = 0
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+    
+    async def start(self):
+        """Crea el pool, carga las MT en cada proceso y arranca el despachador"""
+        self.queue = asyncio.Queue(self.max_queued)
+        # Dos envíos por proceso: uno corriendo y otro listo para empezar
+        self._slots = asyncio.Semaphore(self.workers * 2)
+        self.executor = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                            initargs=(self.engine,))
+        loop = asyncio.get_running_loop()
+        # Calentar todos los procesos antes de aceptar conexiones
+        await asyncio.gather(*(loop.run_in_executor(self.executor, _run_records, 'encrypt', [], None)
+                               for _ in range(self.workers)))
+        self._dispatcher = asyncio.create_task(self._dispatch())
+    
+    async def close(self):
+        """Detiene el despachador y el pool"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    @property
+    def queue_depth(self) -> int:
+        """Registros en la cola más los que están en el pool"""
+        return (self.queue.qsize() if self.queue is not None else 0) + self.running
+    
+    async def run(self, mode: str, record: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Ejecuta un registro en el pool
+        
+        Args:
+            mode: 'encrypt' o 'decrypt'
+            record: Registro LLAVE#MENSAJE
+            timeout: Segundos máximos de ejecución de la MT
+            
+        Returns:
+            Resultado como en batch.process_record
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((mode, record, timeout, future))
+        return await future
+    
+    async def _dispatch(self):
+        """Agrupa los registros de la cola y los envía al pool"""
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self.queue.get()]
+            while len(items) < self.dispatch_batch and not self.queue.empty():
+                items.append(self.queue.get_nowait())
+            
+            groups: Dict[tuple, list] = {}
+            for item in items:
+                groups.setdefault((item[0], item[2]), []).append(item)
+            for (mode, timeout), group in groups.items():
+                await self._slots.acquire()
+                self.running += len(group)
+                try:
+                    task = loop.run_in_executor(self.executor, _run_records, mode,
+                                                [item[1] for item in group], timeout)
+                except Exception as e:
+                    # Pool roto: el error se entrega a cada registro y el
+                    # despachador sigue atendiendo la cola
+                    task = loop.create_future()
+                    task.set_exception(e)
+                task.add_done_callback(lambda done, group=group: self._deliver(done, group))
+    
+    def _deliver(self, done: asyncio.Future, group: list):
+        """Entrega los resultados de un envío a los futures de cada registro"""
+        self._slots.release()
+        self.running -= len(group)
+        error = done.exception()
+        for index, (_, _, _, future) in enumerate(group):
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[index])
+    
+    def record_latency(self, op: str, seconds: float):
+        """Agrega una latencia al histograma de la operación"""
+        self.latency.setdefault(op, LatencyHistogram()).record(seconds)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del servicio"""
+        return {
+            'uptime': time.monotonic() - self.started,
+            'workers': self.workers,
+            'engine': self.engine,
+            'connections': self.connections,
+            'requests': self.requests,
+            'errors': self.errors,
+            'queue_depth': self.queue_depth,
+            'queued': self.queue.qsize() if self.queue is not None else 0,
+            'running': self.running,
+            'latency': {op: histogram.to_dict() for op, histogram in self.latency.items()},
+        }
+    
+    async def handle_request(self, request: Any) -> Dict[str, Any]:
+        """
+        Atiende una petición ya decodificada
+        
+        Operaciones:
+            {"op": "encrypt"|"decrypt", "input": "LLAVE#MENSAJE"}
+            {"op": "encrypt"|"decrypt", "inputs": [...]}  (lote)
+            {"op": "stats"} y {"op": "ping"}
+        Las peticiones pueden traer "id" (se devuelve igual) y "timeout".
+        
+        Returns:
+            Diccionario de respuesta; los errores, incluidas las fallas de los
+            procesos del pool, se devuelven en "error"
+        """
+        start = time.perf_counter()
+        self.requests += 1
+        if not isinstance(request, dict):
+            self.errors += 1
+            return {'error': 'La petición debe ser un objeto JSON'}
+        
+        response: Dict[str, Any] = {'id': request['id']} if 'id' in request else {}
+        op = request.get('op')
+        try:
+            timeout = float(request['timeout']) if request.get('timeout') else None
+            if op == 'ping':
+                response['ok'] = True
+            elif op == 'stats':
+                response['stats'] = self.stats()
+            elif op in MACHINES and isinstance(request.get('inputs'), list):
+                response['results'] = list(await asyncio.gather(
+                    *(self.run(op, str(record), timeout) for record in request['inputs'])))
+                op += '_batch'
+            elif op in MACHINES and 'input' in request:
+                response.update(await self.run(op, str(request['input']), timeout))
+            else:
+                raise ValueError(f"Petición inválida: op={op!r}")
+        except (ValueError, TypeError) as e:
+            self.errors += 1
+            response['error'] = str(e)
+            return response
+        except Exception as e:
+            # Una falla del pool (por ejemplo BrokenProcessPool) también se
+            # responde; si escapara, el cliente esperaría para siempre
+            self.errors += 1
+            response['error'] = f"Error interno: {type(e).__name__}: {e}"
+            return response
+        
+        self.record_latency(str(op), time.perf_counter() - start)
+        return response
+    
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """
+        Atiende una conexión: una petición y una respuesta por línea
+        
+        Las peticiones se atienden en paralelo (pipelining) y las respuestas
+        salen en el mismo orden en que llegaron. Con MAX_INFLIGHT peticiones
+        sin responder se deja de leer del socket.
+        """
+        self.connections += 1
+        pending: asyncio.Queue = asyncio.Queue(MAX_INFLIGHT)
+        responder = asyncio.create_task(self._respond(pending, writer))
+        try:
+            while not responder.done():
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    self.errors += 1
+                    await pending.put(_resolved({'error': f"JSON inválido: {e}"}))
+                    continue
+                await pending.put(asyncio.ensure_future(self.handle_request(request)))
+            await pending.put(None)
+            await responder
+        finally:
+            self.connections -= 1
+            writer.close()
+    
+    async def _respond(self, pending: asyncio.Queue, writer: asyncio.StreamWriter):
+        """Escribe las respuestas en orden, esperando al cliente si va lento"""
+        while True:
+            task = await pending.get()
+            if task is None:
+                return
+            response = await task
+            writer.write((json.dumps(response, ensure_ascii=False) + '\n').encode('utf-8'))
+            try:
+                await writer.drain()
+            except ConnectionError:
+                return
+
+
+def _resolved(value: Any) -> asyncio.Future:
+    """Future ya resuelto con un valor"""
+    future = asyncio.get_running_loop().create_future()
+    future.set_result(value)
+    return future
+
+
+async def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None,
+                workers: Optional[int] = None, engine: str = 'interp', ready=None):
+    """
+    Ejecuta el servicio hasta que se interrumpa
+    
+    Args:
+        host: Dirección TCP (solo se usa sin path)
+        port: Puerto TCP
+        path: Ruta de un socket Unix (en vez de TCP)
+        workers: Procesos del pool
+        engine: Motor de ejecución
+        ready: Función que se llama con la dirección cuando el servicio
+            ya acepta conexiones
+    """
+    service = MachineService(workers, engine)
+    await service.start()
+    try:
+        if path is not None:
+            if os.path.exists(path):
+                os.remove(path)
+            server = await asyncio.start_unix_server(service.handle_connection, path, limit=LINE_LIMIT)
+            address = path
+        else:
+            server = await asyncio.start_server(service.handle_connection, host, port, limit=LINE_LIMIT)
+            address = f"{host}:{server.sockets[0].getsockname()[1]}"
+        if ready is not None:
+            ready(address)
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+        if path is not None and os.path.exists(path):
+            os.remove(path)
+
+
+class ServiceClient:
+    """
+    Cliente síncrono del servicio
+    
+    request() envía una petición y espera su respuesta; pipeline() envía
+    muchas sin esperar y devuelve las respuestas en orden.
+    """
+    
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, path: Optional[str] = None,
+                 timeout: Optional[float] = None):
+        """
+        Args:
+            host: Dirección TCP del servicio
+            port: Puerto TCP
+            path: Ruta del socket Unix (en vez de TCP)
+            timeout: Segundos máximos de espera por respuesta
+        """
+        if path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.connect(path)
+        else:
+            self.sock = socket.create_connection((host, port))
+            self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.settimeout(timeout)
+        self.reader = self.sock.makefile('rb')
+    
+    def close(self):
+        """Cierra la conexión"""
+        self.reader.close()
+        self.sock.close()
+    
+    def __enter__(self) -> 'ServiceClient':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def _read(self) -> Dict[str, Any]:
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError("El servicio cerró la conexión")
+        return json.loads(line)
+    
+    def request(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Envía una petición y devuelve su respuesta"""
+        self.sock.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+        return self._read()
+    
+    def pipeline(self, requests: Iterable[Dict[str, Any]], window: int = MAX_INFLIGHT) -> Iterator[Dict[str, Any]]:
+        """
+        Envía peticiones sin esperar cada respuesta
+        
+        Mantiene como máximo window peticiones sin responder.
+        
+        Yields:
+            Las respuestas, en el orden de las peticiones
+        """
+        inflight = 0
+        for request in requests:
+            if inflight >= window:
+                yield self._read()
+                inflight -= 1
+            self.sock.sendall((json.dumps(request, ensure_ascii=False) + '\n').encode('utf-8'))
+            inflight += 1
+        for _ in range(inflight):
+            yield self._read()
+    
+    def run(self, mode: str, record: str) -> Dict[str, Any]:
+        """Ejecuta un registro LLAVE#MENSAJE"""
+        return self.request({'op': mode, 'input': record})
+    
+    def run_many(self, mode: str, records: List[str]) -> List[Dict[str, Any]]:
+        """Ejecuta varios registros en una sola petición"""
+        return self.request({'op': mode, 'inputs': records})['results']
+    
+    def stats(self) -> Dict[str, Any]:
+        """Métricas del servicio"""
+        return self.request({'op': 'stats'})['stats']
+
+
+def _address(options: Dict[str, str]) -> Dict[str, Any]:
+    """Dirección del servicio según las opciones --socket, --host y --port"""
+    if options.get('socket'):
+        return {'path': options['socket']}
+    return {'host': options.get('host') or DEFAULT_HOST,
+            'port': int(options.get('port') or DEFAULT_PORT)}
+
+
+def run_serve_command(options: Dict[str, str], engine: str = 'interp'):
+    """
+    Comando serve: atiende peticiones hasta Ctrl+C
+    
+    Args:
+        options: Opciones de la línea de comandos (--socket, --host, --port, --workers)
+        engine: Motor de ejecución
+    """
+    workers = int(options['workers']) if options.get('workers') else None
+    
+    def ready(address: str):
+        print(f"Servicio escuchando en {address}", file=sys.stderr, flush=True)
+    
+    try:
+        asyncio.run(serve(workers=workers, engine=engine, ready=ready, **_address(options)))
+    except KeyboardInterrupt:
+        pass
+
+
+def run_client_command(op: str, records: List[str], options: Dict[str, str]) -> int:
+    """
+    Comando client: envía registros al servicio e imprime las respuestas
+    
+    Sin registros en la línea de comandos se lee uno por línea de stdin y se
+    envían todos en pipeline.
+    
+    Args:
+        op: 'encrypt', 'decrypt', 'stats' o 'ping'
+        records: Registros LLAVE#MENSAJE
+        options: Opciones de la línea de comandos (--socket, --host, --port)
+        
+    Returns:
+        Número de registros que la MT no aceptó
+    """
+    with ServiceClient(**_address(options)) as client:
+        if op not in MACHINES:
+            response = client.request({'op': op})
+            print(json.dumps(response, indent=2, ensure_ascii=False))
+            return 1 if 'error' in response else 0
+        if not records:
+            records = (line.rstrip('\r\n') for line in sys.stdin if line.strip())
+        failures = 0
+        requests = ({'op': op, 'input': record} for record in records)
+        for response in client.pipeline(requests):
+            failures += not response.get('accepted')
+            print(json.dumps(response, ensure_ascii=False))
+        return failures
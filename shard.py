@@ -0,0 +1,128 @@
+"""
+Ejecución fragmentada de un mensaje muy grande
+Divide el mensaje en fragmentos, ejecuta cada uno con su propia MT en un pool
+de procesos y une las salidas en orden
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from turing import ACCEPT
+from main import MACHINES, load_machine, make_budget
+from tapes import prepare_tapes, parse_input
+
+
+# Largo mínimo de un fragmento: con menos, el costo del pool no se recupera
+MIN_SHARD = 1 << 14
+
+# Caracteres hacia atrás en que se busca un espacio para cortar
+BOUNDARY_WINDOW = 256
+
+
+def split_message(message: str, shards: int, min_size: int = MIN_SHARD) -> List[str]:
+    """
+    Divide un mensaje en fragmentos de largo parecido
+    
+    Cada corte se hace justo después del último espacio dentro de
+    BOUNDARY_WINDOW caracteres antes del largo objetivo; si no hay ninguno,
+    se corta en el largo exacto.
+    
+    Args:
+        message: Mensaje a dividir
+        shards: Número máximo de fragmentos
+        min_size: Largo mínimo de cada fragmento
+        
+    Returns:
+        Fragmentos no vacíos (al menos uno) cuya concatenación es el mensaje
+    """
+    count = max(1, min(shards, len(message) // max(min_size, 1)))
+    size = len(message) / count
+    pieces = []
+    start = 0
+    for index in range(1, count):
+        cut = int(size * index)
+        space = message.rfind(' ', max(start, cut - BOUNDARY_WINDOW), cut)
+        if space >= 0:
+            cut = space + 1
+        if cut > start:
+            pieces.append(message[start:cut])
+            start = cut
+    pieces.append(message[start:])
+    return pieces
+
+
+def _run_shard(json_file: str, engine: str, key: Optional[str], record: str,
+               timeout: Optional[float]) -> Dict[str, Any]:
+    """
+    Ejecuta un fragmento LLAVE#TEXTO en el proceso del pool
+    
+    complete indica si la MT llegó al final del fragmento; si aceptó antes
+    (un blanco dentro del mensaje), los fragmentos siguientes no cuentan.
+    """
+    tm = load_machine(json_file, engine, key)
+    tapes = prepare_tapes(record, tm.config.get('alphabet'))
+    tm.load_input(tapes[0], tapes)
+    budget = make_budget(tm, tapes[0], timeout)
+    status = tm.run_guarded(budget.max_steps, budget=budget)
+    return {
+        'status': status,
+        'steps': tm.steps,
+        'output': tm.get_tape_content(2),
+        'complete': tm.heads[0] >= len(tapes[0]),
+    }
+
+
+def run_sharded(mode: str, input_str: str, shards: int = 0, engine: str = 'interp',
+                timeout: Optional[float] = None, specialize: bool = False,
+                min_size: int = MIN_SHARD) -> Dict[str, Any]:
+    """
+    Cifra o descifra un LLAVE#MENSAJE dividiendo el mensaje entre procesos
+    
+    Cada fragmento se ejecuta como un input completo (la misma llave y las
+    mismas cintas 2 y 4) y las salidas de la cinta 3 se unen en orden. Las
+    MT procesan cada carácter sin depender de los anteriores, así que la
+    salida es idéntica a la de una sola ejecución: si un fragmento rechaza o
+    acepta antes de su final, ahí termina también el resultado unido. Los
+    pasos son la suma de los fragmentos (cada uno repite el prólogo que
+    salta la llave).
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        input_str: Input en formato LLAVE#MENSAJE
+        shards: Número máximo de fragmentos (0 = uno por CPU)
+        engine: Motor de ejecución ('interp' o 'codegen')
+        timeout: Segundos máximos por fragmento (None = sin límite)
+        specialize: Si True, usa la MT especializada en la llave
+        min_size: Largo mínimo de cada fragmento
+        
+    Returns:
+        Diccionario con status, accepted, steps, output y shards
+    """
+    key, _ = parse_input(input_str)
+    prefix, message = input_str.split('#', 1)
+    pieces = split_message(message, shards or os.cpu_count() or 1, min_size)
+    records = [f"{prefix}#{piece}" for piece in pieces]
+    args = (MACHINES[mode], engine, key if specialize else None)
+    
+    if len(records) == 1:
+        results = [_run_shard(*args, records[0], timeout)]
+    else:
+        with ProcessPoolExecutor(min(len(records), os.cpu_count() or 1)) as executor:
+            futures = [executor.submit(_run_shard, *args, record, timeout) for record in records]
+            results = [future.result() for future in futures]
+    
+    outputs = []
+    steps = 0
+    for result in results:
+        outputs.append(result['output'])
+        steps += result['steps']
+        if result['status'] != ACCEPT or not result['complete']:
+            break
+    return {
+        'status': result['status'],
+        'accepted': result['status'] == ACCEPT,
+        'steps': steps,
+        'output': ''.join(outputs),
+        'shards': len(records),
+    }
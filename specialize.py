@@ -0,0 +1,255 @@
+"""
+Especialización de Máquinas de Turing por llave
+Evaluación parcial de una MT respecto al contenido de la cinta de la llave,
+con una caché LRU de las MT especializadas en memoria y en disco
+"""
+
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from turing import TuringMachine, MOVES, BLANK, load_program, load_turing_machine, machine_wildcards, state_rules
+
+
+# Cinta de la llave en las MT de cifrado (la cinta 2)
+KEY_TAPE = 1
+
+# Directorio de la caché en disco
+KEY_CACHE_DIR = '.mtcache'
+
+# Máximo de MT especializadas en memoria (una por llave y motor)
+KEY_CACHE_SIZE = 32
+
+# Máximo de MT especializadas en disco
+KEY_CACHE_FILES = 128
+
+# Celdas que un cabezal puede alejarse del contenido de la cinta especializada
+MAX_DRIFT = 4096
+
+
+def _is_noop(pattern: str, spec: Dict[str, Any], wildcards: Tuple[str, ...]) -> bool:
+    """True si la transición se toma siempre y no escribe ni mueve nada"""
+    return (all(symbol in wildcards for symbol in pattern.split(','))
+            and all(symbol in wildcards for symbol in spec['write'])
+            and not any(move in MOVES for move in spec['move']))
+
+
+def specialize_machine(config: Dict[str, Any], content: str, tape: int = KEY_TAPE) -> Dict[str, Any]:
+    """
+    Evalúa parcialmente una MT respecto al contenido de una cinta
+    
+    La cinta debe ser de solo lectura. Su contenido es fijo, así que la
+    posición de su cabezal pasa al estado ('q_count_shift@3') y cada
+    patrón se resuelve de antemano contra el símbolo que habrá en ella. La
+    MT resultante no lee, escribe ni mueve esa cinta. Los pasos que quedan
+    sin efecto (por ejemplo, rebobinar la llave) se eliminan, así que la
+    MT especializada da el mismo resultado en menos pasos o en los mismos.
+    
+    Args:
+        config: Definición de la MT
+        content: Contenido inicial de la cinta (el cabezal empieza en 0)
+        tape: Índice de la cinta (0-based)
+        
+    Returns:
+        Definición de la MT especializada
+        
+    Raises:
+        ValueError: Si alguna transición alcanzable escribe en la cinta o si
+            el cabezal se aleja más de MAX_DRIFT celdas del contenido
+    """
+    rules = {state: state_rules(patterns, config) for state, patterns in config['delta'].items()}
+    wildcards = machine_wildcards(config)
+    classes = config.get('classes', {})
+    accepting = set(config['F'])
+    left_bounded = config.get('left_bounded', True)
+    
+    def name(state: str, position: int) -> str:
+        return state if state in accepting else f"{state}@{position}"
+    
+    # Recorrer las configuraciones (estado, posición) alcanzables
+    start = (config['q0'], 0)
+    seen = {start}
+    pending = [start]
+    delta: Dict[str, Dict[str, Any]] = {}
+    while pending:
+        state, position = pending.pop()
+        if state in accepting:
+            continue
+        symbol = content[position] if 0 <= position < len(content) else BLANK
+        specialized = delta[name(state, position)] = {}
+        for symbols, spec in rules.get(state, ()):
+            read = symbols[tape]
+            if read is not None and read != symbol and symbol not in classes.get(read, ''):
+                continue
+            write = spec['write'][tape]
+            if write not in wildcards and write != symbol:
+                raise ValueError(f"El estado {state} escribe '{write}' en la cinta {tape + 1}")
+            
+            target = position + MOVES.get(spec['move'][tape], 0)
+            if target < 0 and left_bounded:
+                target = 0
+            if not -MAX_DRIFT <= target <= len(content) + MAX_DRIFT:
+                raise ValueError(f"El cabezal de la cinta {tape + 1} se aleja demasiado desde {state}")
+            if (spec['next_state'], target) not in seen:
+                seen.add((spec['next_state'], target))
+                pending.append((spec['next_state'], target))
+            
+            pattern = [wildcards[0] if s is None else s for s in symbols]
+            pattern[tape] = wildcards[0]
+            key = ','.join(pattern)
+            if key in specialized:
+                continue
+            specialized[key] = {
+                'write': [wildcards[0] if i == tape else w for i, w in enumerate(spec['write'])],
+                'move': ['S' if i == tape else m for i, m in enumerate(spec['move'])],
+                'next_state': name(spec['next_state'], target),
+            }
+            # Un patrón solo de comodines tapa a todos los que siguen
+            if all(s in wildcards for s in pattern):
+                break
+    
+    # Saltar los estados cuyo único efecto es cambiar de estado
+    forward: Dict[str, str] = {}
+    for state, patterns in delta.items():
+        if patterns:
+            pattern, spec = next(iter(patterns.items()))
+            if _is_noop(pattern, spec, wildcards):
+                forward[state] = spec['next_state']
+    
+    def resolve(state: str) -> str:
+        visited = set()
+        # Un ciclo sin efecto se corta en un estado del ciclo: la MT no termina
+        while state in forward and state not in visited:
+            visited.add(state)
+            state = forward[state]
+        return state
+    
+    for patterns in delta.values():
+        for spec in patterns.values():
+            spec['next_state'] = resolve(spec['next_state'])
+    q0 = resolve(name(*start))
+    
+    # Quedarse con los estados alcanzables desde el nuevo inicial
+    reachable = [q0]
+    index = 0
+    while index < len(reachable):
+        for spec in delta.get(reachable[index], {}).values():
+            if spec['next_state'] not in reachable:
+                reachable.append(spec['next_state'])
+        index += 1
+    
+    result = {key: value for key, value in config.items() if key not in ('Q', 'q0', 'F', 'delta')}
+    result['description'] = f"{config.get('description', 'MT')} - cinta {tape + 1} fija: {content}"
+    result['Q'] = reachable + [state for state in config['F'] if state not in reachable]
+    result['q0'] = q0
+    result['F'] = list(config['F'])
+    result['delta'] = {state: delta[state] for state in reachable if state in delta}
+    result['specialized'] = {'tape': tape + 1, 'content': content}
+    return result
+
+
+def specialized_path(json_file: str, digest: str, content: str, cache_dir: str = KEY_CACHE_DIR) -> str:
+    """
+    Ruta en la caché de la MT especializada
+    
+    El nombre incluye la llave y un hash del JSON original y del contenido,
+    así que una MT regenerada nunca reutiliza especializaciones viejas.
+    """
+    base = os.path.splitext(os.path.basename(json_file))[0]
+    tag = hashlib.sha1(f"{digest}:{content}".encode('utf-8')).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{base}.k{content.count('|')}.{tag}.json")
+
+
+def _evict(cache_dir: str, limit: int):
+    """
+    Borra las MT especializadas menos usadas hasta dejar limit
+    
+    El uso se lleva en el atime de cada JSON (se actualiza explícitamente al
+    reutilizarlo); junto con el JSON se borran su .tmc y su .gen.py.
+    """
+    try:
+        entries = [entry for entry in os.scandir(cache_dir) if entry.name.endswith('.json')]
+    except OSError:
+        return
+    if len(entries) <= limit:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_atime_ns)
+    for entry in entries[:len(entries) - limit]:
+        stem = entry.path[:-len('.json')]
+        for path in (entry.path, stem + '.tmc', stem + '.gen.py'):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Caché LRU en memoria: (ruta, motor, contenido, caché) -> (mtime y tamaño, prototipo)
+_key_cache: 'OrderedDict[Tuple[str, str, str, str], Tuple[tuple, TuringMachine]]' = OrderedDict()
+
+
+def clear_key_cache():
+    """Vacía la caché en memoria de MT especializadas"""
+    _key_cache.clear()
+
+
+def load_specialized_machine(json_file: str, content: str, engine: str = 'interp',
+                             cache_dir: str = KEY_CACHE_DIR) -> TuringMachine:
+    """
+    Carga la MT especializada en el contenido de la cinta de la llave
+    
+    Primero se busca en la caché en memoria (validada con el mtime y el
+    tamaño del JSON original), después en el directorio de caché y si no
+    está se especializa y se guarda ahí. Las MT en disco se cargan con
+    load_turing_machine, así que también tienen su .tmc y, con codegen, su
+    .gen.py. Ambas cachés están acotadas (KEY_CACHE_SIZE y KEY_CACHE_FILES)
+    y descartan las menos usadas.
+    
+    Args:
+        json_file: JSON de la MT original
+        content: Contenido de la cinta de la llave (por ejemplo '_|||')
+        engine: 'interp' o 'codegen'
+        cache_dir: Directorio de la caché en disco
+        
+    Returns:
+        Instancia nueva de la MT especializada
+    """
+    key = (os.path.abspath(json_file), engine, content, os.path.abspath(cache_dir))
+    cached = _key_cache.get(key)
+    try:
+        stat = os.stat(json_file)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
+    if cached is not None and cached[0] == stamp:
+        _key_cache.move_to_end(key)
+        return cached[1].spawn()
+    
+    config, _, digest = load_program(json_file)
+    stat = os.stat(json_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    path = specialized_path(json_file, digest, content, cache_dir)
+    
+    try:
+        if os.path.exists(path):
+            # Marcar el uso sin cambiar el mtime (el .tmc se valida con él)
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns))
+        else:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(specialize_machine(config, content), f, indent=2, ensure_ascii=False)
+            os.replace(tmp, path)
+            _evict(cache_dir, KEY_CACHE_FILES)
+        machine = load_turing_machine(path, engine)
+    except OSError:
+        # Sin permisos de escritura: se especializa solo en memoria
+        machine = TuringMachine(specialize_machine(config, content))
+    
+    _key_cache[key] = (stamp, machine)
+    _key_cache.move_to_end(key)
+    while len(_key_cache) > KEY_CACHE_SIZE:
+        _key_cache.popitem(last=False)
+    return machine.spawn()
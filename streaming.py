@@ -0,0 +1,261 @@
+"""
+Cifrado César en streaming con Máquinas de Turing
+Procesa entradas arbitrariamente grandes con memoria acotada
+"""
+
+import codecs
+import mmap
+import sys
+from typing import Callable, Iterator, Optional, Any, Dict
+
+from turing import load_turing_machine, Tape, TuringMachine, Program, ACCEPT
+from main import MACHINES
+from tapes import prepare_tape_1, prepare_tape_2_unary, prepare_tape_4_alphabet
+
+
+# Caracteres de la entrada que se leen por bloque
+STREAM_CHUNK = 1 << 16
+
+# Sin límite práctico de pasos: la entrada puede ser de varios GB
+UNLIMITED = sys.maxsize
+
+
+def read_chunks(source: Any, chunk_size: int = STREAM_CHUNK) -> Iterator[str]:
+    """
+    Lee texto por bloques desde un archivo de texto, binario o un mmap
+    
+    Los saltos de línea al final de la entrada se descartan (un archivo que
+    termina en newline equivale al mismo mensaje sin él).
+    
+    Args:
+        source: Objeto con read() que devuelve str o bytes
+        chunk_size: Tamaño de cada lectura
+        
+    Yields:
+        Bloques de texto no vacíos
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    
+    while True:
+        data = source.read(chunk_size)
+        if not data:
+            break
+        text = decoder.decode(data) if isinstance(data, (bytes, bytearray)) else data
+        
+        # Retener los saltos de línea finales hasta saber si hay más texto
+        text = pending + text
+        stripped = text.rstrip('\r\n')
+        pending = text[len(stripped):]
+        if stripped:
+            yield stripped
+
+
+class StreamTape(Tape):
+    """
+    Cinta de entrada que se llena desde un flujo por bloques
+    
+    Cuando el cabezal llega al final del buffer se descarta lo ya leído
+    (el cabezal de esta cinta nunca retrocede) y se agrega el siguiente
+    bloque; al terminar el flujo la cinta continúa con blancos.
+    """
+    
+    __slots__ = ('chunks', 'program', 'dropped')
+    
+    def __init__(self, chunks: Iterator[str], program: Program, fill, first: str = ''):
+        """
+        Args:
+            chunks: Bloques de texto (ya en mayúsculas si corresponde)
+            program: Program de la MT, para codificar los símbolos
+            fill: Buffer de un elemento con el id del blanco
+            first: Texto ya leído que va al inicio de la cinta
+        """
+        content = program.encode(first)
+        size = len(content)
+        super().__init__(content, fill)
+        
+        # Sin relleno: después del texto leído viene el siguiente bloque
+        del self.buffer[max(size, 1):]
+        self.chunks = chunks
+        self.program = program
+        self.dropped = 0
+    
+    def grow(self, index: int) -> int:
+        if index < len(self.buffer):
+            return super().grow(index)
+        
+        # Descartar lo que quedó a la izquierda del cabezal
+        del self.buffer[:index]
+        self.origin -= index
+        self.dropped += index
+        
+        text = next(self.chunks, None)
+        if text is None:
+            self.buffer.extend(self.fill * self.chunk)
+        else:
+            self.buffer.extend(self.program.encode(text))
+        return 0
+
+
+class OutputTape(Tape):
+    """
+    Cinta de salida que entrega su contenido a medida que se escribe
+    
+    Las celdas a la izquierda del cabezal ya no cambian (el cabezal de esta
+    cinta nunca retrocede), así que se decodifican, se envían a sink y se
+    descartan cuando el cabezal llega al final del buffer. Los blancos
+    finales se retienen hasta saber si quedan entre símbolos escritos.
+    """
+    
+    __slots__ = ('sink', 'program', 'emitted')
+    
+    def __init__(self, sink: Callable[[str], Any], program: Program, fill, chunk: int = STREAM_CHUNK):
+        """
+        Args:
+            sink: Función que recibe cada fragmento de texto de salida
+            program: Program de la MT, para decodificar los símbolos
+            fill: Buffer de un elemento con el id del blanco
+            chunk: Celdas que se acumulan antes de entregar la salida
+        """
+        super().__init__(program.encode('_'), fill, chunk)
+        self.sink = sink
+        self.program = program
+        self.emitted = 0
+    
+    def flush(self, index: int, final: bool = False) -> int:
+        """
+        Entrega las celdas a la izquierda de index
+        
+        Args:
+            index: Posición del cabezal (índice del buffer)
+            final: Si True entrega todo el contenido escrito
+            
+        Returns:
+            El índice del cabezal ajustado después de descartar lo entregado
+        """
+        blank = bytes(self.fill[:1]) if isinstance(self.buffer, bytearray) else None
+        if final:
+            end = self.extent()[1]
+        elif blank is not None:
+            end = len(self.buffer[:index].rstrip(blank))
+        else:
+            end = index
+            while end > 0 and self.buffer[end - 1] == self.fill[0]:
+                end -= 1
+        
+        if end > 0:
+            self.sink(self.program.decode(self.buffer[:end]))
+            del self.buffer[:end]
+            self.origin -= end
+            self.emitted += end
+        return index - end
+    
+    def grow(self, index: int) -> int:
+        if index < len(self.buffer):
+            return super().grow(index)
+        index = self.flush(index)
+        if index >= len(self.buffer):
+            self.buffer.extend(self.fill * (index - len(self.buffer) + self.chunk))
+        return index
+
+
+def _check_streamable(machine: TuringMachine):
+    """Verifica que la MT nunca mueva a la izquierda las cintas 1 y 3"""
+    for _, _, _, moves in machine.program.transitions:
+        for tape, delta in moves:
+            if tape in (0, 2) and delta < 0:
+                raise ValueError("La MT mueve a la izquierda la cinta de entrada o de salida; "
+                                 "no se puede ejecutar en streaming")
+
+
+def stream_run(mode: str, source: Any, sink: Callable[[str], Any],
+               chunk_size: int = STREAM_CHUNK, engine: str = 'interp',
+               max_steps: int = UNLIMITED, machine: Optional[TuringMachine] = None) -> Dict[str, Any]:
+    """
+    Cifra o descifra un flujo LLAVE#MENSAJE con memoria acotada
+    
+    La cinta 1 se alimenta por bloques y descarta lo consumido; la cinta 3
+    entrega su contenido a sink a medida que crece. La memoria depende del
+    tamaño de bloque, no del tamaño del mensaje.
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        source: Objeto con read() (archivo de texto, binario, stdin o mmap)
+        sink: Función que recibe cada fragmento de la salida
+        chunk_size: Tamaño de bloque de entrada y de salida
+        engine: Motor de ejecución ('interp' o 'codegen')
+        max_steps: Número máximo de pasos
+        machine: MT ya cargada (se carga la del modo si es None)
+        
+    Returns:
+        Diccionario con status, accepted, steps, key y el total de caracteres emitidos
+    """
+    machine = machine or load_turing_machine(MACHINES[mode], engine)
+    _check_streamable(machine)
+    
+    alphabet = machine.config.get('alphabet')
+    chunks = (prepare_tape_1(text, alphabet) for text in read_chunks(source, chunk_size))
+    
+    # Leer hasta encontrar el separador de la llave
+    head = ''
+    for text in chunks:
+        head += text
+        if '#' in head:
+            break
+    if '#' not in head:
+        raise ValueError("Formato incorrecto. Usar: LLAVE#MENSAJE")
+    key = head.split('#', 1)[0].strip()
+    
+    program = machine.program
+    fill = program.encode('_')
+    tm = machine.spawn()
+    output = OutputTape(sink, program, fill, chunk_size)
+    tm.load_tapes([
+        StreamTape(chunks, program, fill, head),
+        Tape(program.encode(prepare_tape_2_unary(key, alphabet)), fill),
+        output,
+        Tape(program.encode(prepare_tape_4_alphabet(alphabet)), fill),
+    ])
+    
+    status = tm._run_loop(max_steps)
+    tm.heads[2] = output.flush(tm.heads[2], final=True)
+    
+    return {
+        'status': status,
+        'accepted': status == ACCEPT,
+        'steps': tm.steps,
+        'key': key,
+        'emitted': output.emitted,
+    }
+
+
+def stream_file(mode: str, path: str, use_mmap: bool = False, chunk_size: int = STREAM_CHUNK,
+                engine: str = 'interp', out=None) -> Dict[str, Any]:
+    """
+    Procesa un archivo (o stdin con '-') y escribe la salida a medida que se produce
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        path: Ruta del archivo o '-' para stdin
+        use_mmap: Si True, lee el archivo a través de un mmap
+        chunk_size: Tamaño de bloque
+        engine: Motor de ejecución
+        out: Flujo de salida (por defecto stdout)
+        
+    Returns:
+        El resultado de stream_run
+    """
+    out = out or sys.stdout
+    
+    def sink(text: str):
+        out.write(text)
+        out.flush()
+    
+    if path == '-':
+        return stream_run(mode, sys.stdin, sink, chunk_size, engine)
+    
+    with open(path, 'rb') as f:
+        if use_mmap:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return stream_run(mode, mapped, sink, chunk_size, engine)
+        return stream_run(mode, f, sink, chunk_size, engine)
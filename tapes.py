@@ -0,0 +1,107 @@
+"""
+Contenido inicial de las cintas de las Máquinas de Turing de Cifrado César
+Separa los registros LLAVE#MENSAJE y prepara las 4 cintas de entrada
+"""
+
+from typing import Optional
+
+
+# Alfabeto de las MT que no declaran uno con la clave "alphabet"
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def prepare_tape_2_unary(key: str, alphabet: Optional[str] = None) -> str:
+    """
+    Convierte la llave a notación unaria con un marcador al inicio
+    
+    Args:
+        key: Llave como número o letra
+        alphabet: Alfabeto de la MT (None = ALPHABET); una letra de la llave
+            vale su posición en él y el desplazamiento se toma módulo su largo
+            
+    Returns:
+        String en notación unaria (ej: "_|||" con marcador al inicio)
+    """
+    alphabet = alphabet or ALPHABET
+    # Si es un número
+    if key.isdigit():
+        shift = int(key)
+    # Si es una letra del alfabeto
+    elif len(key) == 1 and (key in alphabet or key.upper() in alphabet):
+        shift = alphabet.index(key if key in alphabet else key.upper())
+    # Si es otra letra
+    elif key.isalpha() and len(key) == 1:
+        shift = ord(key.upper()) - ord('A')
+    else:
+        raise ValueError(f"Llave inválida: {key}")
+    
+    # Normalizar al rango 0 a largo del alfabeto - 1
+    shift = shift % len(alphabet)
+    
+    # Convertir a unario con marcador al inicio
+    return '_' + ('|' * shift)
+
+
+def prepare_tape_4_alphabet(alphabet: Optional[str] = None) -> str:
+    """
+    Genera el alfabeto base para wrap-around gestionado por transiciones
+    
+    Args:
+        alphabet: Alfabeto de la MT (None = ALPHABET)
+        
+    Returns:
+        String con el alfabeto
+    """
+    return alphabet or ALPHABET
+
+
+def prepare_tape_1(input_str: str, alphabet: Optional[str] = None) -> str:
+    """
+    Contenido de la cinta de entrada
+    
+    Se pasa a mayúsculas salvo que el alfabeto de la MT tenga minúsculas.
+    
+    Args:
+        input_str: String con formato LLAVE#MENSAJE
+        alphabet: Alfabeto de la MT (None = ALPHABET)
+    """
+    alphabet = alphabet or ALPHABET
+    return input_str.upper() if alphabet == alphabet.upper() else input_str
+
+
+def parse_input(input_str: str, alphabet: Optional[str] = None) -> tuple:
+    """
+    Parsea el input en formato: LLAVE#MENSAJE
+    
+    Args:
+        input_str: String con formato LLAVE#MENSAJE
+        alphabet: Alfabeto de la MT (None = ALPHABET), para saber si el
+            mensaje se pasa a mayúsculas
+            
+    Returns:
+        Tupla (llave, mensaje)
+    """
+    if '#' not in input_str:
+        raise ValueError("Formato incorrecto. Usar: LLAVE#MENSAJE")
+    
+    parts = input_str.split('#', 1)
+    key = parts[0].strip()
+    message = prepare_tape_1(parts[1].strip(), alphabet)  # Mayúsculas si el alfabeto no tiene minúsculas
+    
+    return key, message
+
+
+def prepare_tapes(input_str: str, alphabet: Optional[str] = None) -> list:
+    """
+    Prepara el contenido inicial de las 4 cintas para un input
+    
+    Args:
+        input_str: String con formato LLAVE#MENSAJE
+        alphabet: Alfabeto de la MT (su clave "alphabet"; None = ALPHABET)
+        
+    Returns:
+        Lista [cinta 1, cinta 2, cinta 3, cinta 4]
+    """
+    key, _ = parse_input(input_str)
+    return [prepare_tape_1(input_str, alphabet), prepare_tape_2_unary(key, alphabet), "_",
+            prepare_tape_4_alphabet(alphabet)]
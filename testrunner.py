@@ -0,0 +1,279 @@
+"""
+Motor de pruebas de las Máquinas de Turing de Cifrado César
+Ejecuta los casos de tests.txt (y una matriz generada de llaves y mensajes)
+en un pool de procesos, con cifrado, descifrado e ida y vuelta por caso
+"""
+
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from turing import load_turing_machine, TuringMachine, ACCEPT
+from batch import process_record
+from bench import make_message
+from generate_mt_json import caesar
+from main import MACHINES, load_machine
+from tapes import parse_input
+
+
+# Casos por envío al pool
+CASES_PER_TASK = 8
+
+# Largo de los mensajes de la matriz generada
+MATRIX_LENGTH = 20
+
+# Nombres de los chequeos de cada caso
+CHECKS = ('cifrado', 'descifrado', 'ida y vuelta')
+
+
+def load_cases(path: str = 'tests.txt') -> List[Dict[str, Any]]:
+    """
+    Lee los casos INPUT → ESPERADO de un archivo de pruebas
+    
+    Returns:
+        Lista de casos con name, input, key, message y expected
+    """
+    cases = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            parts = line.split('→')
+            if len(parts) != 2:
+                continue
+            input_test = parts[0].strip()
+            key, message = parse_input(input_test)
+            cases.append({
+                'name': f"{os.path.basename(path)}:{number}",
+                'input': input_test,
+                'key': key,
+                'message': message,
+                'expected': parts[1].strip(),
+            })
+    return cases
+
+
+def matrix_cases(count: int, length: int = MATRIX_LENGTH, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    Genera count mensajes para cada una de las 26 llaves
+    
+    El resultado esperado sale del cifrado César de referencia.
+    """
+    cases = []
+    for index in range(count):
+        message = make_message(length, seed + index).strip() or 'A'
+        for shift in range(26):
+            cases.append({
+                'name': f"matriz:{shift}:{index}",
+                'input': f"{shift}#{message}",
+                'key': str(shift),
+                'message': message,
+                'expected': caesar(message, shift),
+            })
+    return cases
+
+
+# MT cargadas una vez por proceso del pool (ver _init_worker)
+_MACHINES: Dict[str, TuringMachine] = {}
+_SPECIALIZE: Optional[str] = None
+_TIMEOUT: Optional[float] = None
+
+
+def _init_worker(engine: str, specialize: bool = False, timeout: Optional[float] = None):
+    """Carga y compila las MT de cifrado y descifrado en cada proceso"""
+    global _SPECIALIZE, _TIMEOUT
+    for mode, json_file in MACHINES.items():
+        _MACHINES[mode] = load_turing_machine(json_file, engine)
+    _SPECIALIZE = engine if specialize else None
+    _TIMEOUT = timeout
+
+
+def _check(name: str, mode: str, key: str, record: str, expected: str) -> Dict[str, Any]:
+    """Ejecuta un registro con la MT de un modo y compara la salida"""
+    machine = _MACHINES[mode]
+    if _SPECIALIZE is not None:
+        machine = load_machine(MACHINES[mode], _SPECIALIZE, key)
+    start = time.perf_counter()
+    result = process_record(machine, record, timeout=_TIMEOUT)
+    output = result.get('output', '')
+    passed = result['status'] == ACCEPT and output == expected
+    check = {
+        'check': name,
+        'passed': passed,
+        'status': result['status'],
+        'steps': result['steps'],
+        'seconds': time.perf_counter() - start,
+        'output': output,
+        'expected': expected,
+    }
+    if 'error' in result:
+        check['error'] = result['error']
+    return check
+
+
+def _run_case(case: Dict[str, Any]) -> Dict[str, Any]:
+    """Cifrado, descifrado e ida y vuelta de un caso"""
+    key, message, expected = case['key'], case['message'], case['expected']
+    encrypted = _check(CHECKS[0], 'encrypt', key, case['input'], expected)
+    checks = [
+        encrypted,
+        _check(CHECKS[1], 'decrypt', key, f"{key}#{expected}", message),
+        _check(CHECKS[2], 'decrypt', key, f"{key}#{encrypted['output']}", message),
+    ]
+    return {
+        **case,
+        'passed': all(check['passed'] for check in checks),
+        'steps': sum(check['steps'] for check in checks),
+        'seconds': sum(check['seconds'] for check in checks),
+        'checks': checks,
+    }
+
+
+def _run_cases(cases: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Ejecuta un grupo de casos en el proceso del pool"""
+    return [_run_case(case) for case in cases]
+
+
+def run_cases(cases: List[Dict[str, Any]], engine: str = 'interp', workers: Optional[int] = None,
+              specialize: bool = False, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Ejecuta los casos en un pool de procesos
+    
+    Cada proceso compila las dos MT una sola vez y recibe los casos en
+    grupos de CASES_PER_TASK. Con un solo proceso se ejecuta todo en el
+    proceso actual.
+    
+    Args:
+        cases: Casos de load_cases o matrix_cases
+        engine: Motor de ejecución ('interp' o 'codegen')
+        workers: Número de procesos (por defecto, uno por CPU)
+        specialize: Si True, usa las MT especializadas en la llave de cada caso
+        timeout: Segundos máximos por chequeo (None = sin límite)
+        
+    Returns:
+        Resultados en el mismo orden que los casos
+    """
+    workers = workers or os.cpu_count() or 1
+    groups = [cases[i:i + CASES_PER_TASK] for i in range(0, len(cases), CASES_PER_TASK)]
+    if workers == 1 or len(groups) <= 1:
+        _init_worker(engine, specialize, timeout)
+        return _run_cases(cases)
+    
+    results = []
+    with ProcessPoolExecutor(min(workers, len(groups)), initializer=_init_worker,
+                             initargs=(engine, specialize, timeout)) as executor:
+        for chunk in executor.map(_run_cases, groups):
+            results.extend(chunk)
+    return results
+
+
+def write_json_report(results: List[Dict[str, Any]], elapsed: float, path: str):
+    """Guarda los resultados con pasos y tiempo por caso y por chequeo"""
+    report = {
+        'cases': len(results),
+        'failures': sum(not result['passed'] for result in results),
+        'steps': sum(result['steps'] for result in results),
+        'seconds': elapsed,
+        'results': results,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+
+def write_junit_report(results: List[Dict[str, Any]], elapsed: float, path: str):
+    """Guarda los resultados en formato JUnit XML (un testcase por chequeo)"""
+    suites = ET.Element('testsuites')
+    by_suite: Dict[str, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_suite.setdefault(result['name'].split(':', 1)[0], []).append(result)
+    
+    for name, suite_results in by_suite.items():
+        checks = [(result, check) for result in suite_results for check in result['checks']]
+        suite = ET.SubElement(suites, 'testsuite', {
+            'name': name,
+            'tests': str(len(checks)),
+            'failures': str(sum(not check['passed'] for _, check in checks)),
+            'time': f"{sum(result['seconds'] for result in suite_results):.6f}",
+        })
+        for result, check in checks:
+            case = ET.SubElement(suite, 'testcase', {
+                'classname': result['name'],
+                'name': f"{result['input']} [{check['check']}]",
+                'time': f"{check['seconds']:.6f}",
+            })
+            ET.SubElement(case, 'system-out').text = f"steps={check['steps']} status={check['status']}"
+            if not check['passed']:
+                message = check.get('error') or f"Obtenido '{check['output']}' != Esperado '{check['expected']}'"
+                ET.SubElement(case, 'failure', {'message': message, 'type': check['status']})
+    
+    suites.set('time', f"{elapsed:.6f}")
+    ET.indent(suites)
+    ET.ElementTree(suites).write(path, encoding='utf-8', xml_declaration=True)
+
+
+def run_suite(engine: str = 'interp', specialize: bool = False, workers: Optional[int] = None,
+              matrix: int = 0, report: Optional[str] = None, path: str = 'tests.txt',
+              timeout: Optional[float] = None) -> int:
+    """
+    Ejecuta tests.txt y la matriz generada e imprime el resultado
+    
+    Args:
+        engine: Motor de ejecución ('interp' o 'codegen')
+        specialize: Si True, usa las MT especializadas en la llave de cada caso
+        workers: Número de procesos (por defecto, uno por CPU)
+        matrix: Mensajes generados por llave (0 = sin matriz)
+        report: Ruta del reporte (.xml para JUnit, cualquier otra para JSON)
+        path: Archivo de casos
+        timeout: Segundos máximos por chequeo (None = sin límite)
+        
+    Returns:
+        Número de casos que fallaron
+    """
+    cases = load_cases(path)
+    if matrix:
+        cases += matrix_cases(matrix)
+    
+    start = time.perf_counter()
+    results = run_cases(cases, engine, workers, specialize, timeout)
+    elapsed = time.perf_counter() - start
+    
+    failures = [result for result in results if not result['passed']]
+    for number, result in enumerate(results, 1):
+        if result['name'].startswith('matriz:') and result['passed']:
+            continue
+        print(f"\n{'─'*60}")
+        print(f"Prueba {number}: {result['input']}")
+        print(f"Esperado: {result['expected']}")
+        for check in result['checks']:
+            if check['passed']:
+                print(f"PASÓ ({check['check']}): {check['output']}")
+            elif 'error' in check:
+                print(f" FALLÓ ({check['check']}): {check['error']}")
+            elif check['status'] != ACCEPT:
+                print(f" FALLÓ ({check['check']}): La máquina no aceptó ({check['status']})")
+            else:
+                print(f" FALLÓ ({check['check']}): Obtenido '{check['output']}' != "
+                      f"Esperado '{check['expected']}'")
+    
+    checks = sum(len(result['checks']) for result in results)
+    failed_checks = sum(not check['passed'] for result in results for check in result['checks'])
+    slowest = max(results, key=lambda result: result['seconds'], default=None)
+    print(f"\n{'='*60}")
+    print(f"Casos: {len(results)} ({len(results) - len(failures)} pasaron, {len(failures)} fallaron)")
+    print(f"Chequeos: {checks} ({failed_checks} fallaron)")
+    print(f"Pasos: {sum(result['steps'] for result in results):,} | Tiempo: {elapsed:.2f}s")
+    if slowest is not None:
+        print(f"Caso más lento: {slowest['input'][:40]} ({slowest['seconds'] * 1000:.1f} ms, "
+              f"{slowest['steps']} pasos)")
+    
+    if report:
+        if report.endswith('.xml'):
+            write_junit_report(results, elapsed, report)
+        else:
+            write_json_report(results, elapsed, report)
+        print(f"Reporte guardado en {report}")
+    return len(failures)
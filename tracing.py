@@ -0,0 +1,383 @@
+"""
+Trazas de ejecución de Máquinas de Turing Multicinta
+Graba cada paso en un buffer circular o en un archivo y reconstruye la
+configuración en cualquier paso, hacia adelante o hacia atrás
+"""
+
+import marshal
+import os
+import struct
+from array import array
+from bisect import bisect_right
+from collections import deque
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from turing import Program, TuringMachine
+from profiler import transition_label
+
+
+# Versión del formato de los archivos de traza
+TRACE_VERSION = 1
+
+# Pasos máximos por bloque (cada bloque empieza con un snapshot de la MT)
+TRACE_BLOCK = 16384
+
+# Bloques que conserva el buffer circular
+TRACE_BLOCKS = 64
+
+# Transiciones y estados distintos que caben en un registro (16 bits)
+TRACE_MAX_IDS = 1 << 16
+
+# Un registro: (paso, estado, transición, pasos, desplazamiento de cada cabezal por paso)
+TraceRecord = Tuple[int, int, int, int, Tuple[int, ...]]
+
+
+def record_struct(num_tapes: int) -> struct.Struct:
+    """
+    Formato binario de ancho fijo de un registro de traza
+    
+    Paso (u64), estado (u16), transición (u16), pasos (u16; más de 1 en un
+    barrido) y el desplazamiento por paso de cada cabezal (i8).
+    """
+    return struct.Struct(f'<QHHH{num_tapes}b')
+
+
+class TraceRecorder:
+    """
+    Traza de ejecución de una MT en un buffer circular
+    
+    La traza se divide en bloques de hasta block_steps pasos. Cada bloque
+    guarda el snapshot de la MT al empezar (ver TuringMachine.snapshot) y un
+    entero de 32 bits por iteración del bucle: el id de la transición y, en
+    los 16 bits altos, los pasos del barrido (0 en un paso normal). Solo se
+    conservan los últimos `blocks` bloques; con stream cada bloque cerrado
+    se escribe además en el archivo, así que ahí queda la traza completa.
+    
+    Se pasa a TuringMachine.run (o run_guarded) con tracer=...
+    """
+    
+    def __init__(self, program: Program, blocks: int = TRACE_BLOCKS,
+                 block_steps: int = TRACE_BLOCK, stream: Optional[BinaryIO] = None):
+        """
+        Args:
+            program: Program de la MT que se va a grabar
+            blocks: Bloques que conserva el buffer circular
+            block_steps: Pasos máximos por bloque
+            stream: Archivo binario abierto donde se escribe cada bloque
+            
+        Raises:
+            ValueError: Si la MT tiene más transiciones o estados de los que
+                caben en 16 bits
+        """
+        if len(program.transitions) > TRACE_MAX_IDS or len(program.state_names) > TRACE_MAX_IDS:
+            raise ValueError(f"La MT tiene demasiadas transiciones ({len(program.transitions)}) "
+                             f"o estados ({len(program.state_names)}) para grabar una traza "
+                             f"(máximo {TRACE_MAX_IDS})")
+        self.program = program
+        self.block_steps = block_steps
+        self.stream = stream
+        self.blocks: deque = deque(maxlen=blocks)
+        self.closed_blocks = 0
+        self.status: Optional[str] = None
+        self.steps: Optional[int] = None
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._codes: List[int] = []
+        self._header_written = False
+    
+    def header(self) -> Dict[str, Any]:
+        """Encabezado del archivo de traza"""
+        return {
+            'version': TRACE_VERSION,
+            'fingerprint': self.program.fingerprint,
+            'num_tapes': self.program.num_tapes,
+            'block_steps': self.block_steps,
+        }
+    
+    def begin(self, machine: TuringMachine) -> List[int]:
+        """
+        Cierra el bloque abierto y empieza uno nuevo en la configuración actual
+        
+        Returns:
+            Lista donde el bucle agrega un entero por iteración
+        """
+        self._close()
+        self._snapshot = machine.snapshot()
+        self._codes = []
+        return self._codes
+    
+    def finish(self, machine: TuringMachine, status: str):
+        """Cierra el bloque abierto y anota el motivo de parada"""
+        if self._snapshot is None and not self.closed_blocks:
+            self._snapshot = machine.snapshot()
+        # Una traza sin pasos conserva al menos la configuración inicial
+        self._close(keep_empty=not self.closed_blocks)
+        self.status = status
+        self.steps = machine.steps
+        if self.stream is not None:
+            self._write(self.footer())
+            self.stream.flush()
+    
+    def footer(self) -> Dict[str, Any]:
+        """Pie del archivo de traza: motivo de parada y pasos totales"""
+        return {'status': self.status, 'steps': self.steps}
+    
+    def _close(self, keep_empty: bool = False):
+        if self._snapshot is None:
+            return
+        if self._codes or keep_empty:
+            block = (self._snapshot, array('I', self._codes).tobytes())
+            self.blocks.append(block)
+            self.closed_blocks += 1
+            if self.stream is not None:
+                self._write(block)
+        self._snapshot = None
+        self._codes = []
+    
+    def _write(self, item):
+        if not self._header_written:
+            marshal.dump(self.header(), self.stream)
+            self._header_written = True
+        marshal.dump(item, self.stream)
+    
+    def trace(self) -> Dict[str, Any]:
+        """
+        Traza en memoria con el mismo formato que load_trace
+        
+        Returns:
+            Diccionario con el encabezado, blocks, status y steps
+        """
+        trace = self.header()
+        trace.update(self.footer())
+        trace['blocks'] = list(self.blocks)
+        return trace
+    
+    def dump(self, path: str):
+        """
+        Escribe el buffer circular en un archivo de traza
+        
+        Args:
+            path: Ruta del archivo
+        """
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            marshal.dump(self.header(), f)
+            for block in self.blocks:
+                marshal.dump(block, f)
+            marshal.dump(self.footer(), f)
+        os.replace(tmp, path)
+
+
+def load_trace(path: str) -> Dict[str, Any]:
+    """
+    Lee un archivo de traza (de dump o de un stream)
+    
+    Un archivo cortado a la mitad, por ejemplo de un proceso que se cayó
+    mientras grababa, se lee hasta el último bloque completo.
+    
+    Args:
+        path: Ruta del archivo
+        
+    Returns:
+        Diccionario con el encabezado, blocks, status y steps (None si la
+        ejecución no terminó)
+        
+    Raises:
+        ValueError: Si el archivo no es una traza válida
+    """
+    with open(path, 'rb') as f:
+        try:
+            trace = marshal.load(f)
+        except (EOFError, ValueError, TypeError) as e:
+            raise ValueError(f"Traza dañada: {path}") from e
+        if not isinstance(trace, dict) or trace.get('version') != TRACE_VERSION:
+            raise ValueError(f"Versión de traza no soportada: {path}")
+        
+        trace.update({'blocks': [], 'status': None, 'steps': None})
+        while True:
+            try:
+                item = marshal.load(f)
+            except (EOFError, ValueError, TypeError):
+                break
+            if isinstance(item, dict):
+                trace.update(item)
+            else:
+                trace['blocks'].append(item)
+    return trace
+
+
+class Replayer:
+    """
+    Reconstruye la configuración de una MT en cualquier paso de una traza
+    
+    Para llegar a un paso restaura el snapshot del bloque que lo contiene y
+    vuelve a aplicar las transiciones grabadas. Avanzar continúa desde la
+    configuración actual; retroceder vuelve a empezar desde el inicio del
+    bloque, así que cuesta a lo más block_steps pasos.
+    """
+    
+    def __init__(self, machine: TuringMachine, trace: Dict[str, Any]):
+        """
+        Args:
+            machine: MT de la traza (se usa como prototipo con spawn)
+            trace: Traza de load_trace o de TraceRecorder.trace
+            
+        Raises:
+            ValueError: Si la traza es de otra MT o no tiene bloques
+        """
+        if trace['fingerprint'] != machine.program.fingerprint:
+            raise ValueError("La traza es de otra Máquina de Turing")
+        if not trace['blocks']:
+            raise ValueError("La traza no tiene pasos grabados")
+        
+        self.machine = machine.spawn()
+        self.program = machine.program
+        self.status = trace['status']
+        self.blocks: List[Tuple[Dict[str, Any], array]] = []
+        for snapshot, data in trace['blocks']:
+            codes = array('I')
+            codes.frombytes(data)
+            self.blocks.append((snapshot, codes))
+        self.starts = [snapshot['steps'] for snapshot, _ in self.blocks]
+        
+        last, codes = self.blocks[-1]
+        self.first_step = self.starts[0]
+        self.last_step = last['steps'] + sum(code >> 16 or 1 for code in codes)
+        
+        self._block = -1
+        self._code = 0
+        self._partial = 0
+        self.step = self.first_step
+        self.seek(self.last_step)
+    
+    def seek(self, step: int) -> TuringMachine:
+        """
+        Lleva la MT reconstruida a un paso de la traza
+        
+        Args:
+            step: Paso entre first_step y last_step
+            
+        Returns:
+            La MT reconstruida (self.machine) en ese paso
+        """
+        if not self.first_step <= step <= self.last_step:
+            raise ValueError(f"El paso {step} está fuera de la traza "
+                             f"({self.first_step}-{self.last_step})")
+        
+        block = bisect_right(self.starts, step) - 1
+        if block != self._block or step < self.step:
+            self.machine.restore(self.blocks[block][0])
+            self._block = block
+            self._code = 0
+            self._partial = 0
+            self.step = self.starts[block]
+        
+        machine = self.machine
+        program = self.program
+        codes = self.blocks[block][1]
+        while self.step < step:
+            code = codes[self._code]
+            tid, count = code & 0xFFFF, code >> 16
+            if count:
+                # Barrido: solo se mueve un cabezal, sin escribir
+                taken = min(count - self._partial, step - self.step)
+                tape, delta = program.sweeps[tid]
+                head = machine.heads[tape] + delta * taken
+                if head >= len(machine.tapes[tape].buffer):
+                    head = machine.tapes[tape].grow(head)
+                machine.heads[tape] = head
+                self._partial += taken
+                self.step += taken
+                if self._partial == count:
+                    self._code += 1
+                    self._partial = 0
+            else:
+                machine.apply_transition(program.specs[tid])
+                self._code += 1
+                self.step += 1
+        
+        return machine
+    
+    def forward(self, steps: int = 1) -> TuringMachine:
+        """Avanza pasos (sin pasar del último)"""
+        return self.seek(min(self.step + steps, self.last_step))
+    
+    def back(self, steps: int = 1) -> TuringMachine:
+        """Retrocede pasos (sin pasar del primero)"""
+        return self.seek(max(self.step - steps, self.first_step))
+    
+    def configuration(self) -> Dict[str, Any]:
+        """
+        Configuración en el paso actual
+        
+        Returns:
+            Diccionario con step, state, heads (posiciones lógicas) y tapes
+        """
+        machine = self.machine
+        return {
+            'step': self.step,
+            'state': machine.current_state,
+            'heads': [tape.position(head) for tape, head in zip(machine.tapes, machine.heads)],
+            'tapes': [machine.get_tape_content(i) for i in range(machine.num_tapes)],
+        }
+    
+    def records(self, start: Optional[int] = None, stop: Optional[int] = None) -> Iterator[TraceRecord]:
+        """
+        Registros de la traza en orden
+        
+        Cada registro es (paso, estado, transición, pasos, desplazamientos):
+        un paso normal tiene pasos = 1 y un barrido el número de pasos que
+        avanzó de un salto. Los desplazamientos son los reales, así que un
+        movimiento L en el tope izquierdo aparece como 0.
+        
+        Args:
+            start: Primer paso (por defecto el primero de la traza)
+            stop: Paso donde se detiene, excluido (por defecto el último)
+        """
+        start = self.first_step if start is None else max(start, self.first_step)
+        stop = self.last_step if stop is None else min(stop, self.last_step)
+        machine = self.machine
+        first_block = max(0, bisect_right(self.starts, start) - 1)
+        for snapshot, codes in self.blocks[first_block:]:
+            step = snapshot['steps']
+            if step >= stop:
+                return
+            self.seek(step)
+            for code in codes:
+                if step >= stop:
+                    return
+                count = code >> 16 or 1
+                if step + count <= start:
+                    step += count
+                    continue
+                self.seek(step)
+                state = machine._state
+                before = [tape.position(head) for tape, head in zip(machine.tapes, machine.heads)]
+                self.seek(step + count)
+                after = [tape.position(head) for tape, head in zip(machine.tapes, machine.heads)]
+                deltas = tuple((b - a) // count for a, b in zip(before, after))
+                yield step, state, code & 0xFFFF, count, deltas
+                step += count
+    
+    def write_records(self, path: str) -> int:
+        """
+        Escribe los registros de la traza en binario de ancho fijo
+        
+        Args:
+            path: Ruta del archivo (formato de record_struct)
+            
+        Returns:
+            Número de registros escritos
+        """
+        packer = record_struct(self.machine.num_tapes)
+        written = 0
+        with open(path, 'wb') as f:
+            for step, state, tid, count, deltas in self.records():
+                f.write(packer.pack(step, state, tid, count, *deltas))
+                written += 1
+        return written
+    
+    def format_record(self, record: TraceRecord) -> str:
+        """Describe un registro como 'paso: estado [patrón] -> siguiente'"""
+        step, _, tid, count, _ = record
+        repeat = f" ×{count}" if count > 1 else ""
+        return f"{step:>10}: {transition_label(self.program, tid)}{repeat}"
@@ -3,19 +3,644 @@ Intérprete de Máquinas de Turing Multicinta
 Soporta hasta N cintas con transiciones basadas en JSON
 """
 
+import copy
+import hashlib
 import json
-from typing import List, Tuple, Optional, Dict, Any
+import marshal
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from itertools import product
+from operator import itemgetter
+from typing import List, Tuple, Optional, Dict, Any, Union, FrozenSet, Callable
+
+
+# Símbolos que en un patrón de lectura coinciden con cualquier símbolo (una
+# MT puede declarar otros con la clave "wildcards", por ejemplo si usa la 'x')
+WILDCARDS = ('*', 'x')
+
+# Símbolo blanco de las cintas
+BLANK = '_'
+
+# Máximo de combinaciones por estado que se expanden por completo al compilar;
+# por encima de este tamaño el índice se llena de forma perezosa
+EXPAND_LIMIT = 4096
+
+# Tamaño mínimo (en celdas) de cada bloque que se agrega a una cinta
+CHUNK = 64
+
+# Desplazamiento de cada movimiento de cabezal
+MOVES = {'R': 1, 'L': -1}
+
+# Resultados del bucle de ejecución
+ACCEPT = 'accept'
+REJECT = 'reject'
+LIMIT = 'limit'
+LOOP = 'loop'
+
+# Cinta de salida de las MT de cifrado (cinta 3)
+OUTPUT_TAPE = 2
+
+# Destino de los mensajes de una MT (None = sin mensajes)
+Logger = Optional[Callable[[str], None]]
+
+# Pasos del primer segmento de la detección de ciclos (cada uno dura el doble)
+CYCLE_SEGMENT = 16
+
+# Máximo de pasos de barrido en un solo registro de traza (16 bits)
+TRACE_MAX_COUNT = 0xFFFF
+
+# Motores de ejecución disponibles
+ENGINES = ('interp', 'codegen')
+
+# Versión del formato binario de la MT compilada (archivo .tmc junto al JSON);
+# cambiarla también cuando cambia cómo Program asigna los ids, porque invalida
+# las fuentes de codegen.py
+SIDECAR_VERSION = 4
+
+# Versión del formato de los checkpoints de ejecución
+SNAPSHOT_VERSION = 1
+
+# Máximo de MT compiladas que se mantienen en memoria
+CACHE_SIZE = 16
+
+# Marcador de llave ausente en el índice
+_MISSING = object()
+
+# Una transición compilada: (id, siguiente estado, [(cinta, símbolo)], [(cinta, delta)])
+CompiledTransition = Tuple[int, int, Tuple[Tuple[int, int], ...], Tuple[Tuple[int, int], ...]]
+
+Buffer = Union[bytearray, array]
+
+# Un patrón de lectura: por cinta, None para el comodín o el símbolo o nombre
+# de clase tal como está en el JSON
+Pattern = Tuple[Optional[str], ...]
+
+
+def machine_wildcards(config: Dict[str, Any]) -> Tuple[str, ...]:
+    """Comodines de una MT: los de su clave "wildcards" o, si no la tiene, WILDCARDS"""
+    return tuple(config.get('wildcards', WILDCARDS))
+
+
+def parse_pattern(pattern: str, config: Dict[str, Any]) -> Optional[Pattern]:
+    """
+    Separa un patrón de lectura del JSON en sus símbolos
+    
+    Un elemento puede ser un comodín, un símbolo o el nombre de una clase
+    declarada en la clave "classes" (nombre -> símbolos que incluye), que
+    coincide con cualquiera de sus símbolos.
+    
+    Args:
+        pattern: Patrón como 'A,*,LETRA,_'
+        config: Definición de la MT
+        
+    Returns:
+        Tupla con None (comodín) o el símbolo o nombre de clase por cada
+        cinta; None si no tiene una entrada por cinta
+    """
+    symbols = pattern.split(',')
+    if len(symbols) != config['num_tapes']:
+        return None
+    wildcards = machine_wildcards(config)
+    return tuple(None if symbol in wildcards else symbol for symbol in symbols)
+
+
+def order_rules(rules: List[Tuple[Pattern, Any]], classes: Dict[str, Any]) -> List[Tuple[Pattern, Any]]:
+    """
+    Ordena las reglas de un estado en el orden en que las prueba el intérprete
+    
+    Los patrones exactos tienen prioridad sobre los que tienen comodines o
+    clases; dentro de cada grupo se respeta el orden original.
+    """
+    return sorted(rules, key=lambda rule: any(symbol is None or symbol in classes for symbol in rule[0]))
+
+
+def state_rules(patterns: Dict[str, Any], config: Dict[str, Any]) -> List[Tuple[Pattern, Any]]:
+    """
+    Reglas de un estado del JSON, ya separadas y en orden de prioridad
+    
+    Args:
+        patterns: Transiciones del estado (patrón -> transición)
+        config: Definición de la MT
+        
+    Returns:
+        Lista de (patrón, transición) sin los patrones mal formados
+    """
+    rules = []
+    for text, spec in patterns.items():
+        pattern = parse_pattern(text, config)
+        if pattern is not None:
+            rules.append((pattern, spec))
+    return order_rules(rules, config.get('classes', {}))
+
+
+def _no_positions(symbols) -> tuple:
+    """Llave de un estado cuyos patrones no restringen ninguna cinta"""
+    return ()
+
+
+class _StateIndex:
+    """
+    Índice de transiciones de un estado
+    
+    Solo usa como llave los símbolos de las cintas que algún patrón del
+    estado restringe; las demás cintas no influyen en la transición elegida.
+    Con una sola cinta restringida la llave es el id del símbolo, con varias
+    es una tupla de ids.
+    """
+    
+    __slots__ = ('positions', 'patterns', 'table', 'key')
+    
+    def __init__(self, positions: Tuple[int, ...], patterns: List[Tuple[tuple, CompiledTransition]]):
+        self.positions = positions
+        self.patterns = patterns
+        self.table: Dict[Any, Optional[CompiledTransition]] = {}
+        self.key = itemgetter(*positions) if positions else _no_positions
+    
+    def scan(self, key) -> Optional[CompiledTransition]:
+        """Busca la primera transición (en orden del dict) que coincide con la llave"""
+        if len(self.positions) == 1:
+            key = (key,)
+        for pattern, transition in self.patterns:
+            for ps, rs in zip(pattern, key):
+                if ps is not None and ps != rs and (type(ps) is not frozenset or rs not in ps):
+                    break
+            else:
+                return transition
+        return None
+    
+    def resolve(self, key) -> Optional[CompiledTransition]:
+        """Resuelve una llave que no está en la tabla y memoriza el resultado"""
+        transition = self.table[key] = self.scan(key)
+        return transition
+
+
+class Program:
+    """
+    Representación de ejecución de una MT
+    
+    Los estados y los símbolos de Gamma se internan como enteros pequeños y
+    las transiciones se guardan como tuplas indexadas por id de estado. Un
+    mismo Program puede compartirse entre varias instancias de TuringMachine.
+    """
+    
+    def __init__(self, config: Dict[str, Any], expand_limit: int = EXPAND_LIMIT):
+        """
+        Compila la configuración de una MT
+        
+        Args:
+            config: Diccionario con la definición formal de la MT
+            expand_limit: Máximo de combinaciones a expandir por estado
+        """
+        self.num_tapes = config['num_tapes']
+        
+        # Símbolos: Gamma primero, luego el blanco si no está declarado
+        self.symbols: List[str] = []
+        self.symbol_ids: Dict[str, int] = {}
+        for symbol in config['Gamma']:
+            self.intern(symbol)
+        self.blank = self.intern(BLANK)
+        self.typecode = 'B' if len(config['Gamma']) < 256 else 'H'
+        self.wildcards = machine_wildcards(config)
+        
+        # Clases de símbolos de los patrones, como conjuntos de ids
+        self.classes: Dict[str, FrozenSet[int]] = {
+            name: frozenset(map(self.intern, members)) for name, members in config.get('classes', {}).items()
+        }
+        
+        # Estados: Q primero, luego los que solo aparecen en delta
+        self.state_names: List[str] = []
+        self.state_ids: Dict[str, int] = {}
+        self.index: List[Optional[_StateIndex]] = []
+        self.accepting: List[bool] = []
+        for state in config['Q']:
+            self.state_id(state)
+        self.initial = self.state_id(config['q0'])
+        for state in config['F']:
+            self.accepting[self.state_id(state)] = True
+        
+        self.transitions: List[CompiledTransition] = []
+        self.specs: List[Dict] = []
+        self._spec_ids: Dict[int, int] = {}
+        
+        # Barridos: transiciones que solo mueven un cabezal y vuelven al mismo
+        # estado, por id de transición -> (cinta, dirección)
+        self.sweeps: Dict[int, Tuple[int, int]] = {}
+        self._sweep_tables: Dict[tuple, bytes] = {}
+        
+        gamma_ids = range(len(self.symbols))
+        for state, patterns in config['delta'].items():
+            parsed = [
+                (tuple(None if s is None else self.classes[s] if s in self.classes else self.intern(s)
+                       for s in symbols),
+                 self.compile_transition(spec))
+                for symbols, spec in state_rules(patterns, config)
+            ]
+            
+            # Cintas que algún patrón restringe
+            positions = tuple(i for i in range(self.num_tapes)
+                              if any(symbols[i] is not None for symbols, _ in parsed))
+            state_index = _StateIndex(
+                positions,
+                [(tuple(symbols[i] for i in positions), t) for symbols, t in parsed]
+            )
+            
+            # Expandir sobre Gamma si el producto es pequeño; si no, índice perezoso
+            if len(gamma_ids) ** len(positions) <= expand_limit:
+                table = state_index.table
+                for pattern, transition in state_index.patterns:
+                    choices = [gamma_ids if s is None else sorted(s) if type(s) is frozenset else (s,)
+                               for s in pattern]
+                    for key in product(*choices):
+                        table.setdefault(key[0] if len(key) == 1 else key, transition)
+            
+            state = self.state_id(state)
+            self.index[state] = state_index
+            
+            # Los barridos se aceleran buscando en el buffer (solo con bytearray)
+            if self.typecode == 'B':
+                for _, transition in parsed:
+                    tid, next_state, _, moves = transition
+                    if next_state == state and len(moves) == 1:
+                        self.sweeps[tid] = moves[0]
+        
+        # Identifica las tablas compiladas (por ejemplo, al restaurar un checkpoint)
+        self.fingerprint = hashlib.sha1(marshal.dumps((
+            self.symbols, self.state_names, self.accepting, self.initial, self.transitions,
+            [None if index is None else (index.positions, [(p, t[0]) for p, t in index.patterns])
+             for index in self.index],
+        ))).hexdigest()
+    
+    def intern(self, symbol: str) -> int:
+        """Devuelve el id de un símbolo, agregándolo si es nuevo"""
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            if symbol_id > 0xFFFF or (symbol_id > 0xFF and getattr(self, 'typecode', 'B') == 'B'):
+                raise ValueError(f"Demasiados símbolos distintos en las cintas: {symbol!r}")
+            self.symbols.append(symbol)
+            self.symbol_ids[symbol] = symbol_id
+        return symbol_id
+    
+    def state_id(self, name: str) -> int:
+        """Devuelve el id de un estado, agregándolo si es nuevo"""
+        state = self.state_ids.get(name)
+        if state is None:
+            state = len(self.state_names)
+            self.state_names.append(name)
+            self.state_ids[name] = state
+            self.index.append(None)
+            self.accepting.append(False)
+        return state
+    
+    def compile_transition(self, spec: Dict) -> CompiledTransition:
+        """
+        Convierte una transición del JSON a su forma compilada
+        
+        Args:
+            spec: Diccionario con write, move y next_state
+            
+        Returns:
+            Tupla (id, siguiente estado, escrituras, movimientos)
+        """
+        tid = self._spec_ids.get(id(spec))
+        if tid is not None:
+            return self.transitions[tid]
+        
+        writes = tuple((i, self.intern(symbol)) for i, symbol in enumerate(spec['write'])
+                       if symbol not in self.wildcards)
+        moves = tuple((i, MOVES[move]) for i, move in enumerate(spec['move']) if move in MOVES)
+        
+        tid = len(self.transitions)
+        transition = (tid, self.state_id(spec['next_state']), writes, moves)
+        self.transitions.append(transition)
+        self.specs.append(spec)
+        self._spec_ids[id(spec)] = tid
+        return transition
+    
+    def sweep_table(self, state: int, tid: int, current: List[int]) -> bytes:
+        """
+        Tabla de traducción que marca con 1 los símbolos que detienen un barrido
+        
+        Un símbolo continúa el barrido si, con las demás cintas fijas, lleva
+        a la misma transición de barrido (mismo estado, mismo cabezal y
+        dirección) sin cambiar ningún símbolo. Cualquier otro símbolo, incluso
+        uno que todavía no existe, detiene el barrido y se procesa paso a paso.
+        
+        Args:
+            state: Id del estado actual
+            tid: Id de la transición de barrido encontrada
+            current: Símbolos bajo cada cabezal
+            
+        Returns:
+            Tabla de 256 bytes para bytes.translate
+        """
+        key = (tid, *current)
+        table = self._sweep_tables.get(key)
+        if table is not None:
+            return table
+        
+        tape, delta = self.sweeps[tid]
+        state_index = self.index[state]
+        probe = list(current)
+        stops = bytearray(b'\x01' * 256)
+        for symbol in range(len(self.symbols)):
+            probe[tape] = symbol
+            key_symbols = state_index.key(probe)
+            transition = state_index.table.get(key_symbols, _MISSING)
+            if transition is _MISSING:
+                transition = state_index.resolve(key_symbols)
+            if (transition is not None and transition[1] == state
+                    and transition[3] == ((tape, delta),)
+                    and all(probe[i] == w for i, w in transition[2])):
+                stops[symbol] = 0
+        
+        table = self._sweep_tables[(tid, *current)] = bytes(stops)
+        return table
+    
+    def to_data(self) -> Dict[str, Any]:
+        """
+        Exporta las tablas internadas como datos simples (serializables con marshal)
+        
+        Returns:
+            Diccionario con símbolos, estados, transiciones e índices
+        """
+        return {
+            'num_tapes': self.num_tapes,
+            'typecode': self.typecode,
+            'symbols': self.symbols,
+            'state_names': self.state_names,
+            'accepting': self.accepting,
+            'initial': self.initial,
+            'transitions': self.transitions,
+            'specs': self.specs,
+            'sweeps': self.sweeps,
+            'wildcards': self.wildcards,
+            'classes': self.classes,
+            'fingerprint': self.fingerprint,
+            'index': [
+                None if state_index is None else (
+                    state_index.positions,
+                    [(pattern, t[0]) for pattern, t in state_index.patterns],
+                    {key: None if t is None else t[0] for key, t in state_index.table.items()},
+                )
+                for state_index in self.index
+            ],
+        }
+    
+    @classmethod
+    def from_data(cls, data: Dict[str, Any]) -> 'Program':
+        """
+        Reconstruye un Program exportado con to_data sin volver a compilar
+        
+        Args:
+            data: Diccionario producido por to_data
+            
+        Returns:
+            Instancia de Program
+        """
+        program = cls.__new__(cls)
+        program.num_tapes = data['num_tapes']
+        program.typecode = data['typecode']
+        program.symbols = list(data['symbols'])
+        program.symbol_ids = {symbol: i for i, symbol in enumerate(program.symbols)}
+        program.blank = program.symbol_ids[BLANK]
+        program.state_names = list(data['state_names'])
+        program.state_ids = {name: i for i, name in enumerate(program.state_names)}
+        program.accepting = list(data['accepting'])
+        program.initial = data['initial']
+        program.transitions = [tuple(t) for t in data['transitions']]
+        program.specs = list(data['specs'])
+        program._spec_ids = {id(spec): tid for tid, spec in enumerate(program.specs)}
+        program.sweeps = dict(data['sweeps'])
+        program.wildcards = tuple(data['wildcards'])
+        program.classes = dict(data['classes'])
+        program._sweep_tables = {}
+        program.fingerprint = data['fingerprint']
+        
+        transitions = program.transitions
+        program.index = []
+        for entry in data['index']:
+            if entry is None:
+                program.index.append(None)
+                continue
+            positions, patterns, table = entry
+            state_index = _StateIndex(tuple(positions),
+                                      [(tuple(pattern), transitions[tid]) for pattern, tid in patterns])
+            state_index.table = {key: None if tid is None else transitions[tid]
+                                 for key, tid in table.items()}
+            program.index.append(state_index)
+        
+        return program
+    
+    def encode(self, text: str) -> Buffer:
+        """Convierte texto a un buffer de ids de símbolo"""
+        try:
+            ids = list(map(self.symbol_ids.__getitem__, text))
+        except KeyError:
+            ids = [self.intern(c) for c in text]
+        return bytearray(ids) if self.typecode == 'B' else array('H', ids)
+    
+    def decode(self, buffer) -> str:
+        """Convierte un buffer de ids de símbolo a texto"""
+        return ''.join(map(self.symbols.__getitem__, buffer))
+
+
+class Tape:
+    """
+    Cinta que crece por bloques en ambas direcciones
+    
+    El buffer guarda ids de símbolo; la posición lógica 0 corresponde al
+    índice `origin` del buffer. Los cabezales se manejan como índices del
+    buffer y `grow` los reajusta cuando la cinta crece hacia la izquierda.
+    El buffer siempre es el mismo objeto: crecer lo modifica en su lugar.
+    """
+    
+    __slots__ = ('buffer', 'origin', 'fill', 'chunk')
+    
+    def __init__(self, content: Buffer, fill: Buffer, chunk: int = CHUNK):
+        """
+        Args:
+            content: Contenido inicial desde la posición 0
+            fill: Buffer de un elemento con el id del blanco
+            chunk: Tamaño mínimo de cada bloque nuevo
+        """
+        self.buffer = content
+        self.origin = 0
+        self.fill = fill
+        self.chunk = chunk
+        
+        # Redondear a un múltiplo del bloque (al menos un bloque)
+        size = len(content)
+        self.buffer.extend(fill * (chunk - size % chunk if size % chunk or not size else 0))
+    
+    def grow(self, index: int) -> int:
+        """
+        Agrega blancos para que un índice fuera del buffer sea válido
+        
+        Crece al menos un bloque y al menos el tamaño actual, así que el
+        costo amortizado por celda es constante.
+        
+        Args:
+            index: Índice del buffer (puede ser negativo o >= len)
+            
+        Returns:
+            El mismo índice, ajustado si la cinta creció a la izquierda
+        """
+        size = len(self.buffer)
+        if index >= size:
+            extra = max(self.chunk, size, index - size + 1)
+            self.buffer.extend(self.fill * extra)
+        elif index < 0:
+            extra = max(self.chunk, size, -index)
+            self.buffer[0:0] = self.fill * extra
+            self.origin += extra
+            index += extra
+        return index
+    
+    def position(self, index: int) -> int:
+        """Convierte un índice del buffer a posición lógica"""
+        return index - self.origin
+    
+    def extent(self) -> Tuple[int, int]:
+        """
+        Rango escrito de la cinta como índices del buffer [inicio, fin)
+        
+        Empieza en la posición lógica 0 o en el primer símbolo no blanco a
+        su izquierda, y termina después del último símbolo no blanco.
+        """
+        buffer = self.buffer
+        blank = self.fill[0]
+        if isinstance(buffer, bytearray):
+            blank_bytes = bytes((blank,))
+            start = len(buffer) - len(buffer.lstrip(blank_bytes))
+            end = len(buffer.rstrip(blank_bytes))
+        else:
+            start = next((i for i, s in enumerate(buffer) if s != blank), len(buffer))
+            end = next((i + 1 for i in range(len(buffer) - 1, -1, -1) if buffer[i] != blank), 0)
+        return min(start, self.origin), max(end, self.origin)
+    
+    def content(self, strip_blanks: bool = True) -> Buffer:
+        """Contenido escrito (o todo el buffer desde el inicio escrito si strip_blanks es False)"""
+        start, end = self.extent()
+        return self.buffer[start:end if strip_blanks else len(self.buffer)]
+
+
+def sweep(program: Program, state: int, tid: int, current: List[int],
+          tape: Tape, head: int, budget: int) -> Tuple[int, int]:
+    """
+    Ejecuta de una vez los pasos de un barrido
+    
+    Equivale exactamente a aplicar la transición de barrido paso a paso
+    mientras el símbolo bajo el cabezal la repita, sin pasar de budget
+    pasos. Se detiene en el borde del buffer para que el crecimiento de la
+    cinta y el tope izquierdo los maneje el paso normal.
+    
+    Args:
+        program: Program de la MT
+        state: Id del estado actual
+        tid: Id de la transición de barrido
+        current: Símbolos bajo cada cabezal
+        tape: Cinta que recorre el barrido
+        head: Posición (índice del buffer) del cabezal de esa cinta
+        budget: Pasos restantes
+        
+    Returns:
+        Tupla (nueva posición del cabezal, pasos ejecutados); 0 pasos si no
+        se pudo avanzar de un salto
+    """
+    delta = program.sweeps[tid][1]
+    stops = program.sweep_table(state, tid, current)
+    buffer = tape.buffer
+    
+    # El primer paso también debe ser un paso de barrido
+    if stops[buffer[head]]:
+        return head, 0
+    
+    if delta > 0:
+        limit = min(len(buffer), head + budget)
+        found = buffer[head + 1:limit].translate(stops).find(1)
+        target = limit if found < 0 else head + 1 + found
+        jumped = target - head
+        if target == len(buffer):
+            target = tape.grow(target)
+    else:
+        limit = max(0, head - budget)
+        found = buffer[limit:head].translate(stops).rfind(1)
+        target = limit if found < 0 else limit + found
+        jumped = head - target
+    
+    return target, jumped
+
+
+class RunResult:
+    """
+    Resultado de una ejecución, sin nada impreso
+    
+    status es el motivo de parada (ACCEPT, REJECT, LIMIT, LOOP o el del
+    budget); state, symbols y heads describen la configuración final (los
+    cabezales como posiciones lógicas) y output es el texto de la cinta de
+    salida, o None si no se pidió.
+    """
+    
+    __slots__ = ('status', 'steps', 'max_steps', 'elapsed', 'state', 'symbols', 'heads',
+                 'output', 'cycle_length')
+    
+    def __init__(self, status: str, steps: int, max_steps: Optional[int] = None, elapsed: float = 0.0,
+                 state: Optional[str] = None, symbols: Tuple[str, ...] = (), heads: Tuple[int, ...] = (),
+                 output: Optional[str] = None, cycle_length: Optional[int] = None):
+        self.status = status
+        self.steps = steps
+        self.max_steps = max_steps
+        self.elapsed = elapsed
+        self.state = state
+        self.symbols = symbols
+        self.heads = heads
+        self.output = output
+        self.cycle_length = cycle_length
+    
+    @property
+    def accepted(self) -> bool:
+        """True si la MT llegó a un estado de aceptación"""
+        return self.status == ACCEPT
+    
+    def message(self) -> Optional[str]:
+        """Explicación del motivo de parada para mostrarla (None si aceptó)"""
+        if self.status == ACCEPT:
+            return None
+        if self.status == LOOP:
+            return (f"\n🔁 Ciclo detectado en el paso {self.steps}: la configuración se repite "
+                    f"cada {self.cycle_length} pasos (estado '{self.state}')")
+        if self.status == REJECT:
+            return f"\n❌ No hay transición para estado '{self.state}' con símbolos {self.symbols}"
+        if self.status != LIMIT:
+            # Tiempo máximo o cancelación
+            return (f"⚠️ Ejecución detenida ({self.status}) en el paso {self.steps}, "
+                    f"después de {self.elapsed:.3f}s")
+        return (f"⚠️ Advertencia: Se excedió el límite de {self.max_steps} pasos\n"
+                f"Estado final: {self.state}\n"
+                f"Símbolos: {self.symbols}\n"
+                f"Cabezales: {list(self.heads)}")
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Campos del resultado como diccionario (para JSON)"""
+        result = {name: getattr(self, name) for name in self.__slots__}
+        result['accepted'] = self.accepted
+        return result
 
 
 class TuringMachine:
     """Simulador de Máquina de Turing Multicinta"""
     
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], program: Optional[Program] = None):
         """
         Inicializa la MT desde un diccionario de configuración
         
         Args:
             config: Diccionario con la definición formal de la MT
+            program: Program ya compilado para config (se compila si es None)
         """
         self.states = config['Q']
         self.input_alphabet = config['Sigma']
@@ -25,11 +650,49 @@ class TuringMachine:
         self.accept_states = config['F']
         self.transitions = config['delta']
         
+        # Cinta semi-infinita: un movimiento L en la posición 0 no se mueve
+        self.left_bounded = config.get('left_bounded', True)
+        
+        # Representación compilada con estados y símbolos enteros
+        self.config = config
+        self.program = program if program is not None else Program(config)
+        
         # Inicializar cintas
-        self.tapes: List[List[str]] = []
+        self.tapes: List[Tape] = []
         self.heads: List[int] = []
-        self.current_state = self.initial_state
+        self.steps = 0
+        self._state = self.program.initial
+        self._fill = self.program.encode(BLANK)
         
+        # Largo del ciclo si la última ejecución terminó en LOOP
+        self.cycle_length: Optional[int] = None
+        
+        # Motivo de parada de la última ejecución (ver run_guarded)
+        self.stop_reason: Optional[Dict[str, Any]] = None
+        
+        # Destino de los mensajes de run y del modo debug (None = silencio)
+        self.logger: Logger = print
+    
+    def spawn(self) -> 'TuringMachine':
+        """Crea otra instancia de la misma MT que comparte el Program compilado"""
+        machine = copy.copy(self)
+        machine.tapes = []
+        machine.heads = []
+        machine.steps = 0
+        machine._state = self.program.initial
+        machine.cycle_length = None
+        machine.stop_reason = None
+        return machine
+    
+    @property
+    def current_state(self) -> str:
+        """Nombre del estado actual"""
+        return self.program.state_names[self._state]
+    
+    @current_state.setter
+    def current_state(self, name: str):
+        self._state = self.program.state_id(name)
+    
     def load_input(self, input_string: str, tape_configs: Optional[List[str]] = None):
         """
         Carga el input en las cintas según la configuración
@@ -40,23 +703,38 @@ class TuringMachine:
         """
         self.tapes = []
         self.heads = []
+        encode = self.program.encode
         
         for i in range(self.num_tapes):
             if i == 0 and tape_configs is None:
                 # Cinta 1: input principal
-                self.tapes.append(list(input_string) + ['_'] * 1000)
+                self.tapes.append(Tape(encode(input_string), self._fill))
             elif tape_configs and i < len(tape_configs):
                 # Cintas configuradas manualmente
-                self.tapes.append(list(tape_configs[i]) + ['_'] * 1000)
+                self.tapes.append(Tape(encode(tape_configs[i]), self._fill))
             else:
                 # Cintas vacías
-                self.tapes.append(['_'] * 1000)
+                self.tapes.append(Tape(self._fill[:0], self._fill))
             
             self.heads.append(0)
     
+    def load_tapes(self, tapes: List[Tape], heads: Optional[List[int]] = None):
+        """
+        Carga cintas ya construidas (por ejemplo cintas de streaming)
+        
+        Args:
+            tapes: Una cinta por cada cinta de la MT
+            heads: Posición inicial (índice del buffer) de cada cabezal
+        """
+        if len(tapes) != self.num_tapes:
+            raise ValueError(f"Se esperaban {self.num_tapes} cintas, se recibieron {len(tapes)}")
+        self.tapes = list(tapes)
+        self.heads = list(heads) if heads is not None else [0] * self.num_tapes
+    
     def read_symbols(self) -> Tuple[str, ...]:
         """Lee los símbolos actuales bajo cada cabezal"""
-        return tuple(self.tapes[i][self.heads[i]] for i in range(self.num_tapes))
+        symbols = self.program.symbols
+        return tuple(symbols[self.tapes[i].buffer[self.heads[i]]] for i in range(self.num_tapes))
     
     def match_transition(self, read_symbols: Tuple[str, ...]) -> Optional[Dict]:
         """
@@ -68,35 +746,17 @@ class TuringMachine:
         Returns:
             Diccionario con la transición o None si no existe
         """
-        state_key = self.current_state
+        state_index = self.program.index[self._state]
         
-        if state_key not in self.transitions:
+        if state_index is None:
             return None
         
-        # Convertir tupla a string para búsqueda
-        read_key = ','.join(read_symbols)
-        
-        # Buscar transición exacta
-        if read_key in self.transitions[state_key]:
-            return self.transitions[state_key][read_key]
+        key = state_index.key(tuple(map(self.program.intern, read_symbols)))
+        transition = state_index.table.get(key, _MISSING)
+        if transition is _MISSING:
+            transition = state_index.resolve(key)
         
-        # Buscar con comodines
-        for pattern, transition in self.transitions[state_key].items():
-            pattern_symbols = pattern.split(',')
-            
-            if len(pattern_symbols) != len(read_symbols):
-                continue
-            
-            match = True
-            for ps, rs in zip(pattern_symbols, read_symbols):
-                if ps not in ['*', 'x', rs]:
-                    match = False
-                    break
-            
-            if match:
-                return transition
-        
-        return None
+        return None if transition is None else self.program.specs[transition[0]]
     
     def apply_transition(self, transition: Dict):
         """
@@ -105,82 +765,638 @@ class TuringMachine:
         Args:
             transition: Diccionario con write, move y next_state
         """
-        write_symbols = transition['write']
-        moves = transition['move']
-        next_state = transition['next_state']
+        _, next_state, writes, moves = self.program.compile_transition(transition)
         
         # Escribir símbolos
-        for i, symbol in enumerate(write_symbols):
-            if symbol not in ['*', 'x']:
-                self.tapes[i][self.heads[i]] = symbol
+        for i, symbol in writes:
+            self.tapes[i].buffer[self.heads[i]] = symbol
         
         # Mover cabezales
-        for i, move in enumerate(moves):
-            if move == 'R':
-                self.heads[i] += 1
-            elif move == 'L':
-                self.heads[i] = max(0, self.heads[i] - 1)
-            # 'S' no mueve
+        for i, delta in moves:
+            head = self.heads[i] + delta
             
             # Expandir cinta si es necesario
-            if self.heads[i] >= len(self.tapes[i]):
-                self.tapes[i].extend(['_'] * 1000)
+            if head < 0:
+                head = 0 if self.left_bounded else self.tapes[i].grow(head)
+            elif head >= len(self.tapes[i].buffer):
+                head = self.tapes[i].grow(head)
+            self.heads[i] = head
         
         # Cambiar estado
-        self.current_state = next_state
+        self._state = next_state
     
-    def run(self, max_steps: int = 100000, debug: bool = False) -> bool:
+    def simulate(self, max_steps: int = 100000, debug: bool = False, profiler=None,
+                 detect_cycles: bool = True, budget=None, tracer=None,
+                 output_tape: Optional[int] = OUTPUT_TAPE) -> RunResult:
+        """
+        Ejecuta la MT y devuelve el resultado sin imprimir nada
+        
+        Args:
+            max_steps: Número máximo de pasos para evitar loops infinitos
+            debug: Si True, envía el estado de los primeros pasos a self.logger
+            profiler: Profiler (de profiler.py) que acumula contadores de la ejecución
+            detect_cycles: Si True, se detiene en cuanto una configuración se repite
+            budget: Budget (de budget.py) con límite de pasos, tiempo máximo y
+                cancelación; si se da, su límite de pasos reemplaza a max_steps
+            tracer: TraceRecorder (de trace.py) que registra cada paso
+            output_tape: Cinta cuyo texto va en output (None = no se convierte)
+            
+        Returns:
+            RunResult con el motivo de parada, pasos, tiempo y configuración final
+        """
+        if profiler is not None:
+            profiler.runs += 1
+        
+        if budget is not None:
+            max_steps = budget.max_steps
+        self.run_guarded(max_steps, debug, profiler, detect_cycles=detect_cycles,
+                         budget=budget, tracer=tracer)
+        return self.result(output_tape)
+    
+    def result(self, output_tape: Optional[int] = OUTPUT_TAPE) -> RunResult:
+        """
+        Resultado de la última ejecución (ver run_guarded)
+        
+        Args:
+            output_tape: Cinta cuyo texto va en output (None = no se convierte)
+        """
+        reason = self.stop_reason or {}
+        accepted = reason.get('reason') == ACCEPT
+        return RunResult(
+            status=reason.get('reason', LIMIT),
+            steps=self.steps,
+            max_steps=reason.get('max_steps'),
+            elapsed=reason.get('elapsed', 0.0),
+            state=self.current_state,
+            # La configuración de rechazo solo se lee si hace falta explicarla
+            symbols=() if accepted else self.read_symbols(),
+            heads=() if accepted else tuple(tape.position(head) for tape, head in zip(self.tapes, self.heads)),
+            output=None if output_tape is None else self.get_tape_content(output_tape),
+            cycle_length=self.cycle_length,
+        )
+    
+    def run(self, max_steps: int = 100000, debug: bool = False, profiler=None,
+            detect_cycles: bool = True, budget=None, tracer=None) -> bool:
         """
         Ejecuta la MT hasta llegar a un estado de aceptación o rechazo
         
+        Si no acepta, envía el motivo a self.logger (print por defecto). El
+        motivo de parada queda en self.stop_reason (ver run_guarded); para
+        el resultado completo sin mensajes, ver simulate.
+        
         Args:
             max_steps: Número máximo de pasos para evitar loops infinitos
             debug: Si True, muestra información de depuración
+            profiler: Profiler (de profiler.py) que acumula contadores de la ejecución
+            detect_cycles: Si True, se detiene en cuanto una configuración se repite
+            budget: Budget (de budget.py) con límite de pasos, tiempo máximo y
+                cancelación; si se da, su límite de pasos reemplaza a max_steps
+            tracer: TraceRecorder (de trace.py) que registra cada paso
             
         Returns:
-            True si acepta, False si rechaza o excede max_steps
+            True si acepta, False si rechaza, entra en un ciclo, excede el
+            límite de pasos o de tiempo, o se cancela
+        """
+        result = self.simulate(max_steps, debug, profiler, detect_cycles, budget, tracer, output_tape=None)
+        if not result.accepted and self.logger is not None:
+            self.logger(result.message())
+        return result.accepted
+    
+    def _configuration(self) -> tuple:
+        """Copia de la configuración actual: (estado, cabezales, orígenes, buffers)"""
+        return (self._state, list(self.heads),
+                [tape.origin for tape in self.tapes],
+                [tape.buffer[:] for tape in self.tapes])
+    
+    def _same_tapes(self, configuration: tuple) -> bool:
+        """Compara las cintas con las de una copia de _configuration"""
+        _, _, origins, buffers = configuration
+        return all(tape.origin == origin and tape.buffer == buffer
+                   for tape, origin, buffer in zip(self.tapes, origins, buffers))
+    
+    def _sweep_offset(self, watch: tuple, tape: int, heads: List[int], target: int) -> int:
+        """
+        Pasos hasta la configuración vigilada si un barrido pasa por ella
+        
+        Un barrido solo mueve el cabezal de una cinta, así que pasa por la
+        configuración vigilada si las demás cabezas y las cintas coinciden y
+        la posición vigilada está entre la de partida (excluida) y target.
+        
+        Returns:
+            Pasos desde la posición de partida, o 0 si no pasa por ella
         """
-        steps = 0
-        last_states = []
+        watched = watch[1]
+        head = heads[tape]
+        offset = watched[tape] - head if target > head else head - watched[tape]
+        if not 0 < offset <= abs(target - head):
+            return 0
+        if any(watched[i] != heads[i] for i in range(len(heads)) if i != tape):
+            return 0
+        return offset if self._same_tapes(watch) else 0
+    
+    def run_guarded(self, max_steps: int, debug: bool = False, profiler=None,
+                    steps: int = 0, detect_cycles: bool = True, budget=None,
+                    tracer=None) -> str:
+        """
+        Ejecuta la MT con detección de ciclos, tiempo máximo y cancelación
+        
+        Con detect_cycles se usa el método de Brent: se guarda una copia de la
+        configuración (estado, cabezales y cintas) al inicio de cada segmento,
+        el bucle la vigila en cada paso (también dentro de los barridos) y
+        cada segmento dura el doble que el anterior. Como la MT es
+        determinista, volver a esa configuración significa que no va a
+        terminar; un ciclo de largo L se detecta en O(cola + L) pasos con una
+        sola copia de las cintas en memoria, y las cintas solo se comparan
+        cuando el estado y los cabezales ya coinciden.
+        
+        Con un budget que tenga tiempo máximo o token de cancelación, la
+        ejecución se corta cada budget.slice_steps pasos para revisarlos. Con
+        un tracer se corta además cada tracer.block_steps pasos, y cada tramo
+        es un bloque de la traza.
+        
+        Al terminar, self.stop_reason tiene un diccionario con reason (el
+        valor devuelto), steps, max_steps, elapsed (segundos) y
+        cycle_length.
         
-        while steps < max_steps:
-            # Verificar si llegamos a estado de aceptación
-            if self.current_state in self.accept_states:
-                return True
+        Args:
+            max_steps: Número máximo de pasos (contando los ya dados)
+            debug: Si True, muestra información de depuración
+            profiler: Profiler que acumula contadores de la ejecución
+            steps: Pasos ya ejecutados antes de esta llamada
+            detect_cycles: Si True, se detiene cuando una configuración se repite
+            budget: Budget con tiempo máximo y token de cancelación
+            tracer: TraceRecorder que registra cada paso
             
-            # Leer símbolos actuales
-            read_symbols = self.read_symbols()
+        Returns:
+            ACCEPT, REJECT, LIMIT, LOOP o el motivo del budget (DEADLINE,
+            CANCELLED)
+        """
+        started = time.perf_counter()
+        self.cycle_length = None
+        status = self._guarded_loop(max_steps, debug, profiler, steps, detect_cycles, budget, tracer)
+        if tracer is not None:
+            tracer.finish(self, status)
+        self.stop_reason = {
+            'reason': status,
+            'steps': self.steps,
+            'max_steps': max_steps,
+            'elapsed': time.perf_counter() - started,
+            'cycle_length': self.cycle_length,
+        }
+        return status
+    
+    def _guarded_loop(self, max_steps: int, debug: bool, profiler, steps: int,
+                      detect_cycles: bool, budget, tracer=None) -> str:
+        """Segmentos de run_guarded (ver su documentación)"""
+        if budget is not None and budget.interrupts:
+            slice_steps = budget.slice_steps
+            reason = budget.expired()
+            if reason is not None:
+                return reason
+        else:
+            slice_steps = max_steps
+        if tracer is not None:
+            slice_steps = min(slice_steps, tracer.block_steps)
+        segment = CYCLE_SEGMENT if detect_cycles else max_steps
+        
+        while True:
+            watch = self._configuration() if detect_cycles else None
+            start = steps
+            end = min(max_steps, steps + segment)
             
-            # Debug: mostrar estado cada 1000 pasos o primeros 100
-            if debug and (steps < 100 or steps % 1000 == 0):
-                print(f"\n[Paso {steps}] Estado: {self.current_state}")
-                print(f"Símbolos: {read_symbols}")
-                print(f"Cabezales: {self.heads}")
+            while True:
+                status = self._run_loop(min(end, steps + slice_steps), debug, steps, profiler, watch,
+                                        tracer)
+                steps = self.steps
+                
+                if status == LOOP:
+                    # La copia es la primera configuración repetida: el largo es exacto
+                    self.cycle_length = steps - start
+                    return LOOP
+                if status != LIMIT or steps >= max_steps:
+                    return status
+                if steps < end:
+                    # Corte para revisar el budget; el bucle no compara en el último paso
+                    reason = budget.expired() if budget is not None else None
+                    if reason is not None:
+                        return reason
+                    if (watch is not None and self._state == watch[0]
+                            and self.heads == watch[1] and self._same_tapes(watch)):
+                        self.cycle_length = steps - start
+                        return LOOP
+                else:
+                    break
             
-            # Guardar últimos estados para detectar loops
-            if len(last_states) >= 10:
-                last_states.pop(0)
-            last_states.append((self.current_state, read_symbols, tuple(self.heads)))
+            segment *= 2
+    
+    def _run_loop(self, max_steps: int, debug: bool = False, steps: int = 0,
+                  profiler=None, watch: Optional[tuple] = None, tracer=None) -> str:
+        """
+        Bucle de ejecución del intérprete
+        
+        Args:
+            max_steps: Número máximo de pasos (contando los ya dados)
+            debug: Si True, muestra información de depuración
+            steps: Pasos ya ejecutados antes de esta llamada
+            profiler: Si no es None, se ejecuta el bucle instrumentado
+            watch: Configuración de _configuration; si la MT vuelve a ella
+                se detiene con LOOP
+            tracer: Si no es None (y no hay profiler), se ejecuta el bucle
+                que registra la traza; cada llamada es un bloque
+                
+        Returns:
+            ACCEPT, REJECT, LIMIT o LOOP; self.steps queda con el total de pasos
+        """
+        if profiler is not None:
+            return self._profile_loop(max_steps, profiler, steps, watch)
+        if tracer is not None:
+            return self._trace_loop(max_steps, tracer, steps, watch)
+        
+        program = self.program
+        index = program.index
+        accepting = program.accepting
+        tapes = self.tapes
+        buffers = [tape.buffer for tape in tapes]
+        heads = self.heads
+        left_bounded = self.left_bounded
+        sweeps = program.sweeps
+        
+        # Símbolo bajo cada cabezal, actualizado al escribir y al mover
+        current = [buffers[i][heads[i]] for i in range(self.num_tapes)]
+        state = self._state
+        
+        # Configuración vigilada (estado -1: ninguna)
+        watch_state, watch_heads = (watch[0], watch[1]) if watch is not None else (-1, None)
+        start = steps
+        
+        try:
+            while steps < max_steps:
+                # Verificar si llegamos a estado de aceptación
+                if accepting[state]:
+                    return ACCEPT
+                
+                # Ciclo: se repite la configuración vigilada
+                if (state == watch_state and heads == watch_heads
+                        and steps != start and self._same_tapes(watch)):
+                    return LOOP
+                
+                # Debug: mostrar estado cada 1000 pasos o primeros 100
+                if debug and (steps < 100 or steps % 1000 == 0) and self.logger is not None:
+                    self._state = state
+                    self.logger(f"\n[Paso {steps}] Estado: {self.current_state}\n"
+                                f"Símbolos: {self.read_symbols()}\n"
+                                f"Cabezales: {heads}")
+                
+                # Buscar transición
+                state_index = index[state]
+                if state_index is None:
+                    transition = None
+                else:
+                    key = state_index.key(current)
+                    transition = state_index.table.get(key, _MISSING)
+                    if transition is _MISSING:
+                        transition = state_index.resolve(key)
+                
+                if transition is None:
+                    return REJECT
+                
+                # Barrido: avanzar de un salto hasta el primer símbolo que lo detiene
+                if transition[1] == state and not debug and transition[0] in sweeps:
+                    tape = sweeps[transition[0]][0]
+                    head, jumped = sweep(program, state, transition[0], current,
+                                         tapes[tape], heads[tape], max_steps - steps)
+                    if jumped:
+                        if state == watch_state:
+                            offset = self._sweep_offset(watch, tape, heads, head)
+                            if offset:
+                                heads[tape] = watch_heads[tape]
+                                steps += offset
+                                return LOOP
+                        heads[tape] = head
+                        current[tape] = buffers[tape][head]
+                        steps += jumped
+                        continue
+                
+                # Aplicar transición
+                _, state, writes, moves = transition
+                for i, symbol in writes:
+                    buffers[i][heads[i]] = symbol
+                    current[i] = symbol
+                for i, delta in moves:
+                    head = heads[i] + delta
+                    buffer = buffers[i]
+                    if head < 0:
+                        head = 0 if left_bounded else tapes[i].grow(head)
+                    elif head >= len(buffer):
+                        head = tapes[i].grow(head)
+                    heads[i] = head
+                    current[i] = buffer[head]
+                
+                steps += 1
+        finally:
+            self._state = state
+            self.steps = steps
+        
+        return LIMIT
+    
+    def _profile_loop(self, max_steps: int, profiler, steps: int = 0,
+                      watch: Optional[tuple] = None) -> str:
+        """
+        Bucle del intérprete que además llena los contadores de un Profiler
+        
+        Ejecuta exactamente los mismos pasos que _run_loop (incluidos los
+        barridos, que suman todos sus pasos a la transición de barrido). El
+        tiempo de cada iteración se asigna al estado en que empezó.
+        
+        Args:
+            max_steps: Número máximo de pasos (contando los ya dados)
+            profiler: Profiler creado para el Program de esta MT
+            steps: Pasos ya ejecutados antes de esta llamada
+            watch: Configuración vigilada (ver _run_loop)
             
-            # Buscar transición
-            transition = self.match_transition(read_symbols)
+        Returns:
+            ACCEPT, REJECT, LIMIT o LOOP
+        """
+        program = self.program
+        index = program.index
+        accepting = program.accepting
+        tapes = self.tapes
+        buffers = [tape.buffer for tape in tapes]
+        heads = self.heads
+        left_bounded = self.left_bounded
+        sweeps = program.sweeps
+        clock = time.perf_counter_ns
+        
+        state_hits = profiler.state_hits
+        state_ns = profiler.state_ns
+        transition_hits = profiler.transition_hits
+        head_travel = profiler.head_travel
+        tape_growth = profiler.tape_growth
+        
+        current = [buffers[i][heads[i]] for i in range(self.num_tapes)]
+        state = self._state
+        watch_state, watch_heads = (watch[0], watch[1]) if watch is not None else (-1, None)
+        start_steps = steps
+        
+        try:
+            while steps < max_steps:
+                if accepting[state]:
+                    return ACCEPT
+                
+                if (state == watch_state and heads == watch_heads
+                        and steps != start_steps and self._same_tapes(watch)):
+                    return LOOP
+                
+                started = clock()
+                from_state = state
+                state_index = index[state]
+                if state_index is None:
+                    transition = None
+                else:
+                    key = state_index.key(current)
+                    transition = state_index.table.get(key, _MISSING)
+                    if transition is _MISSING:
+                        transition = state_index.resolve(key)
+                
+                if transition is None:
+                    return REJECT
+                
+                tid = transition[0]
+                if transition[1] == state and tid in sweeps:
+                    tape = sweeps[tid][0]
+                    size = len(buffers[tape])
+                    head, jumped = sweep(program, state, tid, current,
+                                         tapes[tape], heads[tape], max_steps - steps)
+                    if jumped:
+                        if state == watch_state:
+                            offset = self._sweep_offset(watch, tape, heads, head)
+                            if offset:
+                                heads[tape] = watch_heads[tape]
+                                steps += offset
+                                state_hits[state] += offset
+                                transition_hits[tid] += offset
+                                head_travel[tape] += offset
+                                profiler.swept_steps += offset
+                                return LOOP
+                        if len(buffers[tape]) != size:
+                            tape_growth[tape] += 1
+                        heads[tape] = head
+                        current[tape] = buffers[tape][head]
+                        steps += jumped
+                        state_hits[state] += jumped
+                        transition_hits[tid] += jumped
+                        head_travel[tape] += jumped
+                        profiler.swept_steps += jumped
+                        state_ns[from_state] += clock() - started
+                        continue
+                
+                _, state, writes, moves = transition
+                for i, symbol in writes:
+                    buffers[i][heads[i]] = symbol
+                    current[i] = symbol
+                for i, delta in moves:
+                    head = heads[i] + delta
+                    buffer = buffers[i]
+                    if head < 0 and left_bounded:
+                        # Tope izquierdo: el cabezal no se mueve
+                        head = 0
+                    else:
+                        if head < 0 or head >= len(buffer):
+                            head = tapes[i].grow(head)
+                            tape_growth[i] += 1
+                        head_travel[i] += 1
+                    heads[i] = head
+                    current[i] = buffer[head]
+                
+                steps += 1
+                state_hits[from_state] += 1
+                transition_hits[tid] += 1
+                state_ns[from_state] += clock() - started
+        finally:
+            self._state = state
+            self.steps = steps
+            profiler.steps += steps - start_steps
+        
+        return LIMIT
+    
+    def _trace_loop(self, max_steps: int, tracer, steps: int = 0,
+                    watch: Optional[tuple] = None) -> str:
+        """
+        Bucle del intérprete que registra cada paso en un TraceRecorder
+        
+        Ejecuta exactamente los mismos pasos que _run_loop. Por cada
+        iteración agrega un solo entero al bloque abierto: el id de la
+        transición, con los pasos del barrido en los 16 bits altos si la
+        iteración fue un barrido. Estado, pasos y movimientos de cabezal se
+        reconstruyen después desde el snapshot del inicio del bloque, así que
+        grabar cuesta un append por iteración.
+        
+        Args:
+            max_steps: Número máximo de pasos (contando los ya dados)
+            tracer: TraceRecorder creado para el Program de esta MT
+            steps: Pasos ya ejecutados antes de esta llamada
+            watch: Configuración vigilada (ver _run_loop)
             
-            if transition is None:
-                # No hay transición: rechazar
-                print(f"\n❌ No hay transición para estado '{self.current_state}' con símbolos {read_symbols}")
-                return False
+        Returns:
+            ACCEPT, REJECT, LIMIT o LOOP
+        """
+        record = tracer.begin(self).append
+        
+        program = self.program
+        index = program.index
+        accepting = program.accepting
+        tapes = self.tapes
+        buffers = [tape.buffer for tape in tapes]
+        heads = self.heads
+        left_bounded = self.left_bounded
+        sweeps = program.sweeps
+        
+        current = [buffers[i][heads[i]] for i in range(self.num_tapes)]
+        state = self._state
+        watch_state, watch_heads = (watch[0], watch[1]) if watch is not None else (-1, None)
+        start = steps
+        
+        try:
+            while steps < max_steps:
+                if accepting[state]:
+                    return ACCEPT
+                
+                if (state == watch_state and heads == watch_heads
+                        and steps != start and self._same_tapes(watch)):
+                    return LOOP
+                
+                state_index = index[state]
+                if state_index is None:
+                    transition = None
+                else:
+                    key = state_index.key(current)
+                    transition = state_index.table.get(key, _MISSING)
+                    if transition is _MISSING:
+                        transition = state_index.resolve(key)
+                
+                if transition is None:
+                    return REJECT
+                
+                tid = transition[0]
+                if transition[1] == state and tid in sweeps:
+                    tape = sweeps[tid][0]
+                    budget = max_steps - steps
+                    if budget > TRACE_MAX_COUNT:
+                        budget = TRACE_MAX_COUNT
+                    head, jumped = sweep(program, state, tid, current, tapes[tape], heads[tape], budget)
+                    if jumped:
+                        if state == watch_state:
+                            offset = self._sweep_offset(watch, tape, heads, head)
+                            if offset:
+                                heads[tape] = watch_heads[tape]
+                                steps += offset
+                                record(tid | offset << 16)
+                                return LOOP
+                        heads[tape] = head
+                        current[tape] = buffers[tape][head]
+                        steps += jumped
+                        record(tid | jumped << 16)
+                        continue
+                
+                _, state, writes, moves = transition
+                for i, symbol in writes:
+                    buffers[i][heads[i]] = symbol
+                    current[i] = symbol
+                for i, delta in moves:
+                    head = heads[i] + delta
+                    buffer = buffers[i]
+                    if head < 0:
+                        head = 0 if left_bounded else tapes[i].grow(head)
+                    elif head >= len(buffer):
+                        head = tapes[i].grow(head)
+                    heads[i] = head
+                    current[i] = buffer[head]
+                
+                steps += 1
+                record(tid)
+        finally:
+            self._state = state
+            self.steps = steps
+        
+        return LIMIT
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Copia compacta de la configuración para pausar y reanudar la MT
+        
+        Solo guarda el tramo escrito de cada cinta (ver Tape.extent), así que
+        el tamaño y el tiempo son proporcionales a lo escrito y no al relleno
+        de blancos. Se puede serializar con marshal o pickle.
+        
+        Returns:
+            Diccionario con versión, huella del Program, estado, pasos,
+            símbolos y (inicio, contenido, cabezal) de cada cinta en
+            posiciones lógicas; el contenido son los ids de símbolo como bytes
+        """
+        program = self.program
+        tapes = []
+        for tape, head in zip(self.tapes, self.heads):
+            start, end = tape.extent()
+            content = tape.buffer[start:end]
+            tapes.append((start - tape.origin,
+                          bytes(content) if isinstance(content, bytearray) else content.tobytes(),
+                          head - tape.origin))
+        return {
+            'version': SNAPSHOT_VERSION,
+            'fingerprint': program.fingerprint,
+            'state': program.state_names[self._state],
+            'steps': self.steps,
+            'symbols': list(program.symbols),
+            'tapes': tapes,
+        }
+    
+    def restore(self, snapshot: Dict[str, Any]):
+        """
+        Carga una configuración guardada con snapshot
+        
+        Args:
+            snapshot: Diccionario de snapshot (de esta misma MT)
             
-            # Aplicar transición
-            self.apply_transition(transition)
+        Raises:
+            ValueError: Si el snapshot es de otra versión o de otra MT
+        """
+        program = self.program
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Versión de checkpoint no soportada: {snapshot.get('version')}")
+        if snapshot['fingerprint'] != program.fingerprint:
+            raise ValueError("El checkpoint es de otra Máquina de Turing")
+        if len(snapshot['tapes']) != self.num_tapes:
+            raise ValueError(f"Se esperaban {self.num_tapes} cintas, el checkpoint tiene {len(snapshot['tapes'])}")
+        
+        # Los símbolos agregados en ejecución pueden tener otros ids en este proceso
+        ids = [program.intern(symbol) for symbol in snapshot['symbols']]
+        same_ids = ids == list(range(len(ids)))
+        
+        self.tapes = []
+        self.heads = []
+        for start, data, head in snapshot['tapes']:
+            if program.typecode == 'B':
+                content = bytearray(data)
+                if not same_ids:
+                    content = content.translate(bytes(ids + list(range(len(ids), 256))))
+            else:
+                content = array('H')
+                content.frombytes(data)
+                if not same_ids:
+                    content = array('H', [ids[s] for s in content])
             
-            steps += 1
+            tape = Tape(content, self._fill)
+            tape.origin = -start
+            index = head - start
+            if not 0 <= index < len(tape.buffer):
+                index = tape.grow(index)
+            self.tapes.append(tape)
+            self.heads.append(index)
         
-        # Excedió el límite de pasos
-        print(f"⚠️ Advertencia: Se excedió el límite de {max_steps} pasos")
-        print(f"Estado final: {self.current_state}")
-        print(f"Símbolos: {self.read_symbols()}")
-        print(f"Cabezales: {self.heads}")
-        return False
+        self._state = program.state_id(snapshot['state'])
+        self.steps = snapshot['steps']
+        self.cycle_length = None
+        self.stop_reason = None
     
     def get_tape_content(self, tape_index: int, strip_blanks: bool = True) -> str:
         """
@@ -193,10 +1409,7 @@ class TuringMachine:
         Returns:
             Contenido de la cinta como string
         """
-        content = ''.join(self.tapes[tape_index])
-        if strip_blanks:
-            content = content.rstrip('_')
-        return content
+        return self.program.decode(self.tapes[tape_index].content(strip_blanks))
     
     def print_state(self, max_chars: int = 80):
         """Imprime el estado actual de la MT (para debugging)"""
@@ -204,30 +1417,158 @@ class TuringMachine:
         print(f"Estado actual: {self.current_state}")
         
         for i in range(self.num_tapes):
-            tape_str = ''.join(self.tapes[i][:max_chars])
-            head_pos = min(self.heads[i], max_chars - 1)
+            tape = self.tapes[i]
+            tape_str = self.program.decode(tape.buffer[tape.origin:tape.origin + max_chars])
+            position = tape.position(self.heads[i])
+            head_pos = max(0, min(position, max_chars - 1))
             
             print(f"\nCinta {i+1}: {tape_str}")
             print(f"         {' ' * head_pos}^")
-            print(f"         {' ' * head_pos}(posición {self.heads[i]})")
+            print(f"         {' ' * head_pos}(posición {position})")
+
+
+def sidecar_path(json_file: str) -> str:
+    """Ruta del archivo binario que acompaña a un JSON (encrypt.json -> encrypt.tmc)"""
+    base, _ = os.path.splitext(json_file)
+    return base + '.tmc'
+
+
+def _regenerate(json_file: str):
+    """
+    Regenera un JSON faltante con generate_mt_json
+    
+    Raises:
+        FileNotFoundError: Si no hay un generador para ese archivo
+    """
+    from generate_mt_json import GENERATORS, write_machine
+    
+    name = os.path.basename(json_file)
+    if name not in GENERATORS:
+        raise FileNotFoundError(f"No existe {json_file} y no hay un generador para él")
+    write_machine(GENERATORS[name](), json_file)
+
+
+def load_program(json_file: str) -> Tuple[Dict[str, Any], Program, str]:
+    """
+    Carga la configuración y el Program de una MT usando el archivo binario
+    
+    El archivo .tmc guarda la configuración y las tablas compiladas con
+    marshal. Se reutiliza si el JSON tiene el mismo mtime y tamaño que al
+    generarlo, o si su hash coincide; si no, se vuelve a compilar el JSON y
+    se reescribe. Si el JSON no existe se regenera con generate_mt_json.
+    
+    Args:
+        json_file: Ruta al archivo JSON
+        
+    Returns:
+        Tupla (configuración, Program, sha1 del JSON)
+    """
+    if not os.path.exists(json_file):
+        _regenerate(json_file)
+    
+    stat = os.stat(json_file)
+    path = sidecar_path(json_file)
+    sidecar = None
+    try:
+        with open(path, 'rb') as f:
+            sidecar = marshal.loads(f.read())
+        if sidecar.get('version') != (SIDECAR_VERSION, sys.version_info[:2]):
+            sidecar = None
+    except (OSError, EOFError, ValueError, TypeError, AttributeError):
+        sidecar = None
+    
+    if sidecar is not None and sidecar['stat'] == (stat.st_mtime_ns, stat.st_size):
+        return sidecar['config'], Program.from_data(sidecar['program']), sidecar['digest']
+    
+    with open(json_file, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha1(raw).hexdigest()
+    
+    if sidecar is not None and sidecar['digest'] == digest:
+        config = sidecar['config']
+        program = Program.from_data(sidecar['program'])
+    else:
+        config = json.loads(raw.decode('utf-8'))
+        program = Program(config)
+    
+    # Escribir de forma atómica para no dejar un archivo a medias
+    try:
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            marshal.dump({
+                'version': (SIDECAR_VERSION, sys.version_info[:2]),
+                'stat': (stat.st_mtime_ns, stat.st_size),
+                'digest': digest,
+                'config': config,
+                'program': program.to_data(),
+            }, f)
+        os.replace(tmp, path)
+    except OSError:
+        # Sin permisos de escritura: se usa la compilación en memoria
+        pass
+    
+    return config, program, digest
+
 
+# Caché LRU de MT compiladas: (ruta, motor) -> (mtime y tamaño, sha1, prototipo)
+_machine_cache: 'OrderedDict[Tuple[str, str], Tuple[tuple, str, TuringMachine]]' = OrderedDict()
 
-def load_turing_machine(json_file: str) -> TuringMachine:
+
+def clear_machine_cache():
+    """Vacía la caché en memoria de MT compiladas"""
+    _machine_cache.clear()
+
+
+def load_turing_machine(json_file: str, engine: str = 'interp') -> TuringMachine:
     """
     Carga una MT desde un archivo JSON
     
+    Las MT compiladas se guardan en una caché LRU por ruta y motor, validada
+    con el mtime/tamaño y el hash del JSON; cada llamada devuelve una
+    instancia nueva que comparte la compilación.
+    
     Args:
         json_file: Ruta al archivo JSON
+        engine: 'interp' (intérprete) o 'codegen' (código Python generado)
         
     Returns:
         Instancia de TuringMachine
     """
-    with open(json_file, 'r', encoding='utf-8') as f:
-        config = json.load(f)
+    if engine not in ENGINES:
+        raise ValueError(f"Motor desconocido: {engine} (opciones: {', '.join(ENGINES)})")
+    
+    key = (os.path.abspath(json_file), engine)
+    cached = _machine_cache.get(key)
+    try:
+        stat = os.stat(json_file)
+        stamp = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        stamp = None
+    
+    if cached is not None and cached[0] == stamp:
+        _machine_cache.move_to_end(key)
+        return cached[2].spawn()
+    
+    config, program, digest = load_program(json_file)
+    stat = os.stat(json_file)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    
+    if cached is not None and cached[1] == digest:
+        machine = cached[2]
+    elif engine == 'codegen':
+        from codegen import load_compiled_machine
+        machine = load_compiled_machine(json_file, config, program, digest)
+    else:
+        machine = TuringMachine(config, program)
+    
+    _machine_cache[key] = (stamp, digest, machine)
+    _machine_cache.move_to_end(key)
+    while len(_machine_cache) > CACHE_SIZE:
+        _machine_cache.popitem(last=False)
     
-    return TuringMachine(config)
+    return machine.spawn()
 
 
 if __name__ == "__main__":
     print("Intérprete de Máquinas de Turing Multicinta")
-    print("Usar main.py para ejecutar las MT de cifrado César")
\ No newline at end of file
+    print("Usar main.py para ejecutar las MT de cifrado César")
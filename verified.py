@@ -0,0 +1,280 @@
+"""
+Modo verificado-rápido del Cifrado César
+Calcula cada resultado con una transformación directa y contrasta una parte de
+las peticiones con las Máquinas de Turing, en segundo plano
+"""
+
+import json
+import os
+import random
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from turing import load_turing_machine, TuringMachine
+from batch import process_record
+from main import MACHINES
+from tapes import ALPHABET, parse_input, prepare_tape_1, prepare_tape_2_unary
+
+
+# Fracción de peticiones que se contrastan con la MT por defecto
+DEFAULT_SAMPLE = 0.01
+
+# Verificaciones en espera a partir de las cuales se omiten las muestreadas
+# (las de formas nuevas siempre se encolan)
+MAX_PENDING = 1024
+
+# Prioridad (nice) de los procesos verificadores
+VERIFIER_NICENESS = 10
+
+# Máximo de formas de input recordadas
+MAX_SHAPES = 1 << 16
+
+# Caracteres del mensaje que se cifran sin cambios (si la MT no declara
+# los suyos con la clave "passthrough")
+PASSTHROUGH = ' '
+
+
+def reference_transform(mode: str, input_str: str, alphabet: Optional[str] = None,
+                        passthrough: str = PASSTHROUGH) -> str:
+    """
+    Cifra o descifra un LLAVE#MENSAJE sin simular la MT
+    
+    La llave se normaliza con prepare_tape_2_unary, igual que para la
+    cinta 2, y el mensaje es todo lo que sigue al '#' en la cinta 1 (con
+    prepare_tape_1 y sin recortar espacios).
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        input_str: Input en formato LLAVE#MENSAJE
+        alphabet: Alfabeto de la MT (None = ALPHABET)
+        passthrough: Caracteres que la MT copia sin desplazar
+        
+    Returns:
+        El texto que debería quedar en la cinta 3
+        
+    Raises:
+        ValueError: Si la llave es inválida o el mensaje tiene caracteres
+            que las MT no procesan
+    """
+    alphabet = alphabet or ALPHABET
+    key, _ = parse_input(input_str, alphabet)
+    shift = prepare_tape_2_unary(key, alphabet).count('|')
+    if mode == 'decrypt':
+        shift = -shift
+    message = prepare_tape_1(input_str, alphabet).split('#', 1)[1]
+    
+    output = []
+    for char in message:
+        index = alphabet.find(char)
+        if index >= 0:
+            output.append(alphabet[(index + shift) % len(alphabet)])
+        elif char in passthrough:
+            output.append(char)
+        else:
+            raise ValueError(f"Carácter no soportado: {char!r}")
+    return ''.join(output)
+
+
+def input_shape(mode: str, input_str: str, alphabet: Optional[str] = None) -> Tuple:
+    """
+    Forma de un input: lo que distingue a los casos que la MT recorre distinto
+    
+    Incluye el modo, la llave tal como se escribió, los caracteres del
+    mensaje que no son letras, si tiene letras y el orden de magnitud de su
+    largo. Dos inputs con la misma forma pasan por los mismos estados de la
+    MT salvo por qué letra se desplaza.
+    """
+    alphabet = alphabet or ALPHABET
+    key, _, message = prepare_tape_1(input_str, alphabet).partition('#')
+    others = ''.join(sorted(set(message) - set(alphabet)))
+    return (mode, key, others, any(char in alphabet for char in message), len(message).bit_length())
+
+
+# MT cargadas una vez por proceso del pool (ver _init_worker)
+_MACHINES: Dict[str, TuringMachine] = {}
+
+
+def _init_worker(engine: str):
+    """Carga y compila las MT de cifrado y descifrado en el proceso verificador"""
+    # Menor prioridad: la verificación no debe quitarle CPU a las respuestas
+    if hasattr(os, 'nice'):
+        os.nice(VERIFIER_NICENESS)
+    for mode, json_file in MACHINES.items():
+        _MACHINES[mode] = load_turing_machine(json_file, engine)
+
+
+def _run_machine(mode: str, input_str: str) -> Dict[str, Any]:
+    """Ejecuta un input con la MT del proceso"""
+    return process_record(_MACHINES[mode], input_str)
+
+
+class VerifiedRunner:
+    """
+    Ejecutor con resultados directos y la MT como oráculo
+    
+    run() responde siempre con reference_transform. Además encola la
+    ejecución del mismo input en la MT cuando su forma no se había visto o
+    con probabilidad sample; un pool de procesos aparte la ejecuta y compara
+    la salida. Las diferencias se escriben (una línea JSON por input) en
+    divergence_log y en stderr. Si el pool se atrasa más de MAX_PENDING
+    verificaciones, las muestreadas se omiten, así que la latencia de run()
+    no depende de la MT.
+    """
+    
+    def __init__(self, sample: float = DEFAULT_SAMPLE, engine: str = 'interp', workers: int = 1,
+                 divergence_log: Optional[str] = None, seed: Optional[int] = None):
+        """
+        Args:
+            sample: Fracción de peticiones que se contrastan con la MT (0-1)
+            engine: Motor de ejecución de la MT
+            workers: Procesos verificadores
+            divergence_log: Archivo donde se agregan las diferencias (None = solo stderr)
+            seed: Semilla del muestreo (None = aleatoria)
+        """
+        self.sample = sample
+        self.divergence_log = divergence_log
+        self.random = random.Random(seed)
+        self.executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(engine,))
+        # Alfabeto y caracteres sin desplazar de cada MT, para la transformación directa
+        self.alphabets = {}
+        for mode, json_file in MACHINES.items():
+            config = load_turing_machine(json_file, engine).config
+            self.alphabets[mode] = (config.get('alphabet') or ALPHABET,
+                                    config.get('passthrough', PASSTHROUGH))
+        self.shapes = set()
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.requests = 0
+        self.verified = 0
+        self.skipped = 0
+        self.divergences = 0
+    
+    def run(self, mode: str, input_str: str) -> Dict[str, Any]:
+        """
+        Cifra o descifra un input y programa su verificación si corresponde
+        
+        Returns:
+            Diccionario con input, accepted y output (o error)
+        """
+        self.requests += 1
+        alphabet, passthrough = self.alphabets[mode]
+        try:
+            output = reference_transform(mode, input_str, alphabet, passthrough)
+            result = {'input': input_str, 'accepted': True, 'output': output}
+        except ValueError as e:
+            result = {'input': input_str, 'accepted': False, 'error': str(e)}
+        
+        shape = input_shape(mode, input_str, alphabet)
+        new = shape not in self.shapes
+        if new and len(self.shapes) < MAX_SHAPES:
+            self.shapes.add(shape)
+        if new or self.random.random() < self.sample:
+            if not new and self.pending >= MAX_PENDING:
+                self.skipped += 1
+            else:
+                with self.lock:
+                    self.pending += 1
+                future = self.executor.submit(_run_machine, mode, input_str)
+                future.add_done_callback(lambda done: self._compare(mode, result, done))
+        return result
+    
+    def _compare(self, mode: str, result: Dict[str, Any], done: Future):
+        """Compara el resultado directo con el de la MT (en el hilo del pool)"""
+        try:
+            machine = done.result()
+        except Exception as e:
+            machine = {'status': 'error', 'accepted': False, 'error': str(e)}
+        
+        agree = (machine['accepted'] == result['accepted']
+                 and (not result['accepted'] or machine.get('output') == result['output']))
+        with self.lock:
+            self.pending -= 1
+            self.verified += 1
+            if agree:
+                return
+            self.divergences += 1
+            entry = {
+                'mode': mode,
+                'input': result['input'],
+                'reference': result.get('output'),
+                'reference_error': result.get('error'),
+                'machine': machine.get('output'),
+                'status': machine['status'],
+                'steps': machine.get('steps'),
+            }
+            line = json.dumps(entry, ensure_ascii=False)
+            print(f"DIVERGENCIA: {line}", file=sys.stderr)
+            if self.divergence_log is not None:
+                with open(self.divergence_log, 'a', encoding='utf-8') as f:
+                    f.write(line + '\n')
+    
+    def close(self, wait: bool = True):
+        """Termina el pool; con wait espera las verificaciones pendientes"""
+        self.executor.shutdown(wait=wait, cancel_futures=not wait)
+    
+    def __enter__(self) -> 'VerifiedRunner':
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def stats(self) -> Dict[str, int]:
+        """Contadores de peticiones, verificaciones y diferencias"""
+        return {
+            'requests': self.requests,
+            'verified': self.verified,
+            'pending': self.pending,
+            'skipped': self.skipped,
+            'divergences': self.divergences,
+            'shapes': len(self.shapes),
+        }
+
+
+def run_verified(mode: str, records: Iterable[str], runner: VerifiedRunner) -> Iterator[Dict[str, Any]]:
+    """Resultados directos de muchos registros, verificados en segundo plano"""
+    for record in records:
+        yield runner.run(mode, record)
+
+
+def run_verified_file(mode: str, path: str, options: Dict[str, str], engine: str = 'interp',
+                      out=None) -> int:
+    """
+    Procesa un archivo de registros en modo verificado y escribe JSON lines
+    
+    Al terminar espera las verificaciones pendientes e imprime un resumen en
+    stderr.
+    
+    Args:
+        mode: 'encrypt' o 'decrypt'
+        path: Archivo con un registro por línea ('-' para stdin)
+        options: Opciones sample, workers y divergences de la línea de comandos
+        engine: Motor de ejecución de la MT
+        out: Flujo de salida (por defecto stdout)
+        
+    Returns:
+        Número de registros rechazados más el de diferencias con la MT
+    """
+    out = out or sys.stdout
+    sample = float(options['sample']) if options.get('sample') else DEFAULT_SAMPLE
+    workers = int(options['workers']) if options.get('workers') else 1
+    source = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8')
+    failures = 0
+    
+    try:
+        with VerifiedRunner(sample, engine, workers, options.get('divergences') or None) as runner:
+            records = (line.rstrip('\r\n') for line in source if line.strip())
+            for result in run_verified(mode, records, runner):
+                failures += not result['accepted']
+                out.write(json.dumps(result, ensure_ascii=False) + '\n')
+        out.flush()
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    
+    stats = runner.stats()
+    print(f"Registros: {stats['requests']} | Verificados con la MT: {stats['verified']} "
+          f"({stats['shapes']} formas, {stats['skipped']} omitidos) | "
+          f"Diferencias: {stats['divergences']}", file=sys.stderr)
+    return failures + stats['divergences']